@@ -1,13 +1,48 @@
 #!/usr/bin/Python
 # -*- coding: utf-8 -*
 
-from bs4 import BeautifulSoup
 from bs4 import NavigableString
 from nltk import word_tokenize
-from collections import OrderedDict
-import mmap,re,io,csv,os
+from collections import OrderedDict, deque
+import bisect,re,io,csv,os,functools
+import matchers
+import metrics
+import parsers
+import store
+import tables
 import utils
 
+# the windowed extraction parses the whole section once the fragments cover more of it than this
+MAX_WINDOW_SHARE = 0.5
+
+class DocumentOutline():
+    """
+    the outline of a document built at one pass: every <b> element is classified once by
+    guess_acquisition_title(), and the elements enclosing a possible title are marked, so that
+    walking through the siblings of a section only looks up the marks instead of re-classifying
+    all the nested <b> elements again and again.
+    """
+    MARK = "data-acq-outline"
+
+    def __init__(self, analysis, text_tag, flags=0):
+        # the possible section titles in document order
+        self.titles = deque()
+        for tag in text_tag.find_all('b'):
+            if not analysis.guess_acquisition_title(tag, flags):
+                continue
+            self.titles.append(tag)
+            # mark the title and its ancestors, up to the first one marked by an earlier title
+            node = tag
+            while node is not None and node.name is not None and not node.has_attr(DocumentOutline.MARK):
+                node[DocumentOutline.MARK] = "1"
+                node = node.parent
+
+    def has_title(self, tag):
+        """
+        check whether a possible section title exists within the tag
+        """
+        return tag.has_attr(DocumentOutline.MARK)
+
 class Analysis():
     # "FINANCIAL STATEMENTS" for case:Gas,726958, but it causes Case G&L,1109189 reporting
     # older doc , the case Visibillity,1073349 fails due to the same reason. 
@@ -19,19 +54,32 @@ class Analysis():
     acq_exclude_words = {"acquisition will operate", "no later than", "in the future"}
     asset_table_following_indicators = {"acquisition", "acquired"}
 
-    def __init__(self, targetname, indexfile):
+    # the default html parser backend of extract_assets(), see parsers.PARSERS
+    parser = "bs4"
+    # the default matcher backend of the keyword sets, see matchers.BACKENDS
+    matcher = "re"
+
+    def __init__(self, targetname, indexfile, parser=None, matcher=None, catalog=None):
         self.target_name = targetname
         self.index_file = indexfile
-        escaped_words = [re.escape(word) for word in Analysis.acq_title_words]
-        self.acq_title_pattern = "|".join(escaped_words)
-        escaped_words = [re.escape(word) for word in Analysis.acq_text_words]
-        self.acq_pattern = "|".join(escaped_words)
-        escaped_words = [re.escape(word) for word in Analysis.asset_words]
-        self.asset_pattern = "|".join(escaped_words)
-        escaped_words = [re.escape(word) for word in Analysis.asset_table_following_indicators]
-        self.asset_table_indicators_pattern = "|".join(escaped_words)
-        escaped_words = [re.escape(word) for word in Analysis.acq_exclude_words]
-        self.acq_exclude_pattern = "|".join(escaped_words)
+        # an optional FilingCatalog which the documents of the index file are looked up in
+        self.catalog = catalog
+        if parser is not None:
+            self.parser = parser
+        if matcher is not None:
+            self.matcher = matcher
+        # the matchers are compiled once and shared by all the instances with the same keywords
+        self.acq_title_words = frozenset(self.acq_title_words)
+        self.acq_text_words = frozenset(self.acq_text_words)
+        self.asset_words = frozenset(self.asset_words)
+        self.acq_exclude_words = frozenset(self.acq_exclude_words)
+        self.asset_table_following_indicators = frozenset(self.asset_table_following_indicators)
+
+    def words_matcher(self, words, flags = 0):
+        return matchers.compile_words(words, flags, self.matcher)
+
+    def target_matcher(self, flags = 0):
+        return matchers.compile_pattern(self.target_name, flags)
 
     @staticmethod
     def full_text_search(filename, pattern, flags = 0):
@@ -39,32 +87,164 @@ class Analysis():
         Scan through a string 'pattern' in the specified file, return the 
         matched sequence or None.
         """
-        with open(filename, 'rb', 0) as file:
-            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                match = re.search(bytes(pattern, encoding='utf8'), mm, flags)
+        matcher = matchers.compile_pattern(pattern, flags)
+        with metrics.timer("scan") as counters, store.filing_blocks(filename) as blocks:
+            for offset, block in blocks:
+                counters["bytes"] += len(block)
+                match = matcher.search_bytes(block)
                 if match:
                     return match.group()
         return None
 
-    def locate_target_documents(self, flags = 0):
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def compile_targets(patterns, flags = 0):
         """
-        figure out the documents containing the specified target name pattern in time-asending order.
+        combine the target name patterns into one alternation regex, where the i-th pattern
+        is enclosed in the named group 't{i}'
+        """
+        groups = [b"(?P<t%d>%s)" % (i, bytes(pattern, encoding='utf8')) for i, pattern in enumerate(patterns)]
+        return re.compile(b"|".join(groups), flags)
+
+    @staticmethod
+    def mention_offsets(filename, pattern, flags = 0):
+        """
+        return the list of the (start, end) byte offsets of all the matches of a pattern in the
+        specified file, which Analysis.locate_windows() cuts the fragments around
+        """
+        regex = matchers.compile_pattern(pattern, flags).bytes_regex
+        offsets = []
+        with metrics.timer("scan") as counters, store.filing_blocks(filename) as blocks:
+            for offset, block in blocks:
+                counters["bytes"] += len(block)
+                offsets += [(offset + match.start(), offset + match.end()) for match in regex.finditer(block)]
+        return offsets
+
+    @staticmethod
+    def full_text_search_targets(filename, patterns, flags = 0, offsets=None):
+        """
+        Scan through several target name 'patterns' in the specified file at one pass, return
+        the set of the patterns matched in it.
+        A found pattern is dropped from the alternation, and the scan resumes from where it
+        matched, so a target overlapping another one's match is still found.
+        With a dictionary as 'offsets', the mention_offsets() of every found pattern are put in
+        it at the same pass, from its first match on.
         """
-        lines = []
-        with open(self.index_file, 'r', encoding="UTF-8") as input:
-            lines = input.readlines()
-        docs = OrderedDict()
-        for line in lines:
-            items = line.split("\t")
-            dict = {}
-            dict["FILLING_TYPE"] = items[0]
-            dict["FILLING_DATE"] = items[1]
-            filename = items[2]
-            dict["FILLING_URL"] = items[3]
+        found = set()
+        remaining = list(patterns)
+        if len(remaining) == 0:
+            return found
+        def mentions(pattern, offset, block, pos=0):
+            return [(offset + match.start(), offset + match.end()) for match in
+                matchers.compile_pattern(pattern, flags).bytes_regex.finditer(block, pos)]
+        with metrics.timer("scan") as counters, store.filing_blocks(filename) as blocks:
+            for offset, block in blocks:
+                counters["bytes"] += len(block)
+                if offsets is not None:
+                    for pattern in found:
+                        offsets[pattern] += mentions(pattern, offset, block)
+                pos = 0
+                while len(remaining) > 0:
+                    regex = Analysis.compile_targets(tuple(remaining), flags)
+                    match = regex.search(block, pos)
+                    if match is None:
+                        break
+                    index = next(i for i in range(len(remaining)) if match.group(f"t{i}") is not None)
+                    pattern = remaining.pop(index)
+                    found.add(pattern)
+                    pos = match.start()
+                    if offsets is not None:
+                        offsets[pattern] = mentions(pattern, offset, block, pos)
+                if len(remaining) == 0 and offsets is None:
+                    break
+        return found
+
+    @staticmethod
+    def locate_targets(index_file, target_names, flags = 0, text_index=None, catalog=None):
+        """
+        figure out the documents containing each of the target name patterns in time-asending order,
+        every document is scanned once for all the targets. Return a map with target name as key and
+        the same map as locate_target_documents() as value.
+        With a TextIndex, only the candidate documents of a target are scanned for it.
+        """
+        targets = OrderedDict((target_name, OrderedDict()) for target_name in target_names)
+        candidates = Analysis.locate_candidates(index_file, targets.keys(), text_index)
+        for filename, dict in Analysis.read_index(index_file, catalog).items():
+            names = [name for name in targets.keys() if candidates.get(name) is None or os.path.normpath(filename) in candidates[name]]
+            for target_name in Analysis.full_text_search_targets(filename, names, flags):
+                targets[target_name][filename] = dict
+                utils.logger.debug(f'{dict["FILLING_DATE"]}:match {target_name} in {dict["FILLING_TYPE"]} doc:{filename}')
+        return targets
+
+    @staticmethod
+    def locate_candidates(index_file, target_names, text_index=None):
+        """
+        bring the TextIndex up to date with the index file, and look up the candidate documents of
+        every target in it. Return a map with target name as key and the set of candidate filenames
+        as value, where None means all the documents are candidates.
+        """
+        if text_index is None:
+            return {}
+        text_index.update(index_file)
+        return {target_name: text_index.candidates(target_name) for target_name in target_names}
+
+    @staticmethod
+    def read_index(index_file, catalog=None):
+        """
+        read the download.idx in time-asending order into a map with filename as key and
+        'FILLING_TYPE'/'FILLING_DATE'/'FILLING_URL' as dictionary keyed-values.
+        With a FilingCatalog, the documents of the cik owning the index are looked up in it instead.
+        """
+        with metrics.timer("index"):
+            if catalog is not None:
+                return catalog.documents(cik=os.path.basename(os.path.dirname(os.path.normpath(index_file))))
+            return utils.read_index(index_file)
+
+    def iter_target_documents(self, flags = 0, text_index=None):
+        """
+        yield the (filename, dict) of the documents containing the specified target name pattern in
+        time-asending order, where a document is only scanned when the next match is asked for, so
+        the documents after the one the caller stops at are never scanned.
+        With a TextIndex, only the candidate documents found in it are scanned.
+        """
+        candidates = Analysis.locate_candidates(self.index_file, [self.target_name], text_index).get(self.target_name)
+        # the incremental downloads append the later filings, keep the index order for the same date
+        entries = sorted(Analysis.read_index(self.index_file, self.catalog).items(),
+            key=lambda item: utils.try_parsing_date(item[1]["FILLING_DATE"]))
+        for filename, dict in entries:
+            if candidates is not None and os.path.normpath(filename) not in candidates:
+                continue
             if Analysis.full_text_search(filename, self.target_name, flags) is not None:
-                docs[filename] = dict
                 utils.logger.debug(f'{dict["FILLING_DATE"]}:match {self.target_name} in {dict["FILLING_TYPE"]} doc:{filename}')
-        return docs
+                yield filename, dict
+
+    def locate_target_documents(self, flags = 0, text_index=None):
+        """
+        figure out the documents containing the specified target name pattern in time-asending order.
+        With a TextIndex, only the candidate documents found in it are scanned.
+        """
+        return OrderedDict(self.iter_target_documents(flags, text_index))
+
+    def iter_acquisition_reports(self, flags = 0, text_index=None, list_rest=False, **kwargs):
+        """
+        yield the (filename, dict, info) of the documents containing the target in time-asending order,
+        where the acquisition info is extracted from them one by one until the first report is found;
+        that one is the last yielded, or with 'list_rest', the later matches are still scanned and
+        yielded with None as info without being extracted.
+        The keyword arguments go to extract_assets().
+        """
+        found = False
+        for filename, dict in self.iter_target_documents(flags, text_index):
+            if found:
+                yield filename, dict, None
+                continue
+            utils.logger.info(f'\tfound {self.target_name} in {filename}, analyzing...')
+            info = self.extract_assets(filename, flags, **kwargs)
+            yield filename, dict, info
+            if info is not None:
+                found = True
+                if not list_rest:
+                    return
 
     def guess_acquisition_title(self, tag, flags=0):
         # ignore long text
@@ -78,7 +258,7 @@ class Analysis():
         # ignore NavigableString
         if isinstance(tag, NavigableString):
             return False
-        if re.search(self.acq_title_pattern, raw_txt, flags) is None:
+        if not self.words_matcher(self.acq_title_words, flags).search(raw_txt):
             return False
         utils.logger.debug(f"new possible title found:{raw_txt}")
         return True
@@ -107,12 +287,12 @@ class Analysis():
             if isinstance(txt_elt, NavigableString):
                 continue
             # match the target name
-            if re.search(self.target_name, raw_txt, flags) is None:
+            if not self.target_matcher(flags).search(raw_txt):
                 continue
             # then match any acquisition keywords without the any excluding words
-            if re.search(self.acq_pattern, raw_txt, flags) is None:
+            if not self.words_matcher(self.acq_text_words, flags).search(raw_txt):
                 continue
-            if re.search(self.acq_exclude_pattern, raw_txt, flags) is not None:
+            if self.words_matcher(self.acq_exclude_words, flags).search(raw_txt):
                 continue
             info = self.composite_info(info, raw_txt)
             # TBD... it is OK to suppose acquisition information doesn't across paragraghs??
@@ -225,14 +405,200 @@ class Analysis():
         """
         table_raw = table.get_text()
         # if the targetname and any asset keywords exist in the table, it is the right one 
-        if re.search(self.target_name, table_raw) is not None:
-            if re.search(self.asset_pattern, table_raw, re.IGNORECASE) is not None:
+        if self.target_matcher().search(table_raw):
+            if self.words_matcher(self.asset_words, re.IGNORECASE).search(table_raw):
                 csv_output = io.StringIO()
-                self.table2csv(table, csv_output)
+                with metrics.timer("table", self.target_name):
+                    self.table2csv(table, csv_output)
                 return self.composite_info(None, csv_output.getvalue())
         return None
 
-    def extract_assets(self, filename, flags = 0):
+    def extract_asset_tables(self, filename, parser=None, batch=None):
+        """
+        return the tables.TableGrid of every table mentioning any asset keyword in a document, like the
+        purchase price allocation tables, and add their amounts into a tables.TableBatch keyed by the
+        "CIK", "TARGET_NAME" and "FILENAME" if any, so the tables of many filings end up in one result
+        """
+        grids = []
+        if os.path.exists(filename) is False:
+            return grids
+        backend = parsers.get_parser(parser if parser is not None else self.parser)
+        with metrics.timer("parse", self.target_name) as counters:
+            counters["bytes"] = os.path.getsize(filename)
+            text_tag = backend.load_text(filename)
+        if text_tag is None:
+            return grids
+        cik = os.path.basename(os.path.dirname(os.path.normpath(self.index_file)))
+        matcher = self.words_matcher(self.asset_words, re.IGNORECASE)
+        for table in text_tag.find_all("table"):
+            if not matcher.search(table.get_text()):
+                continue
+            with metrics.timer("table", self.target_name):
+                grid = tables.TableGrid(table)
+            if len(grid.rows) == 0:
+                continue
+            grids.append(grid)
+            if batch is not None:
+                batch.add(grid, CIK=cik, TARGET_NAME=self.target_name, FILENAME=filename)
+        return grids
+
+    def window_extent(self, scanner, titles, title_starts, points):
+        """
+        return the (start, end, enclosing element) of the run of sibling elements holding all the
+        'points', which are (element, start, end) tuples of titles and text pieces. The run is cut
+        at a level where no table is split, and every title within it keeps its enclosing
+        <p>/<div>/<tr> (and the table of a <tr>) inside the run, so the sibling walks of the titles
+        see the same elements as in the whole section.
+        """
+        ROOT = parsers.OutlineScanner.ROOT
+        top = points[0][0]
+        for point in points[1:]:
+            top = scanner.common_ancestor(top, point[0])
+        while True:
+            # a title in a table reports the whole table
+            id, outer = top, None
+            while id != ROOT:
+                if scanner.names[id] == "table":
+                    outer = id
+                id = scanner.parents[id]
+            if outer is not None:
+                top = scanner.parents[outer]
+                continue
+            start, end, first = None, None, None
+            for id, point_start, point_end in points:
+                if id != top:
+                    id = scanner.child(top, id)
+                    point_start, point_end = scanner.starts[id], scanner.ends[id]
+                else:
+                    id = None
+                if start is None or point_start < start:
+                    start, first = point_start, id
+                end = point_end if end is None else max(end, point_end)
+            # the walks only visit <p>/<div>/<tr> and stop at one holding a title, so the run starts
+            # at such a child, or at the first child if there is none before
+            index = bisect.bisect_left(title_starts, start)
+            while first is None or scanner.names[first] not in ('p', 'div', 'tr') or \
+                    index >= len(titles) or title_starts[index] >= scanner.ends[first]:
+                index -= 1
+                if index < 0 or title_starts[index] < scanner.content_start(top):
+                    start = scanner.content_start(top)
+                    break
+                first = scanner.child(top, titles[index])
+                start = scanner.starts[first]
+                index = bisect.bisect_left(title_starts, start)
+            higher = None
+            for i in range(bisect.bisect_left(title_starts, start), bisect.bisect_left(title_starts, end)):
+                ancestor = scanner.ancestor(titles[i], ('p', 'div', 'tr'))
+                if ancestor is None:
+                    continue
+                if scanner.depth(ancestor) <= scanner.depth(top):
+                    higher = scanner.parents[ancestor]
+                    break
+                if scanner.names[ancestor] == 'tr':
+                    # the walk from the last row goes on after its table
+                    bound = scanner.ancestor(ancestor, ('table',))
+                    if scanner.depth(bound) <= scanner.depth(top):
+                        higher = scanner.parents[bound]
+                        break
+            if higher is None:
+                return start, end, top
+            top = higher
+
+    def locate_windows(self, scanner, offsets):
+        """
+        figure out the fragments of a scanned <TEXT> section worth parsing for the target mentions,
+        given by the byte 'offsets' of the matches in the file, see mention_offsets(); a match out of
+        the text of the section, like in a tag, is not a mention.
+        A mention could only be reported by the sibling walk of an earlier section title, or by a
+        title in the same table, and the walk of an earlier title stops at the element holding a
+        later one, so every fragment runs from the nearest preceding title to the mention, see
+        window_extent(). Extracting the fragments gives the same information as the whole section,
+        but for a mention split by the markup, which the byte offsets miss like the locate step does.
+        Return the list of (start, end, enclosing element) in document order, or None if the
+        fragments would cover more than MAX_WINDOW_SHARE of the section.
+        """
+        ROOT = parsers.OutlineScanner.ROOT
+        title_matcher = self.words_matcher(self.acq_title_words, re.IGNORECASE)
+        titles = []
+        for id in scanner.bolds:
+            text = scanner.bold_texts[id]
+            if len(text) > parsers.MAX_TITLE_LENGTH or scanner.has_link(scanner.parents[id]):
+                continue
+            if title_matcher.search(text):
+                titles.append(id)
+        title_starts = [scanner.starts[id] for id in titles]
+        def holds_title(id):
+            index = bisect.bisect_left(title_starts, scanner.starts[id])
+            return index < len(titles) and title_starts[index] < scanner.ends[id]
+        # the walk from the last row of a table jumps to the <div> next to the table, skipping the
+        # later titles, and goes on until a sibling holding a title; keep the (start, end, title)
+        jumps = []
+        for id in titles:
+            ancestor = scanner.ancestor(id, ('p', 'div', 'tr'))
+            if ancestor is None or scanner.names[ancestor] != 'tr':
+                continue
+            table = scanner.ancestor(ancestor, ('table',))
+            # a title in a row without any table breaks the walk of the whole section
+            if table is None:
+                return None
+            if scanner.next_sibling(ancestor, ('p', 'div', 'tr')) is not None:
+                continue
+            next = scanner.next_sibling(table, ('div',))
+            if next is None:
+                continue
+            start = end = scanner.starts[next]
+            while next is not None and not holds_title(next):
+                end = scanner.ends[next]
+                next = scanner.next_sibling(next, ('p', 'div', 'tr'))
+            if end > start:
+                jumps.append((start, end, id))
+
+        extents = []
+        for start, end in offsets:
+            # the first and the last text pieces overlapping the match
+            pieces = scanner.pieces_within(scanner.char_offset(start), scanner.char_offset(end))
+            if len(pieces) == 0:
+                continue
+            pieces = {pieces[0], pieces[-1]}
+            points = [(scanner.piece_elements[i], scanner.piece_starts[i], scanner.piece_ends[i]) for i in pieces]
+            position = min(point[1] for point in points)
+            index = bisect.bisect_left(title_starts, position) - 1
+            candidates = [titles[index]] if index >= 0 else []
+            # the titles in the outermost table holding the mention
+            id, table = points[0][0], None
+            while id != ROOT:
+                if scanner.names[id] == "table":
+                    table = id
+                id = scanner.parents[id]
+            if table is not None:
+                candidates += titles[bisect.bisect_left(title_starts, scanner.starts[table]):
+                    bisect.bisect_left(title_starts, scanner.ends[table])]
+            candidates += [id for start, end, id in jumps if start <= position < end]
+            # a mention before any section title, e.g. in the table of contents
+            if len(candidates) == 0:
+                continue
+            points += [(id, scanner.starts[id], scanner.ends[id]) for id in candidates]
+            # a mention within the last fragment along with its titles changes nothing
+            if len(extents) > 0 and extents[-1][0] <= min(point[1] for point in points) and \
+                    max(point[2] for point in points) <= extents[-1][1]:
+                continue
+            extent = self.window_extent(scanner, titles, title_starts, points)
+            # merge the overlapping fragments, which might cut the run at a higher level
+            while True:
+                overlaps = [i for i, other in enumerate(extents) if other[0] < extent[1] and extent[0] < other[1]]
+                if len(overlaps) == 0:
+                    break
+                for i in reversed(overlaps):
+                    start, end, top = extents.pop(i)
+                    points.append((top, start, end))
+                extent = self.window_extent(scanner, titles, title_starts, points)
+            bisect.insort(extents, extent)
+            # parsing most of the section as fragments saves nothing
+            if sum(end - start for start, end, top in extents) > MAX_WINDOW_SHARE * (scanner.region[1] - scanner.region[0]):
+                return None
+        return extents
+
+    def extract_assets(self, filename, flags = 0, parser=None, windowed=False, parse_cache=None, offsets=None):
         """
         try to extract acquisition asset information about the target company.
         1. sometimes the text is in <font> like the last 2 ciks; but it could also be
@@ -245,31 +611,64 @@ class Analysis():
             Acquisition section by the title, then parse the text and asset table;
             but some page could put all texts in a table and we may need to extract the
             table instead.
+        3. the html parser backend is pluggable, the 'lxml' one only parses the <TEXT> section
+            and frees the blocks which have been analyzed.
+        4. with 'windowed', the 'bs4' backend only parses the fragments around the target
+            mentions figured out by locate_windows(), from the byte 'offsets' of the matches given
+            by the locate step, or found again otherwise; the whole document is parsed if it
+            can't be scanned, or no fragment is found.
+        5. with a ParseCache, the parse product of the whole document is looked up by its hash,
+            and the document is only parsed on a miss; the windows are not used then.
         """
-        html = None
         info = None
         if os.path.exists(filename) is False:
             return info
 
-        with open(filename, 'rb') as input:
-            html = input.read()
-        soup = BeautifulSoup(html, 'html.parser', from_encoding="UTF-8")
+        backend = parsers.get_parser(parser if parser is not None else self.parser)
+        if parse_cache is not None:
+            backend = parse_cache.backend(backend)
+        if windowed and backend.windowed:
+            scanner = parsers.OutlineScanner.scan(filename)
+            windows = None
+            if scanner is not None:
+                if offsets is None:
+                    offsets = Analysis.mention_offsets(filename, self.target_name, flags)
+                windows = self.locate_windows(scanner, offsets)
+            if windows is not None and len(windows) > 0:
+                utils.logger.debug(f'\tparsing {len(windows)} fragments of {filename}')
+                # every fragment is enclosed in its own element, which holds a hyperlink if the
+                # element enclosing the run does, like in the whole section
+                markup = "".join("<acq-window>%s%s</acq-window>" % ('<a href="#"></a>' if scanner.has_link(top) else "",
+                    scanner.data[start:end]) for start, end, top in windows)
+                with metrics.timer("parse", self.target_name) as counters:
+                    counters["bytes"] = len(markup)
+                    fragment = backend.load_fragment(markup)
+                return self.extract_sections(fragment, backend, flags)
+
         # locate the ../<description>/<text>
-        desc_tag = soup.find('description')
-        if desc_tag is None:
-            return info
-        text_tag = desc_tag.find('text')
+        with metrics.timer("parse", self.target_name) as counters:
+            counters["bytes"] = os.path.getsize(filename)
+            text_tag = backend.load_text(filename)
         if text_tag is None:
             return info
+        return self.extract_sections(text_tag, backend, flags)
 
+    def extract_sections(self, text_tag, backend, flags = 0):
+        """
+        walk through the possible acquisition sections of a parsed document or fragment, and
+        return the acquisition information of the first desired one, or None
+        """
+        info = None
         section_found = False
-        title_elements =text_tag.find_all('b')
-        for title in title_elements:
-            # 1>. figure out a possible section title
-            # search in case-insensitive way, the title could all in uppercases
-            # like the case Sirius,879993 'BUSINESS ACQUISITION'
-            if self.guess_acquisition_title(title, re.IGNORECASE) is False:
-                continue
+        # 1>. figure out all the possible section titles at one pass
+        # search in case-insensitive way, the title could all in uppercases
+        # like the case Sirius,879993 'BUSINESS ACQUISITION'
+        with metrics.timer("classify", self.target_name):
+            outline = DocumentOutline(self, text_tag, re.IGNORECASE)
+        # the titles are consumed from the outline, so the analyzed ones could be freed
+        while len(outline.titles) > 0:
+            title = outline.titles.popleft()
+            backend.release(title)
             utils.logger.info(f'\tpossible acquisition title?\n{title.get_text()}')
             # then check whether the ancestor <div>/<p>/<tr> exists 
             ancestor = self.find_ancestor(title, ['p', 'div', 'tr'])
@@ -294,14 +693,9 @@ class Analysis():
             
             # 3>. iterate the siblings to determine whether it is a desired section; if yes
             # then extract the acquisition infomation 
-            new_title_found = False  
             while next is not None:
                 # break out if a new possible section title is found
-                for new_title in next.find_all('b'):
-                    if self.guess_acquisition_title(new_title, re.IGNORECASE):
-                        new_title_found = True
-                        break
-                if new_title_found:
+                if outline.has_title(next):
                     break
                 
                 # try to extract the acquisition info which should exist in the next sibling
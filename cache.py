@@ -0,0 +1,145 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from collections import OrderedDict
+import atexit,json,os,sqlite3,threading,time,zlib
+import utils
+
+DEFAULT_PATH = os.environ.get("EDGAR_CACHE", "edgar_cache.db")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# seconds to keep each kind of page, None means forever
+DEFAULT_TTLS = {
+    # browse-edgar listing pages gain new filings every quarter
+    "listing": 24 * 3600,
+    # 'Filling Detail' pages of historical filings never change
+    "detail": None,
+    # the name/sic/state of a company hardly ever change
+    "company": 30 * 24 * 3600,
+}
+
+class ResponseCache():
+    """
+    persistent cache of EDGAR pages keyed by url, which keeps both the raw response and the parsed
+    result of a page in a sqlite file. Every kind of page has its own time-to-live, and the least
+    recently used pages are evicted once the cache grows beyond 'max_bytes'.
+    """
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls is not None:
+            self.ttls.update(ttls)
+        self.hits = {}
+        self.misses = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY, kind TEXT, created REAL, accessed REAL,
+            size INTEGER, raw BLOB, parsed TEXT)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed)")
+        self._conn.commit()
+        self.size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def _lookup(self, url, kind):
+        """
+        return the (raw, parsed) columns of a fresh entry, or None
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT created, raw, parsed FROM pages WHERE url = ? AND kind = ?",
+                (url, kind)).fetchone()
+            now = time.time()
+            ttl = self.ttls.get(kind)
+            if row is None or (ttl is not None and row[0] + ttl < now):
+                self.misses[kind] = self.misses.get(kind, 0) + 1
+                return None
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+            self._conn.execute("UPDATE pages SET accessed = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+            return row[1], row[2]
+
+    def get(self, url, kind):
+        """
+        return the cached raw response of the url, or None
+        """
+        row = self._lookup(url, kind)
+        if row is None or row[0] is None:
+            return None
+        return zlib.decompress(row[0])
+
+    def get_parsed(self, url, kind):
+        """
+        return the cached parsed result of the url, or None
+        """
+        row = self._lookup(url, kind)
+        if row is None or row[1] is None:
+            return None
+        return json.loads(row[1], object_pairs_hook=OrderedDict)
+
+    def contains(self, url, kind):
+        """
+        check whether a fresh entry exists without touching the counters
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT created FROM pages WHERE url = ? AND kind = ?", (url, kind)).fetchone()
+        ttl = self.ttls.get(kind)
+        return row is not None and (ttl is None or row[0] + ttl >= time.time())
+
+    def put(self, url, kind, raw=None, parsed=None):
+        """
+        store the raw response and/or the json-serializable parsed result of the url
+        """
+        raw = zlib.compress(raw) if raw is not None else None
+        parsed = json.dumps(parsed) if parsed is not None else None
+        size = len(url) + (len(raw) if raw is not None else 0) + (len(parsed) if parsed is not None else 0)
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            if old is not None:
+                self.size -= old[0]
+            self._conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, kind, now, now, size, raw, parsed))
+            self.size += size
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.size <= self.max_bytes:
+            return
+        # drop the least recently used pages until the cache fits in 90% of its budget
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT url, size FROM pages ORDER BY accessed").fetchall()
+        evicted = 0
+        for url, size in rows:
+            if self.size <= target:
+                break
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            self.size -= size
+            evicted += 1
+        utils.logger.debug(f"evicted {evicted} pages from the cache {self.path}")
+
+    def stats(self):
+        """
+        return the hit/miss counters keyed by page kind
+        """
+        kinds = sorted(set(self.hits.keys()) | set(self.misses.keys()))
+        return {kind: {"hits": self.hits.get(kind, 0), "misses": self.misses.get(kind, 0)} for kind in kinds}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def default_cache():
+    """
+    the cache shared by all the Company instances
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+            atexit.register(_default_cache.close)
+        return _default_cache
@@ -0,0 +1,164 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from collections import OrderedDict
+from datetime import datetime
+import glob,json,os,re,sqlite3,threading
+import store
+import utils
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d", "%Y.%m.%d")
+# the accession number in the url of a 'Filling Detail' page, like 0000950123-06-001234-index.htm
+ACCESSION_PATTERN = re.compile(r"(\d{10}-\d{2}-\d{6})")
+
+def iso_date(date):
+    """
+    return the date given in any of the formats of EDGAR and the specs as YYYY-MM-DD, which sorts
+    in time order
+    """
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(str(date).strip(), fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    raise ValueError(f"no valid date format found for {date}")
+
+def accession_number(url):
+    """
+    return the accession number of a filing from the url of its 'Filling Detail' page, or the
+    name of the page for the urls not following the EDGAR layout
+    """
+    match = ACCESSION_PATTERN.search(url)
+    if match is not None:
+        return match.group(1)
+    name = os.path.basename(url)
+    return name[:-len("-index.htm")] if name.endswith("-index.htm") else name
+
+class FilingCatalog():
+    """
+    sqlite catalog of the downloaded filings of all the ciks, with the cik, form type, filing date,
+    accession number, local path, url, size and sha256 of every document, indexed by cik and by
+    form type, both followed by the filing date.
+    The download.idx of every cik stays the log of its download, and is imported into the catalog
+    as the download finishes, so that a run over many ciks is planned by one query.
+    """
+    def __init__(self, path="filings_catalog.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS filings (id INTEGER PRIMARY KEY, cik TEXT, form_type TEXT, filing_date TEXT,
+                accession TEXT, path TEXT UNIQUE, url TEXT, size INTEGER, hash TEXT);
+            CREATE INDEX IF NOT EXISTS filings_cik ON filings (cik, filing_date);
+            CREATE INDEX IF NOT EXISTS filings_type ON filings (form_type, filing_date);
+            """)
+        self._conn.commit()
+
+    @staticmethod
+    def file_info(filename):
+        """
+        return the (size, sha256) of the content of a downloaded document, or (None, None) if it is missing
+        """
+        if not os.path.exists(filename):
+            return None, None
+        return store.filing_digest(filename)
+
+    def import_index(self, index_file, cik=None):
+        """
+        bring the filings of a cik up to date with its download.idx, the cik is the name of the
+        directory of the index by default. Only the new documents are read for their size and
+        hash. Return the number of documents being added.
+        """
+        path = os.path.normpath(index_file)
+        if cik is None:
+            cik = os.path.basename(os.path.dirname(path))
+        entries = utils.read_index(path) if os.path.exists(path) else OrderedDict()
+        with self._lock:
+            known = set(row[0] for row in self._conn.execute("SELECT path FROM filings WHERE cik = ?", (cik,)))
+        rows = []
+        for filename, dic in entries.items():
+            filename = os.path.normpath(filename)
+            if filename in known:
+                continue
+            size, digest = self.file_info(filename)
+            rows.append((cik, dic["FILLING_TYPE"], iso_date(dic["FILLING_DATE"]), accession_number(dic["FILLING_URL"]),
+                filename, dic["FILLING_URL"], size, digest))
+        paths = set(os.path.normpath(filename) for filename in entries.keys())
+        gone = [(filename,) for filename in known if filename not in paths]
+        with self._lock:
+            self._conn.executemany("DELETE FROM filings WHERE path = ?", gone)
+            self._conn.executemany("""INSERT OR REPLACE INTO filings (cik, form_type, filing_date, accession, path, url,
+                size, hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+            self._conn.commit()
+        if len(rows) > 0 or len(gone) > 0:
+            utils.logger.debug(f"catalog of cik:{cik}: {len(rows)} documents added, {len(gone)} removed")
+        return len(rows)
+
+    def migrate(self, raw_dir="."):
+        """
+        import the download.idx of every cik directory under 'raw_dir', return the number of documents being added
+        """
+        count = 0
+        for index_file in sorted(glob.glob(os.path.join(raw_dir, "*", "download.idx"))):
+            count += self.import_index(index_file)
+        utils.logger.info(f"imported {count} documents under {raw_dir} into the catalog {self.path}")
+        return count
+
+    @staticmethod
+    def _filters(form_types, since_date, to_date):
+        clauses, params = [], []
+        if form_types is not None:
+            clauses.append("form_type IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(sorted(form_types)))
+        if since_date:
+            clauses.append("filing_date >= ?")
+            params.append(iso_date(since_date))
+        if to_date:
+            clauses.append("filing_date <= ?")
+            params.append(iso_date(to_date))
+        return clauses, params
+
+    def documents(self, cik=None, form_types=None, since_date="", to_date=""):
+        """
+        return the documents of a cik, or of all the ciks, in time-asending order as the same map
+        as utils.read_index(), optionally only of some form types during a period
+        """
+        clauses, params = self._filters(form_types, since_date, to_date)
+        if cik is not None:
+            clauses.insert(0, "cik = ?")
+            params.insert(0, cik)
+        where = "WHERE " + " AND ".join(clauses) if len(clauses) > 0 else ""
+        with self._lock:
+            rows = self._conn.execute(f"SELECT path, form_type, filing_date, url FROM filings {where} "
+                "ORDER BY filing_date, id", params).fetchall()
+        return OrderedDict((path, {"FILLING_TYPE": type, "FILLING_DATE": date, "FILLING_URL": url})
+            for path, type, date, url in rows)
+
+    def plan(self, ciks, form_types=None, since_date="", to_date=""):
+        """
+        look up the documents of many ciks by one query, return a map with every cik as key and the
+        map of documents() as value, which is empty for the ciks not downloaded yet
+        """
+        clauses, params = self._filters(form_types, since_date, to_date)
+        clauses.insert(0, "cik IN (SELECT value FROM json_each(?))")
+        params.insert(0, json.dumps(list(ciks)))
+        plan = OrderedDict((cik, OrderedDict()) for cik in ciks)
+        with self._lock:
+            rows = self._conn.execute("SELECT cik, path, form_type, filing_date, url FROM filings WHERE "
+                + " AND ".join(clauses) + " ORDER BY filing_date, id", params).fetchall()
+        for cik, path, type, date, url in rows:
+            plan[cik][path] = {"FILLING_TYPE": type, "FILLING_DATE": date, "FILLING_URL": url}
+        return plan
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+if __name__ == '__main__':
+    # python catalog.py <catalog file> <raw dir>
+    import sys
+    catalog = FilingCatalog(sys.argv[1])
+    catalog.migrate(sys.argv[2] if len(sys.argv) > 2 else ".")
+    catalog.close()
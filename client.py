@@ -0,0 +1,222 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+import aiohttp
+import asyncio
+import atexit,os,random,threading,time
+from collections import namedtuple
+import metrics
+import utils
+
+# point to a local stand-in server for testing
+BASE_URL = os.environ.get("EDGAR_BASE_URL", "https://www.sec.gov")
+# SEC asks every automated client to declare itself, and to stay below 10 requests per second
+USER_AGENT = os.environ.get("EDGAR_USER_AGENT", "edgar-acq admin@example.com")
+MAX_RATE = 10
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# the chunks a streamed response is passed on in, see EdgarClient.stream()
+CHUNK_SIZE = 64 * 1024
+
+Response = namedtuple("Response", ["url", "status", "content"])
+
+class EdgarError(Exception):
+    pass
+
+class RateLimiter():
+    """
+    a token bucket which spaces out the requests so that no more than 'rate' requests
+    are issued per second, no matter how many coroutines are waiting for it.
+    """
+    def __init__(self, rate=MAX_RATE):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next = 0
+        self._lock = None
+
+    async def acquire(self):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            loop = asyncio.get_event_loop()
+            now = loop.time()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = loop.time()
+            self._next = max(now, self._next) + self.interval
+
+class EdgarClient():
+    """
+    asyncio HTTP client for EDGAR which keeps a pool of keep-alive connections, enforces one
+    requests-per-second budget shared by all the companies, and retries 429/5xx responses with
+    jittered exponential backoff.
+    The coroutines run in a background event loop, so the blocking get()/submit() methods
+    could be called from any thread; point 'base_url' to a local server for testing.
+    """
+    def __init__(self, base_url=BASE_URL, rate=MAX_RATE, connections=8, retries=4, backoff=0.5, timeout=20,
+            user_agent=USER_AGENT):
+        self.base_url = base_url.rstrip("/")
+        self.connections = connections
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.limiter = RateLimiter(rate)
+        self._session = None
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="edgar-client", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def _get_session(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.connections, ssl=False, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": self.user_agent, "Accept-Encoding": "gzip, deflate"})
+        return self._session
+
+    def _get_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # full jitter around the exponential backoff
+        return self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    async def fetch(self, url):
+        """
+        fetch the url and return a Response; 429/5xx responses and connection errors are retried,
+        and EdgarError is raised once the retries are exhausted.
+        Every attempt is recorded as an 'http' call with the latency and the bytes of the response,
+        the wait for the rate limiter is not.
+        """
+        session = self._get_session()
+        error = None
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            retry_after = None
+            start = time.perf_counter()
+            try:
+                async with session.get(url) as resp:
+                    content = await resp.read()
+                    metrics.default_metrics().add("http", time.perf_counter() - start, len(content))
+                    if resp.status not in RETRY_STATUS:
+                        return Response(url, resp.status, content)
+                    retry_after = resp.headers.get("Retry-After")
+                    error = f"HTTP {resp.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.default_metrics().add("http", time.perf_counter() - start)
+                error = repr(e)
+            if attempt < self.retries:
+                delay = self._get_delay(attempt, retry_after)
+                utils.logger.warning(f"\t{error} for {url}, retry in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+        raise EdgarError(f"Failed to fetch {url} after {self.retries + 1} attempts: {error}")
+
+    async def fetch_chunks(self, url, feed, chunk_size=CHUNK_SIZE):
+        """
+        fetch the url and pass its content to 'feed' chunk by chunk as it arrives, return the HTTP status;
+        the content of any other status than 200 isn't fed. 429/5xx responses and connection errors are
+        retried like fetch() until the first chunk is fed, and EdgarError is raised after that.
+        """
+        session = self._get_session()
+        error = None
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            retry_after = None
+            start = time.perf_counter()
+            size = 0
+            try:
+                async with session.get(url) as resp:
+                    if resp.status not in RETRY_STATUS:
+                        if resp.status == 200:
+                            async for chunk in resp.content.iter_chunked(chunk_size):
+                                size += len(chunk)
+                                feed(chunk)
+                        metrics.default_metrics().add("http", time.perf_counter() - start, size)
+                        return resp.status
+                    await resp.read()
+                    metrics.default_metrics().add("http", time.perf_counter() - start)
+                    retry_after = resp.headers.get("Retry-After")
+                    error = f"HTTP {resp.status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.default_metrics().add("http", time.perf_counter() - start, size)
+                error = repr(e)
+                if size > 0:
+                    raise EdgarError(f"Failed to stream {url} after {size} bytes: {error}")
+            if attempt < self.retries:
+                delay = self._get_delay(attempt, retry_after)
+                utils.logger.warning(f"\t{error} for {url}, retry in {delay:.1f}s...")
+                await asyncio.sleep(delay)
+        raise EdgarError(f"Failed to fetch {url} after {self.retries + 1} attempts: {error}")
+
+    async def fetch_all(self, urls):
+        return await asyncio.gather(*[self.fetch(url) for url in urls])
+
+    def submit(self, url):
+        """
+        schedule the fetching of the url and return a concurrent.futures.Future of the Response
+        """
+        return asyncio.run_coroutine_threadsafe(self.fetch(url), self._get_loop())
+
+    def get(self, url):
+        return self.submit(url).result()
+
+    def stream(self, url, feed, chunk_size=CHUNK_SIZE):
+        """
+        the blocking fetch_chunks(), where 'feed' is called in the thread of the event loop
+        """
+        return asyncio.run_coroutine_threadsafe(self.fetch_chunks(url, feed, chunk_size), self._get_loop()).result()
+
+    def get_all(self, urls):
+        return asyncio.run_coroutine_threadsafe(self.fetch_all(urls), self._get_loop()).result()
+
+    def close(self):
+        with self._lock:
+            loop = self._loop
+            self._loop = None
+        if loop is None:
+            return
+        if self._session is not None:
+            asyncio.run_coroutine_threadsafe(self._session.close(), loop).result()
+            self._session = None
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+_default_client = None
+_default_lock = threading.Lock()
+
+def default_client():
+    """
+    the client shared by all the Company instances, so that they stay within one rate budget
+    """
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = EdgarClient()
+            atexit.register(_default_client.close)
+        return _default_client
+
+def configure_default_client(**kwargs):
+    """
+    replace the shared client with one built from the EdgarClient arguments, e.g. a worker process
+    takes its share of the rate budget with configure_default_client(rate=MAX_RATE / processes)
+    """
+    global _default_client
+    client = EdgarClient(**kwargs)
+    with _default_lock:
+        old = _default_client
+        _default_client = client
+    # the event loop thread of a client inherited by a forked process is not running
+    if old is not None and old._thread is not None and old._thread.is_alive():
+        old.close()
+    atexit.register(client.close)
+    return client
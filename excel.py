@@ -51,18 +51,12 @@ class TestMainFlow(unittest.TestCase):
                 index_file = company.download_documents(since_date, to_date, filling_types, raw_dir)
             # grep the target name in case-sensitive way. or set flags = re.IGNORECASE for a case-insensitive search
             ana = Analysis(target_name, index_file)
-            docs = ana.locate_target_documents(flags)
             doc_found = ""
             row = 1
-            # parse the html and locate the acquisition paragraph
-            for filename, dict in docs.items():
+            # parse the html and locate the acquisition paragraph, the documents are scanned one by one
+            # and the ones after the acquisition report are only listed without being analyzed
+            for filename, dict, info in ana.iter_acquisition_reports(flags, list_rest=True):
                 row = row + 1
-                if doc_found != "":
-                    worksheet.write_url(f"A{row}", dict['FILLING_URL'], string=filename)
-                    continue
-
-                utils.logger.info(f'\tfound {target_name} in {filename}, analyzing...')
-                info = ana.extract_assets(filename, flags)
                 if  info is None:
                     worksheet.write_url(f"A{row}", dict['FILLING_URL'], string=filename)
                     continue
@@ -1,55 +1,108 @@
 #!/usr/bin/Python
 # -*- coding: utf-8 -*
 
-import requests
+from client import default_client, EdgarError
+from cache import default_cache
 from lxml import html, etree
 from bs4 import BeautifulSoup
-from collections import OrderedDict
-from datetime import datetime
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
 import os.path
 
+from submission import SubmissionSplitter, submission_url
 import utils
 
 MAX_ITEMS = 100
-BASE_URL = "https://www.sec.gov"
+# number of 'Filling Detail' pages fetched ahead of the document being downloaded
+PREFETCH = 8
 
 class Company():
 
-    def __init__(self, cik):
+    def __init__(self, cik, client=None, cache=None):
         self.cik = cik
-        self.url = f"https://www.sec.gov/cgi-bin/browse-edgar?action=getcompany&CIK={cik}"
-        self._get_company_info()
-        self.base_url = f"https://www.sec.gov"
+        self.client = client if client is not None else default_client()
+        self.cache = cache if cache is not None else default_cache()
+        self.base_url = self.client.base_url
+        self.url = f"{self.base_url}/cgi-bin/browse-edgar?action=getcompany&CIK={cik}"
+        # the filings discovered in the full index during a period, see use_fillings()
+        self.fillings = None
+        # the name/sic/us_state loaded on the first access, see info
+        self._info = None
 
-    def _get_company_info(self):
-        page = requests.get(self.url, verify=False, timeout=20)
-        soap = BeautifulSoup(page.content, "html.parser")
-        tag = soap.find('span',class_='companyName')
-        if tag is None:
-            utils.logger.error(f"Failed to locate the 'companyName' tag for cik:{self.cik}, is it an INVALID cik?")
-            return
+    @property
+    def info(self):
+        """
+        the metadata of the company, a map of 'name', 'sic' and 'us_state', which is looked up in the
+        cache by cik or fetched from the browse-edgar page on the first access, so that a Company only
+        downloading the documents never requests it
+        """
+        if self._info is None:
+            self._info = self.cache.get_parsed(self.url, "company")
+            if self._info is None:
+                self._info = self._get_company_info(self.client.get(self.url).content)
+        return self._info
+
+    @property
+    def name(self):
+        return self.info.get("name")
 
-        info = tag.text
-        pos = info.find('CIK#')
-        if pos is not None:
-            self.name = info[0: pos-1]
+    @property
+    def sic(self):
+        return self.info.get("sic")
+
+    @property
+    def us_state(self):
+        return self.info.get("us_state")
+
+    def _get_company_info(self, content):
+        """
+        parse the metadata out of the browse-edgar page, and keep it in the cache unless it is an
+        invalid cik
+        """
+        page = html.fromstring(content)
+        tags = page.xpath("//span[@class='companyName']")
+        if len(tags) == 0:
+            utils.logger.error(f"Failed to locate the 'companyName' tag for cik:{self.cik}, is it an INVALID cik?")
+            return {}
+        info = {"name": None, "sic": "", "us_state": ""}
+        text = tags[0].text_content()
+        pos = text.find('CIK#')
+        if pos >= 0:
+            info["name"] = text[0: pos].strip()
         else:
             utils.logger.warning("failed to figure out company name for CIK:" + self.cik)
-        html_page = html.fromstring(page.content)
-        companyInfo = html_page.xpath("//div[@class='companyInfo']")[0] if html_page.xpath("//div[@class='companyInfo']") else None
-        if companyInfo is not None:
-          indentInfo = companyInfo.getchildren()[1]
-          self.sic = indentInfo.getchildren()[1].text if len(indentInfo.getchildren()) > 2 else ""
-          self.us_state = indentInfo.getchildren()[3].text if len(indentInfo.getchildren()) > 4 else ""
-    
+        companyInfo = page.xpath("//div[@class='companyInfo']")
+        if len(companyInfo) > 0 and len(companyInfo[0]) > 1:
+            indentInfo = list(companyInfo[0][1])
+            info["sic"] = indentInfo[1].text if len(indentInfo) > 2 else ""
+            info["us_state"] = indentInfo[3].text if len(indentInfo) > 4 else ""
+        self.cache.put(self.url, "company", parsed=info)
+        return info
+
     @staticmethod
-    def try_parsing_date(text):
-        for fmt in ('%Y/%m/%d', '%Y-%m-%d', '%d.%m.%Y', '%Y/%m/%d %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%d.%m.%y %H:%M:%S'):
+    def prefetch_info(ciks, client=None, cache=None):
+        """
+        load the metadata of many companies at once, where the ones missing from the cache are requested
+        concurrently within the rate budget of the client. Return a map with cik as key and the Company,
+        whose info is loaded, as value; a company failed to be fetched is logged and left out.
+        """
+        companies = OrderedDict((cik, Company(cik, client, cache)) for cik in OrderedDict.fromkeys(ciks))
+        futures = OrderedDict((cik, company.client.submit(company.url)) for cik, company in companies.items()
+            if not company.cache.contains(company.url, "company"))
+        utils.logger.info(f"fetching the metadata of {len(futures)} of {len(companies)} companies...")
+        for cik, future in futures.items():
             try:
-                return datetime.strptime(text, fmt)
-            except ValueError:
-                pass
-        raise ValueError('no valid date format found')
+                companies[cik]._info = companies[cik]._get_company_info(future.result().content)
+            except Exception as e:
+                utils.logger.error(f"Failed to fetch the metadata of cik:{cik}...\n{utils.traceback.format_exc()}")
+                del companies[cik]
+        for company in companies.values():
+            company.info
+        return companies
+
+    @staticmethod
+    def try_parsing_date(text):
+        return utils.try_parsing_date(text)
 
     def _get_filings_url(self, filing_type="", prior_to="", ownership="include", no_of_entries=MAX_ITEMS):
         url = self.url + "&type=" + filing_type + "&dateb=" + prior_to + "&owner=" +  ownership + "&count=" + str(no_of_entries)
@@ -57,7 +110,7 @@ class Company():
 
     def get_all_filings_page(self, filing_type="", prior_to="", ownership="include", no_of_entries=MAX_ITEMS):
       url = self._get_filings_url(filing_type, prior_to, ownership, no_of_entries)
-      page = requests.get(url, verify=False, timeout=20)
+      page = self.client.get(url)
       return page
     
     def get_search_results(self, filing_type="", prior_to="", ownership="include", no_of_entries=MAX_ITEMS):
@@ -65,6 +118,10 @@ class Company():
         get the url of 'Filling Detail' pages in time-desending order in a map with url as key and 
         'FILLING_TYPE'/'FILLING_DESC'/'FILLING_DATE'/'FILLING_NO' as dictionary keyed-values
         """
+        url = self._get_filings_url(filing_type, prior_to, ownership, no_of_entries)
+        ordered_dict = self.cache.get_parsed(url, "listing")
+        if ordered_dict is not None:
+            return ordered_dict
         page = self.get_all_filings_page(filing_type, prior_to, ownership, no_of_entries)
         soap = BeautifulSoup(page.content, "html.parser")
         table = soap.find('table', class_='tableFile2')
@@ -85,46 +142,85 @@ class Company():
                 dic["FILLING_NO"] = cells[4].text
                 utils.logger.debug("\t%s\t%s\t%s", dic["FILLING_DATE"], dic["FILLING_TYPE"], url)
                 ordered_dict[url] = dic
+            self.cache.put(page.url, "listing", page.content, ordered_dict)
         return ordered_dict
 
+    @staticmethod
+    def type_matches(type, filling_types):
+        return any([type in type2 for type2 in filling_types])
+
+    def use_fillings(self, docs, since_date, to_date=""):
+        """
+        search the filings discovered during a period, like by FullIndex.discover(), instead of the
+        browse-edgar listing; the time-frames out of the period are still searched in the listing
+        """
+        since = self.try_parsing_date(since_date)
+        to = self.try_parsing_date(to_date) if to_date != "" else self.today()
+        self.fillings = (since, to, docs)
+
     def search_fillings(self, since_date, to_date="", filling_types={"10-K","10-Q","8-K"}):
         """
         get the url of 'Filling Detail' pages for specified document types during a time-frame.
         The result is returned in time-desending order in a map with url as key and 
         'FILLING_TYPE'/'FILLING_DESC'/'FILLING_DATE'/'FILLING_NO' as dictionary keyed-values.
         """
+        if self.fillings is not None:
+            since, to, docs = self.fillings
+            if since <= self.try_parsing_date(since_date) and (to_date != "" and self.try_parsing_date(to_date) <= to):
+                since, to = self.try_parsing_date(since_date), self.try_parsing_date(to_date)
+                return OrderedDict((url, dic) for url, dic in docs.items() if self.type_matches(dic["FILLING_TYPE"], filling_types)
+                    and since <= self.try_parsing_date(dic["FILLING_DATE"]) <= to)
         matched_docs = OrderedDict()
         oldest_date = to_date
         since = self.try_parsing_date(since_date)
+        seen_urls = set()
         query_more = True
         while query_more:
             docs = self.get_search_results(prior_to=oldest_date)
             utils.logger.debug("...fetched %s items from sever prior to %s", len(docs), oldest_date)
-            oldest = datetime.strptime(oldest_date, '%Y/%m/%d')
+            prior_to = oldest_date
+            new_urls = 0
+            oldest = None
             for url,dic in docs.items():
                 type = dic["FILLING_TYPE"]
                 date = self.try_parsing_date(dic["FILLING_DATE"])
                 oldest_date = date.strftime('%Y/%m/%d')
                 oldest = date
-                if date >= since:
-                    if any([type in type2 for type2 in filling_types]):
-                        matched_docs[url] = dic
-                else:
+                if date < since:
                     break
+                # the next page starts at the oldest date of this one, which repeats its last filings
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                new_urls += 1
+                if self.type_matches(type, filling_types):
+                    matched_docs[url] = dic
             
             utils.logger.debug("...oldest item been handled:" + oldest_date)
-            query_more = oldest >= since
+            # the listing is exhausted once a page has nothing new or doesn't go any further back
+            query_more = oldest is not None and oldest >= since and new_urls > 0 and oldest_date != prior_to
             utils.logger.debug("...query_more? %s", query_more)
         return matched_docs
 
-    def get_document_urls(self, detail_url, type):
+    def get_document_urls(self, detail_url, type, page=None):
+        """
+        parse out the url of the document format file from the 'Filling Detail' page, the
+        page is fetched unless a prefetched one is given or its parsed result is cached
+        """
+        documents = self.cache.get_parsed(detail_url, "detail")
+        if documents is None:
+            documents = self._parse_document_urls(detail_url, page)
+        return [url for url, doc_type in documents if type == doc_type]
+
+    def _parse_document_urls(self, detail_url, page=None):
         """
-        parse out the url of the document format file from the 'Filling Detail' page
+        return the [url, type] pairs listed in the 'Document Format Files' table
         """
-        page = requests.get(detail_url, verify=False, timeout=20)
+        if page is None:
+            page = self.client.get(detail_url)
         soap = BeautifulSoup(page.content, "html.parser")
         table = soap.find('table', summary='Document Format Files')
-        urls = []
+        documents = []
         if table is not None:
             rows = table.find_all('tr')
             if len(rows) == 0:
@@ -136,45 +232,282 @@ class Company():
                 # url is the first hyperlink
                 url = self.base_url + cells[2].a['href']
                 doc_type = cells[3].text
-                if type == doc_type:
-                    urls.append(url)
+                documents.append([url, doc_type])
+            self.cache.put(detail_url, "detail", page.content, documents)
         else:
             utils.logger.error("Failed to locate the table in page:%s", detail_url)
-        return urls
+        return documents
 
     @staticmethod
-    def download_document(url, dir, prefix=""):
+    def download_document(url, dir, prefix="", client=None, store=None):
+        """
+        download a document into 'dir', and return its filename.
+        With a FilingStore, the document is kept compressed in the store, and the returned filename
+        (with the suffix of the codec) links to it.
+        """
         dir = os.path.normpath(dir)
-        if len(prefix) is not 0:
-            filename = prefix.strip() + "_" + os.path.basename(url)
+        filename = os.path.basename(url)
+        if len(prefix) != 0:
+            filename = prefix.strip() + "_" + filename
         filename = os.path.join(dir, filename)
-        page = requests.get(url, verify=False, timeout=20)
-        with open(filename, "wb") as input:
+        # filings never change, the file left by an earlier run is as good as a new one
+        if store is not None and os.path.exists(filename + store.suffix):
+            return filename + store.suffix
+        if os.path.exists(filename):
+            return filename
+        if client is None:
+            client = default_client()
+        page = client.get(url)
+        if store is not None:
+            return store.link(page.content, filename)
+        with open(filename + ".tmp", "wb") as input:
             input.write(page.content)
+        os.replace(filename + ".tmp", filename)
         return filename
 
-    def download_documents(self, since_date, to_date, filling_types = {"10-K", "10-Q"}, root_dir="."):
+    def download_submission(self, detail_url, type, dir, prefix="", store=None):
         """
-        download documents of the specified types during a period, and return an index file recording details
-        about all the files being downloaded in time desending order.
+        download the complete submission text file of a filing in one request, instead of its 'Filling Detail'
+        page and then its documents, and return the filenames of its documents of the 'type', which are
+        split out of it while it is streamed, see SubmissionSplitter
+        """
+        url = submission_url(detail_url)
+        splitter = SubmissionSplitter(os.path.normpath(dir), {type}, prefix, store)
+        try:
+            status = self.client.stream(url, splitter.feed)
+        finally:
+            filenames = splitter.close()
+        if status != 200:
+            raise EdgarError(f"Failed to fetch {url}: HTTP {status}")
+        if len(filenames) == 0:
+            utils.logger.warning(f"no {type} document found in {url}")
+        return filenames
+
+    @staticmethod
+    def index_incomplete(result_dir):
+        """
+        check whether the download.idx in a cik directory was left by a cancelled or failed download,
+        so that the later filings of the period are missing from it
+        """
+        return os.path.exists(os.path.join(result_dir, "download.idx.incomplete"))
+
+    @staticmethod
+    def read_existing_index(result_dir):
+        """
+        read the entries of the download.idx, or of the download.idx.part left by a cancelled
+        download, in a cik directory
+        """
+        logfilename = os.path.join(result_dir, "download.idx")
+        for filename in (logfilename, logfilename + ".part"):
+            if os.path.exists(filename):
+                return utils.read_index(filename)
+        return OrderedDict()
+
+    @staticmethod
+    def _read_periods_file(result_dir):
+        """
+        read the download.idx.periods of a cik directory into a map with the sorted document types
+        as key and the list of searched (since, to) dates as value
+        """
+        periodsfilename = os.path.join(result_dir, "download.idx.periods")
+        periods = {}
+        if os.path.exists(periodsfilename):
+            with open(periodsfilename, 'r', encoding="UTF-8") as input:
+                for line in input:
+                    items = line.rstrip("\n").split("\t")
+                    if len(items) < 3:
+                        continue
+                    periods.setdefault(items[2], []).append((Company.try_parsing_date(items[0]),
+                        Company.try_parsing_date(items[1])))
+        return periods
+
+    @staticmethod
+    def read_searched_periods(result_dir, filling_types):
+        """
+        read the periods searched for (at least) the specified document types, whose filings are all in
+        the download.idx of a cik directory, as a sorted list of (since, to) dates without overlaps
+        """
+        periods = []
+        for types, dates in Company._read_periods_file(result_dir).items():
+            if set(filling_types) <= set(types.split(",")):
+                periods += dates
+        return Company.merge_periods(periods)
+
+    @staticmethod
+    def merge_periods(periods):
+        """
+        merge the overlapping or adjacent (since, to) periods into a sorted list
+        """
+        merged = []
+        for since, to in sorted(periods):
+            if len(merged) > 0 and since <= merged[-1][1] + timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], to))
+            else:
+                merged.append((since, to))
+        return merged
+
+    @staticmethod
+    def write_searched_periods(result_dir, filling_types, since, to):
+        """
+        record that the filings of the specified types from 'since' to 'to' are all in the download.idx
+        """
+        periods = Company._read_periods_file(result_dir)
+        periods.setdefault(",".join(sorted(filling_types)), []).append((since, to))
+        periodsfilename = os.path.join(result_dir, "download.idx.periods")
+        with open(periodsfilename + ".tmp", 'w', encoding="UTF-8") as output:
+            for types, dates in periods.items():
+                for since, to in Company.merge_periods(dates):
+                    output.write(f'{since.strftime("%Y/%m/%d")}\t{to.strftime("%Y/%m/%d")}\t{types}\n')
+        os.replace(periodsfilename + ".tmp", periodsfilename)
+
+    def search_missing_fillings(self, since_date, to_date, filling_types, existing, periods=None):
+        """
+        get the 'Filling Detail' pages during a time-frame which are not in the 'existing' index
+        entries, in time-desending order. Only the gaps between the already searched 'periods'
+        are searched, an index without any recorded period is searched for the whole time-frame.
+        """
+        since = self.try_parsing_date(since_date)
+        to = self.try_parsing_date(to_date) if to_date != "" else self.today()
+        gaps = []
+        for period_since, period_to in (periods if periods is not None else []):
+            if period_since > since:
+                gaps.append((since, min(to, period_since - timedelta(days=1))))
+            since = max(since, period_to + timedelta(days=1))
+            if since > to:
+                break
+        if since <= to:
+            gaps.append((since, to))
+        docs = OrderedDict()
+        for gap_since, gap_to in reversed(gaps):
+            if gap_since > gap_to:
+                continue
+            utils.logger.debug(f"	searching filings from {gap_since:%Y/%m/%d} to {gap_to:%Y/%m/%d} for cik:{self.cik}")
+            docs.update(self.search_fillings(gap_since.strftime('%Y/%m/%d'), gap_to.strftime('%Y/%m/%d'), filling_types))
+        known_urls = {dic["FILLING_URL"] for dic in existing.values()}
+        for url in known_urls:
+            docs.pop(url, None)
+        utils.logger.info(f"\t{len(docs)} new filings found for cik:{self.cik} besides {len(existing)} indexed documents")
+        return docs
+
+    @staticmethod
+    def today():
+        return datetime.combine(datetime.now().date(), datetime.min.time())
+
+    def iter_documents(self, since_date, to_date, filling_types = {"10-K", "10-Q"}, root_dir=".", cancel_event=None,
+            incremental=False, store=None, catalog=None, submission=False):
+        """
+        download documents of the specified types during a period from oldest to latest, and yield
+        the index entry of each file as soon as it lands on disk, so that the caller could scan it
+        while the rest are still being downloaded.
+        In incremental mode, only the filings missing from the existing index are downloaded, and
+        the indexed documents are yielded in time order together with the new ones.
+        The download stops early once the 'cancel_event' is set or the generator is closed, in which
+        case 'download.idx' still records all the documents on disk, and 'download.idx.incomplete'
+        marks it as missing the later filings of the period.
+        The periods whose filings are all indexed are kept in 'download.idx.periods', so that the
+        next incremental download only searches the rest.
+        With a FilingStore, the documents are kept compressed and deduplicated in it.
+        With a FilingCatalog, the index is imported into it once the download finishes or stops.
+        With 'submission', every filing is retrieved by its complete submission text file, see
+        download_submission(), so the 'Filling Detail' pages are never fetched.
         """
-        docs = self.search_fillings(since_date=since_date, to_date=to_date, filling_types=filling_types)
         result_dir = os.path.normpath(os.path.join(root_dir, self.cik))
+        existing = self.read_existing_index(result_dir) if incremental else OrderedDict()
+        periods = self.read_searched_periods(result_dir, filling_types) if incremental else []
+        docs = self.search_missing_fillings(since_date, to_date, filling_types, existing, periods)
+        since = self.try_parsing_date(since_date)
+        to = self.try_parsing_date(to_date) if to_date != "" else datetime.max
         os.makedirs(result_dir, exist_ok=True)
-        logfilename = os.path.normpath(os.path.join(result_dir, "download.idx")) 
-        logfile = open(logfilename, 'w', encoding="UTF-8")
-        # download the documents from oldest to latest
-        for detail_url,dic in reversed(docs.items()):
-            type = dic["FILLING_TYPE"]
-            date = dic["FILLING_DATE"]
-            date_prefix = str(date)
-            for sub in (":", "-", "/", "."):
-                date_prefix = date_prefix.replace(sub,"")
-    
-            for url in self.get_document_urls(detail_url, type):
-                filename = self.download_document(url, result_dir, date_prefix)
-                line = f'{type}\t{date}\t{filename}\t{detail_url}\n'
-                logfile.write(line)
-        logfile.close()
-        return logfilename
-    
+        logfilename = os.path.normpath(os.path.join(result_dir, "download.idx"))
+        partfilename = logfilename + ".part"
+        markerfilename = logfilename + ".incomplete"
+        completed = False
+        filings = deque(reversed(docs.items()))
+        indexed = deque(sorted(existing.items(), key=lambda item: self.try_parsing_date(item[1]["FILLING_DATE"])))
+        # the detail pages are small, keep a few of them in flight while downloading
+        pending = deque()
+        # the filing being downloaded
+        current = None
+        try:
+            with open(partfilename, 'w', encoding="UTF-8") as logfile:
+                try:
+                    # download the documents from oldest to latest
+                    while len(filings) > 0 or len(pending) > 0 or len(indexed) > 0:
+                        while len(filings) > 0 and len(pending) < PREFETCH:
+                            detail_url,dic = filings.popleft()
+                            future = None
+                            if not submission and not self.cache.contains(detail_url, "detail"):
+                                future = self.client.submit(detail_url)
+                            pending.append((detail_url, dic, future))
+                        if cancel_event is not None and cancel_event.is_set():
+                            utils.logger.info(f"\tdownloading cancelled for cik:{self.cik}")
+                            for _,_,future in pending:
+                                if future is not None:
+                                    future.cancel()
+                            break
+                        # the indexed documents no later than the next filing are passed through
+                        if len(indexed) > 0 and (len(pending) == 0 or
+                                self.try_parsing_date(indexed[0][1]["FILLING_DATE"]) <= self.try_parsing_date(pending[0][1]["FILLING_DATE"])):
+                            filename,dic = indexed.popleft()
+                            logfile.write(f'{dic["FILLING_TYPE"]}\t{dic["FILLING_DATE"]}\t{filename}\t{dic["FILLING_URL"]}\n')
+                            # the index keeps the documents out of the period, but they are not reported
+                            if since <= self.try_parsing_date(dic["FILLING_DATE"]) <= to:
+                                yield filename, dic
+                            continue
+                        detail_url,dic,future = pending.popleft()
+                        current = dic
+                        type = dic["FILLING_TYPE"]
+                        date = dic["FILLING_DATE"]
+                        date_prefix = str(date)
+                        for sub in (":", "-", "/", "."):
+                            date_prefix = date_prefix.replace(sub,"")
+
+                        if submission:
+                            filenames = self.download_submission(detail_url, type, result_dir, date_prefix, store)
+                        else:
+                            page = future.result() if future is not None else None
+                            filenames = (self.download_document(url, result_dir, date_prefix, self.client, store)
+                                for url in self.get_document_urls(detail_url, type, page))
+                        for filename in filenames:
+                            line = f'{type}\t{date}\t{filename}\t{detail_url}\n'
+                            logfile.write(line)
+                            logfile.flush()
+                            yield filename, {"FILLING_TYPE": type, "FILLING_DATE": date, "FILLING_URL": detail_url}
+                        current = None
+                    else:
+                        completed = True
+                finally:
+                    # the indexed documents which are not passed through yet stay in the index
+                    for filename,dic in indexed:
+                        logfile.write(f'{dic["FILLING_TYPE"]}\t{dic["FILLING_DATE"]}\t{filename}\t{dic["FILLING_URL"]}\n')
+        finally:
+            # the index records the documents downloaded so far, even if the download is cancelled or failed
+            os.replace(partfilename, logfilename)
+            if catalog is not None:
+                catalog.import_index(logfilename, self.cik)
+            if completed:
+                if os.path.exists(markerfilename):
+                    os.remove(markerfilename)
+            else:
+                open(markerfilename, 'w').close()
+            if not incremental and os.path.exists(logfilename + ".periods"):
+                os.remove(logfilename + ".periods")
+            # the period searched is covered up to the first filing not downloaded
+            searched_to = to if to_date != "" else self.today()
+            remaining = ([current] if current is not None else []) + [dic for _,dic,_ in pending] + [dic for _,dic in filings]
+            if not completed and len(remaining) > 0:
+                searched_to = min(searched_to, self.try_parsing_date(remaining[0]["FILLING_DATE"]) - timedelta(days=1))
+            if since <= searched_to:
+                self.write_searched_periods(result_dir, filling_types, since, searched_to)
+
+    def download_documents(self, since_date, to_date, filling_types = {"10-K", "10-Q"}, root_dir=".", incremental=False,
+            store=None, catalog=None, submission=False):
+        """
+        download documents of the specified types during a period, and return an index file recording details
+        about all the files being downloaded in time asending order.
+        In incremental mode, only the filings missing from the existing index are downloaded and merged into it.
+        """
+        for _ in self.iter_documents(since_date, to_date, filling_types, root_dir, incremental=incremental, store=store,
+                catalog=catalog, submission=submission):
+            pass
+        return os.path.normpath(os.path.join(root_dir, self.cik, "download.idx"))
@@ -0,0 +1,148 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from client import default_client, EdgarError
+from collections import OrderedDict
+from datetime import datetime
+from fillings import Company
+import os
+
+import utils
+
+# the kinds of the quarterly index files, 'master' is pipe delimited and 'form' is sorted by form type
+KINDS = ("master", "form")
+
+def parse_master(data):
+    """
+    yield the (cik, company name, form type, date filed, filename) of every filing listed in a master.idx
+    """
+    started = False
+    for line in data.decode("latin-1").splitlines():
+        if not started:
+            # the entries follow the dashed line under the header
+            started = line.startswith("-----")
+            continue
+        items = line.split("|")
+        if len(items) != 5:
+            continue
+        yield items[0].strip(), items[1].strip(), items[2].strip(), items[3].strip(), items[4].strip()
+
+def parse_form(data):
+    """
+    yield the same as parse_master() from a form.idx, whose columns are aligned with the header
+    """
+    name_column = None
+    started = False
+    for line in data.decode("latin-1").splitlines():
+        if name_column is None:
+            if line.startswith("Form Type"):
+                name_column = line.index("Company Name")
+            continue
+        if not started:
+            started = line.startswith("-----")
+            continue
+        if len(line.strip()) == 0:
+            continue
+        # a long company name pushes the later columns, so they are split from the right
+        items = line[name_column:].rsplit(None, 3)
+        if len(items) < 4:
+            continue
+        yield items[1], items[0].strip(), line[:name_column].strip(), items[2], items[3]
+
+PARSERS = {"master": parse_master, "form": parse_form}
+
+def normalize_cik(cik):
+    return str(cik).strip().lstrip("0")
+
+def quarters(since, to):
+    """
+    yield the (year, quarter) tuples covering the period
+    """
+    year, qtr = since.year, (since.month - 1) // 3 + 1
+    while (year, qtr) <= (to.year, (to.month - 1) // 3 + 1):
+        yield year, qtr
+        year, qtr = (year, qtr + 1) if qtr < 4 else (year + 1, 1)
+
+def quarter_end(year, qtr):
+    return datetime(year + 1, 1, 1) if qtr == 4 else datetime(year, 3 * qtr + 1, 1)
+
+class FullIndex():
+    """
+    discover the filings of many ciks at once from the quarterly full-index files of EDGAR,
+    instead of paging through the browse-edgar listing of every cik.
+    The index files are kept under 'index_dir' in the same layout as EDGAR, '<year>/QTR<n>/<kind>.idx',
+    so a quarter is fetched once, or read from local copies of the files. The copy of a quarter
+    which was not over when it was fetched is fetched again, as EDGAR appends to it every day.
+    """
+    def __init__(self, index_dir="full-index", kind="master", client=None):
+        if kind not in KINDS:
+            raise ValueError(f"unknown index kind {kind}, choose one of {', '.join(KINDS)}")
+        self.index_dir = index_dir
+        self.kind = kind
+        self.client = client if client is not None else default_client()
+
+    def index_url(self, year, qtr):
+        return f"{self.client.base_url}/Archives/edgar/full-index/{year}/QTR{qtr}/{self.kind}.idx"
+
+    def index_file(self, year, qtr):
+        return os.path.join(self.index_dir, str(year), f"QTR{qtr}", f"{self.kind}.idx")
+
+    def read_quarter(self, year, qtr):
+        """
+        return the content of the index file of a quarter, which is fetched unless a complete local copy exists
+        """
+        filename = self.index_file(year, qtr)
+        if os.path.exists(filename) and datetime.fromtimestamp(os.path.getmtime(filename)) >= quarter_end(year, qtr):
+            with open(filename, 'rb') as input:
+                return input.read()
+        if datetime.now() < datetime(year, 3 * qtr - 2, 1):
+            return b""
+        url = self.index_url(year, qtr)
+        utils.logger.info(f"\tfetching the full index {url}...")
+        page = self.client.get(url)
+        if page.status != 200:
+            raise EdgarError(f"Failed to fetch {url}: HTTP {page.status}")
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename + ".tmp", "wb") as output:
+            output.write(page.content)
+        os.replace(filename + ".tmp", filename)
+        return page.content
+
+    def detail_url(self, filename):
+        """
+        return the url of the 'Filling Detail' page of a filing from its filename in the index,
+        like edgar/data/1750/0001047469-06-011256.txt
+        """
+        dir, name = os.path.split(filename)
+        accession = os.path.splitext(name)[0]
+        return f"{self.client.base_url}/Archives/{dir}/{accession.replace('-', '')}/{accession}-index.htm"
+
+    def discover(self, ciks, since_date, to_date="", filling_types={"10-K", "10-Q", "8-K"}):
+        """
+        get the 'Filling Detail' pages of the specified document types during a time-frame for all
+        the ciks at once. Return a map with every cik as key and, as value, the same map as
+        Company.search_fillings() in time-desending order.
+        """
+        since = Company.try_parsing_date(since_date)
+        to = Company.try_parsing_date(to_date) if to_date != "" else Company.today()
+        keys = {normalize_cik(cik): cik for cik in ciks}
+        found = {cik: [] for cik in ciks}
+        for year, qtr in quarters(since, to):
+            count = 0
+            for cik, name, type, date, filename in PARSERS[self.kind](self.read_quarter(year, qtr)):
+                key = keys.get(normalize_cik(cik))
+                if key is None or not Company.type_matches(type, filling_types):
+                    continue
+                filing_date = Company.try_parsing_date(date)
+                if filing_date < since or filing_date > to:
+                    continue
+                accession = os.path.splitext(os.path.basename(filename))[0]
+                found[key].append((filing_date, accession, self.detail_url(filename),
+                    {"FILLING_TYPE": type, "FILLING_DESC": name, "FILLING_DATE": date, "FILLING_NO": accession}))
+                count += 1
+            utils.logger.debug(f"\t{count} filings found in {year}/QTR{qtr}")
+        discovered = OrderedDict()
+        for cik, filings in found.items():
+            filings.sort(key=lambda filing: (filing[0], filing[1]), reverse=True)
+            discovered[cik] = OrderedDict((url, dic) for _, _, url, dic in filings)
+        return discovered
@@ -0,0 +1,116 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from collections import OrderedDict
+from datetime import datetime
+import json,sqlite3,threading
+import sinks
+import utils
+
+# how a spec ended, and the stages it could fail in
+DONE = "done"
+FAILED = "failed"
+STAGES = ("download", "extract")
+# the modes of pending(): run the specs not done yet, or only the failed ones
+MODES = ("resume", "failed")
+
+class RunJournal():
+    """
+    durable checkpoint journal of a long run over the specs: the outcome of every spec and its
+    records are committed as soon as its cik is done, so that an interrupted run resumes with the
+    specs not done yet, and the report is rebuilt from the journal without running the rest again.
+    A spec fails in the 'download' stage if the documents of its cik failed to be downloaded, or in
+    the 'extract' stage if the extraction failed on any of its documents which are reported.
+    """
+    def __init__(self, path="acq_journal.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS specs (cik TEXT, target_name TEXT, status TEXT, stage TEXT, error TEXT,
+                finished TEXT, PRIMARY KEY (cik, target_name));
+            CREATE TABLE IF NOT EXISTS records (cik TEXT, target_name TEXT, seq INTEGER, record TEXT,
+                PRIMARY KEY (cik, target_name, seq));
+            """)
+        self._conn.commit()
+
+    def _finish(self, cik, target_name, status, stage=None, error=None, records=()):
+        self._conn.execute("DELETE FROM records WHERE cik = ? AND target_name = ?", (cik, target_name))
+        self._conn.executemany("INSERT INTO records VALUES (?, ?, ?, ?)",
+            [(cik, target_name, record["SEQ"], json.dumps(record)) for record in records])
+        self._conn.execute("INSERT OR REPLACE INTO specs VALUES (?, ?, ?, ?, ?, ?)",
+            (cik, target_name, status, stage, error, datetime.now().isoformat(timespec="seconds")))
+
+    def complete(self, cik, targets):
+        """
+        record the outcome of the map of ScanPipeline.run_targets() for a cik in one transaction
+        """
+        with self._lock:
+            with self._conn:
+                for target_name, docs in targets.items():
+                    records = list(sinks.spec_records(cik, OrderedDict([(target_name, docs)])))
+                    errors = [record["ERROR"] for record in records if record["ERROR"] is not None]
+                    if len(errors) > 0:
+                        self._finish(cik, target_name, FAILED, "extract", errors[0], records)
+                    else:
+                        self._finish(cik, target_name, DONE, records=records)
+
+    def fail(self, cik, target_names, stage, error):
+        """
+        record the failure of the specs of a cik in a stage
+        """
+        with self._lock:
+            with self._conn:
+                for target_name in target_names:
+                    self._finish(cik, target_name, FAILED, stage, error)
+
+    def outcomes(self):
+        """
+        return a map with (cik, target name) as key and (status, stage, error) as value
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT cik, target_name, status, stage, error FROM specs").fetchall()
+        return {(cik, target_name): (status, stage, error) for cik, target_name, status, stage, error in rows}
+
+    def pending(self, specs, mode="resume", stages=STAGES):
+        """
+        return the specs to run: in 'resume' mode the ones not done yet, in 'failed' mode only the ones
+        failed in any of the 'stages', in the spec order
+        """
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode}, choose one of {', '.join(MODES)}")
+        outcomes = self.outcomes()
+        pending = []
+        for spec in specs:
+            status, stage, _ = outcomes.get((spec[0], spec[1]), (None, None, None))
+            if mode == "resume" and status != DONE:
+                pending.append(spec)
+            elif mode == "failed" and status == FAILED and stage in stages:
+                pending.append(spec)
+        utils.logger.info(f"{len(pending)} of {len(specs)} specs to run in {mode} mode")
+        return pending
+
+    def records(self, cik, target_name):
+        """
+        yield the records of a spec in order
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT record FROM records WHERE cik = ? AND target_name = ? ORDER BY seq",
+                (cik, target_name)).fetchall()
+        for row in rows:
+            yield json.loads(row[0])
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+if __name__ == '__main__':
+    # python journal.py <journal file>, list the failed specs
+    import sys
+    journal = RunJournal(sys.argv[1])
+    for (cik, target_name), (status, stage, error) in journal.outcomes().items():
+        if status == FAILED:
+            print(f"{cik}\t{target_name}\t{stage}\t{error.strip().splitlines()[-1] if error else ''}")
+    journal.close()
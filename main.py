@@ -1,11 +1,16 @@
 #coding=utf-8
-import pprint,os
+import pprint,os,time
 from collections import OrderedDict
 from fillings import Company
 from analysis import Analysis
+from pipeline import SpecRunner
+from journal import RunJournal
+from planner import deal_window
+from datetime import datetime
+import metrics
+import sinks
 import utils
 import unittest
-import xlsxwriter
 
 class TestMainFlow(unittest.TestCase):
     specs = (
@@ -21,77 +26,78 @@ class TestMainFlow(unittest.TestCase):
 
     def test_main_flow(self):
         raw_dir = "."
+        # every deal is searched from 90 days before its announcement to 450 days after it is effective,
+        # the period below is only for the deals without any date in the firms spreadsheet
+        window = deal_window(lead_days=90, lag_days=450)
         since_date = "2006/01/01"
         to_date = "2008/12/31"
         filling_types = {"10-K", "10-Q"}
         # case-sensitive by default, or re.IGNORECASE for case-insensive match
         flags = 0
-        workbook = xlsxwriter.Workbook('acq_asset_report.xlsx')
-        red_format = workbook.add_format({
-            'font_color': 'red',
-            'bold':       1,
-            'underline':  1,
-            'font_size':  12,
-            })
         # read the cik/targetname between row11~20 from the firms spreadsheet 
         # the default specs are overwitten!
         TestMainFlow.specs = utils.read_specs("./firms.xlsx", 1, 100)
-        for spec in TestMainFlow.specs:
-            cik = spec[0]
-            target_name = spec[1]
-            golden_doc = spec[2]
-            index_file = os.path.join(raw_dir, cik, "download.idx")
-            clean_name = ''.join(e for e in target_name if e.isalnum())
-            # A company could acquire lots of small company during a period
-            worksheet = workbook.add_worksheet(f"{cik}-{clean_name}")
-            worksheet.write_string('A1', "Target Name:")
-            worksheet.write_string('B1', target_name)
-            worksheet.set_column('A:A', 35)
-            worksheet.set_column('B:B', 150)
-            utils.logger.info(f'scanning acquisition asset information about {target_name} in {cik} docs...')
-            if os.path.exists(index_file) is False:
-                try:
-                    company = Company(cik)
-                    utils.logger.info(f"\tdownloading {'/'.join(filling_types)} documents for cik:{cik}...") 
-                    index_file = company.download_documents(since_date, to_date, filling_types, raw_dir)
-                except Exception as e:
-                    utils.logger.error(f"Failed to download documents for cik:{cik}...\n{utils.traceback.format_exc()}")
-                    continue
+        # fetch the filings missing from the existing download.idx when the period is changed
+        refresh = True
+        # the inverted index over the downloaded documents narrows down the documents to scan
+        text_index = os.path.join(raw_dir, "filings_index.db")
+        # the ciks are spread over a pool of processes, and every one downloads and scans the
+        # documents of a cik at the same time, once for all of its targets
+        # parse the documents with bs4, the experimental "lxml" only parses the <TEXT> section but nests
+        # unclosed tags differently, keep bs4 until parsers.compare_parsers() finds no difference on the specs
+        parser = "bs4"
+        # match the keyword sets by plain substring lookups, or "re" for the alternation regex
+        matcher = "literal"
+        # with the "bs4" parser, only parse the fragments around the target mentions; the parse cache
+        # below keeps whole documents only, so the fragments are off while it is on
+        windowed = False
+        # parse every document once and keep the parse product, so that a rerun after tuning the
+        # keyword sets of Analysis doesn't parse anything
+        parse_cache = os.path.join(raw_dir, "parse_cache.db")
+        # keep the downloaded documents compressed, the identical ones stored once
+        store = os.path.join(raw_dir, "filings_store")
+        # the documents of all the ciks are looked up in one catalog
+        catalog = os.path.join(raw_dir, "filings_catalog.db")
+        # discover the filings of all the ciks from the quarterly full-index files of EDGAR
+        full_index = os.path.join(raw_dir, "full-index")
+        # the time and the bytes of every stage per cik/target, one JSON line each
+        metrics_file = os.path.join(raw_dir, "acq_metrics.jsonl")
+        # or a directory to keep the cProfile dump of every analyzed document in
+        profile_dir = None
+        # fetch every filing as its complete submission text file in one request, instead of its
+        # 'Filling Detail' page and then its documents
+        submission = True
+        # list all the later documents mentioning a target in the report, like the sequential flow; False
+        # stops the downloading and the scanning of a cik once every target has its acquisition report
+        list_rest = True
+        runner = SpecRunner(processes=os.cpu_count(), workers=4, queue_size=16, flags=flags, refresh=refresh,
+            text_index=text_index, parser=parser, matcher=matcher, windowed=windowed, store=store, catalog=catalog,
+            full_index=full_index, parse_cache=parse_cache, profile_dir=profile_dir, submission=submission,
+            list_rest=list_rest)
+        # every finished spec and its outcome are journaled. None runs them all again, e.g. after tuning
+        # the keyword sets, and starts the results over; set "resume" to skip the specs done by an
+        # interrupted run, or "failed" to only run the specs failed in downloading or extracting again,
+        # and the results of this run are appended to the earlier ones then
+        journal = RunJournal(os.path.join(raw_dir, "acq_journal.db"))
+        resume = None
+        specs = journal.pending(TestMainFlow.specs, resume) if resume is not None else TestMainFlow.specs
+        # the records of every cik are streamed into the JSON lines as soon as it is done, and into a
+        # parquet file of the records of this run as well if pyarrow is installed
+        results_file = os.path.join(raw_dir, "acq_results.jsonl")
+        sink = sinks.MultiSink([sinks.JsonlSink(results_file, append=resume is not None)] +
+            ([sinks.ParquetSink(os.path.join(raw_dir, "acq_results.parquet"))] if sinks.pyarrow is not None else []))
+        try:
             # grep the target name in case-sensitive way. or set flags = re.IGNORECASE for a case-insensitive search
-            ana = Analysis(target_name, index_file)
-            docs = ana.locate_target_documents(flags)
-            doc_found = ""
-            row = 1
-            # parse the html and locate the acquisition paragraph
-            for filename, dict in docs.items():
-                row = row + 1
-                if doc_found != "":
-                    worksheet.write_url(f"A{row}", dict['FILLING_URL'], string=filename)
-                    continue
-
-                utils.logger.info(f'\tfound {target_name} in {filename}, analyzing...')
-                try:
-                    info = ana.extract_assets(filename, flags)
-                except Exception as e:
-                    utils.logger.error(f"Failed in analyzing document:{filename}...\n{utils.traceback.format_exc()}")
-                    continue
-
-                if  info is None:
-                    worksheet.write_url(f"A{row}", dict['FILLING_URL'], string=filename)
-                    continue
-                else:
-                    doc_found = os.path.basename(filename)
-                    worksheet.write_url(f"A{row}", dict['FILLING_URL'], red_format, string=filename)
-                    worksheet.write_string(f"B{row}", info)
-                    utils.logger.info(f"!!!!located acquisition asset report!!!!")
-                    utils.logger.info(f"\tCIK:{cik}\tTarget:{target_name}\tDate:{dict['FILLING_DATE']}\t{dict['FILLING_TYPE']}:{filename}")
-                    utils.logger.info(f"\tFilling Details:{dict['FILLING_URL']}")
-                    utils.logger.info(f"{info}\n")
-                    continue
-            #self.assertEqual(golden_doc, doc_found)
-            #if golden_doc != doc_found:
-                #utils.logger.error(f"Expecting initial report: {golden_doc} for {cik} {target_name}, but it locates: {doc_found}")
-        workbook.close()
+            runner.run(specs, since_date, to_date, filling_types, raw_dir, sink, journal, window)
+        finally:
+            sink.close()
+        report_start = time.perf_counter()
+        # the report covers the specs done by the earlier runs too
+        sinks.XlsxReport('acq_asset_report.xlsx').write(TestMainFlow.specs, journal.records)
+        journal.close()
+        metrics.default_metrics().add("workbook", time.perf_counter() - report_start, os.path.getsize('acq_asset_report.xlsx'))
+        metrics.default_metrics().write_jsonl(metrics_file)
+        utils.logger.info(f"time spent in every stage:\n{metrics.default_metrics().summary()}")
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,133 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+import functools,re,sys,time
+import utils
+
+class RegexMatcher():
+    """
+    a regex pattern compiled once into both str and bytes forms
+    """
+    name = "re"
+
+    def __init__(self, pattern, flags = 0):
+        self.pattern = pattern
+        self.flags = flags
+        self.regex = re.compile(pattern, flags)
+        self.bytes_regex = re.compile(bytes(pattern, encoding='utf8'), flags)
+
+    def search(self, text):
+        return self.regex.search(text) is not None
+
+    def search_bytes(self, data):
+        """
+        return the match object in the bytes-like data, e.g. a mmap, or None
+        """
+        return self.bytes_regex.search(data)
+
+class LiteralMatcher():
+    """
+    a set of literal words matched by plain substring lookups, which beats an alternation regex
+    on the short keyword sets. Only re.IGNORECASE is honored in the flags, compile_words() falls
+    back to the "re" backend with any other flag. The words are literal in both backends, a
+    regex-looking word like "G&.*L" is looked up as it is.
+    """
+    name = "literal"
+
+    def __init__(self, words, flags = 0):
+        if flags & ~re.IGNORECASE:
+            raise ValueError(f"the literal matcher only takes re.IGNORECASE, not the flags:{flags}")
+        self.ignorecase = bool(flags & re.IGNORECASE)
+        self.words = [word.lower() if self.ignorecase else word for word in words]
+        # the bytes are folded like the bytes regex does, only in ASCII
+        self.bytes_words = [bytes(word, encoding='utf8') for word in words]
+        if self.ignorecase:
+            self.bytes_words = [word.lower() for word in self.bytes_words]
+        # str.lower() doesn't fold the non-ASCII case the way re does, e.g. "ſ" matches "s" in re,
+        # so such a case-insensitive lookup goes through the regex instead
+        self.regex = None
+        if self.ignorecase:
+            self.regex = re.compile("|".join(re.escape(word) for word in words), flags)
+        self.ascii = all(word.isascii() for word in words)
+
+    def search(self, text):
+        if self.ignorecase:
+            if not self.ascii or not text.isascii():
+                return self.regex.search(text) is not None
+            text = text.lower()
+        for word in self.words:
+            if word in text:
+                return True
+        return False
+
+    def search_bytes(self, data):
+        if self.ignorecase:
+            data = bytes(data).lower()
+        for word in self.bytes_words:
+            if data.find(word) >= 0:
+                return True
+        return False
+
+BACKENDS = {
+    RegexMatcher.name: lambda words, flags: RegexMatcher("|".join(re.escape(word) for word in words), flags),
+    LiteralMatcher.name: LiteralMatcher,
+}
+
+@functools.lru_cache(maxsize=1024)
+def compile_pattern(pattern, flags = 0):
+    """
+    return the RegexMatcher of a pattern, which is shared by all the callers
+    """
+    return RegexMatcher(pattern, flags)
+
+@functools.lru_cache(maxsize=1024)
+def compile_words(words, flags = 0, backend = "re"):
+    """
+    return the matcher of a frozenset of literal words with the backend, which is shared by
+    all the callers
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown matcher backend:{backend}, expecting one of {', '.join(BACKENDS.keys())}")
+    # the literal lookups only know re.IGNORECASE
+    if backend == LiteralMatcher.name and flags & ~re.IGNORECASE:
+        backend = RegexMatcher.name
+    # sort the words so that the same set always builds the same matcher
+    return BACKENDS[backend](sorted(words), flags)
+
+def benchmark(filenames, word_sets, flags = 0, repeat = 5):
+    """
+    time every matcher backend on the text blocks of the filings, return a map with
+    (word set name, backend) as key and the best seconds of 'repeat' rounds as value
+    """
+    import parsers
+    blocks = []
+    for filename in filenames:
+        text_tag = parsers.get_parser("lxml").load_text(filename)
+        if text_tag is not None:
+            blocks.extend(tag.get_text() for tag in text_tag.find_all(['p', 'div', 'font', 'b', 'tr']))
+    utils.logger.info(f"benchmarking the matchers on {len(blocks)} text blocks of {len(filenames)} filings")
+    timings = {}
+    for set_name, words in word_sets.items():
+        expected = None
+        for backend in BACKENDS.keys():
+            matcher = compile_words(frozenset(words), flags, backend)
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                hits = sum(1 for block in blocks if matcher.search(block))
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            if expected is not None and hits != expected:
+                utils.logger.error(f"{backend} matches {hits} blocks for {set_name} instead of {expected}")
+            expected = hits
+            timings[(set_name, backend)] = best
+    return timings
+
+if __name__ == '__main__':
+    # python matchers.py <cik>/download.idx ...
+    from analysis import Analysis
+    filenames = [filename for index_file in sys.argv[1:] for filename in utils.read_index(index_file).keys()]
+    word_sets = {name: getattr(Analysis, name) for name in
+        ("acq_title_words", "acq_text_words", "asset_words", "acq_exclude_words")}
+    for (set_name, backend), seconds in benchmark(filenames, word_sets, re.IGNORECASE).items():
+        print(f"{set_name:20s}{backend:10s}{seconds * 1000:10.2f} ms")
@@ -0,0 +1,142 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from collections import OrderedDict
+import contextlib,cProfile,json,os,threading,time
+
+# the stages of a run in pipeline order, the summary lists them in this order
+STAGES = ("http", "index", "scan", "parse", "classify", "table", "workbook")
+
+class Metrics():
+    """
+    thread-safe timers and counters of the stages of a run, aggregated by (cik, target, stage)
+    where the cik and the target are None for the work which isn't bound to one of them, e.g. the
+    full-text scan of a document is shared by all the targets of a cik.
+    The worker processes record into their own Metrics, which are merged by cik into the one of the run.
+    With 'profile_dir', profile() keeps a cProfile dump of every document analyzed in there.
+    """
+    def __init__(self, profile_dir=None):
+        self.profile_dir = profile_dir
+        self._lock = threading.Lock()
+        # one profiler is active at a time, so the dumps of the documents analyzed in parallel don't mix
+        self._profile_lock = threading.Lock()
+        self._totals = OrderedDict()
+
+    def add(self, stage, seconds, bytes=0, target=None, cik=None, count=1):
+        with self._lock:
+            total = self._totals.get((cik, target, stage))
+            if total is None:
+                total = self._totals[(cik, target, stage)] = {"count": 0, "seconds": 0.0, "bytes": 0}
+            total["count"] += count
+            total["seconds"] += seconds
+            total["bytes"] += bytes
+
+    @contextlib.contextmanager
+    def timer(self, stage, target=None, cik=None):
+        """
+        time the enclosed block as one call of the stage, the yielded dictionary takes the 'bytes' processed
+        """
+        counters = {"bytes": 0}
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            self.add(stage, time.perf_counter() - start, counters["bytes"], target, cik)
+
+    @contextlib.contextmanager
+    def profile(self, filename, target=None):
+        """
+        profile the enclosed block into '<profile_dir>/<cik>_<document>[-<target>].prof' if a directory is
+        given, where the cik is the directory the document is in
+        """
+        if self.profile_dir is None:
+            yield
+            return
+        with self._profile_lock:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+        name = "_".join(os.path.normpath(os.path.abspath(filename)).split(os.sep)[-2:])
+        if target is not None:
+            name += "-" + "".join(c for c in target if c.isalnum())
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(os.path.join(self.profile_dir, name + ".prof"))
+
+    def records(self):
+        """
+        return the totals as a list of plain dictionaries with 'cik'/'target'/'stage'/'count'/'seconds'/'bytes' keys
+        """
+        with self._lock:
+            return [dict(total, cik=cik, target=target, stage=stage) for (cik, target, stage), total in self._totals.items()]
+
+    def merge(self, records, cik=None):
+        """
+        add the records of another Metrics, the ones without a cik are given 'cik'
+        """
+        for record in records:
+            self.add(record["stage"], record["seconds"], record["bytes"], record["target"],
+                record["cik"] if record["cik"] is not None else cik, record["count"])
+
+    def aggregate(self, keys):
+        """
+        return the totals summed up over the 'keys' of the records, like ("cik", "stage")
+        """
+        totals = OrderedDict()
+        for record in self.records():
+            key = tuple(record[name] for name in keys)
+            total = totals.setdefault(key, {"count": 0, "seconds": 0.0, "bytes": 0})
+            for name in ("count", "seconds", "bytes"):
+                total[name] += record[name]
+        return totals
+
+    def write_jsonl(self, filename):
+        """
+        write a JSON line per (cik, target, stage)
+        """
+        with open(filename, "w", encoding="UTF-8") as output:
+            for record in self.records():
+                output.write(json.dumps(record) + "\n")
+
+    def summary(self):
+        """
+        return a table of the seconds spent in every stage per cik, followed by the totals
+        """
+        per_cik = self.aggregate(("cik", "stage"))
+        recorded = set(stage for _, stage in per_cik.keys())
+        stages = [stage for stage in STAGES if stage in recorded] + sorted(recorded - set(STAGES))
+        ciks = list(OrderedDict.fromkeys(key[0] for key in per_cik.keys()))
+        lines = ["%-12s" % "cik" + "".join("%12s" % stage for stage in stages)]
+        for cik in ciks:
+            lines.append("%-12s" % (cik if cik is not None else "-") + "".join("%11.3fs" % per_cik[(cik, stage)]["seconds"]
+                if (cik, stage) in per_cik else "%12s" % "" for stage in stages))
+        totals = self.aggregate(("stage",))
+        lines.append("%-12s" % "seconds" + "".join("%11.3fs" % totals[(stage,)]["seconds"] for stage in stages))
+        lines.append("%-12s" % "count" + "".join("%12d" % totals[(stage,)]["count"] for stage in stages))
+        lines.append("%-12s" % "MB" + "".join("%12.1f" % (totals[(stage,)]["bytes"] / 1024 / 1024) for stage in stages))
+        return "\n".join(lines)
+
+_default_metrics = Metrics()
+_default_lock = threading.Lock()
+
+def default_metrics():
+    """
+    the metrics which the stages of this process record into
+    """
+    with _default_lock:
+        return _default_metrics
+
+def configure_default_metrics(metrics):
+    """
+    replace the metrics of this process, e.g. with a new one for every cik, and return the old one
+    """
+    global _default_metrics
+    with _default_lock:
+        old = _default_metrics
+        _default_metrics = metrics
+    return old
+
+def timer(stage, target=None, cik=None):
+    return default_metrics().timer(stage, target, cik)
@@ -0,0 +1,331 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from bs4 import Tag, NavigableString, CData
+import json,sqlite3,threading,time,zlib
+import store
+import utils
+
+# bumped whenever the serialized form or what is kept of the tree changes, the older entries are ignored
+PARSE_VERSION = 2
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# the only attributes the extraction looks at
+ATTRIBUTES = ("href", "align", "colspan", "rowspan")
+# the strings of the text content, like BeautifulSoup.get_text() of most tags
+TEXT_TYPES = (NavigableString, CData)
+
+class ParsedDocument():
+    """
+    the compact product of parsing a filing: every element of the tree in document order with
+    its name, parent, the end of its subtree, the span of its text content in the concatenated
+    text of the document, and the few attributes the extraction uses. The elements whose text
+    isn't a span of the document text, like <script>/<style>, keep their own text.
+    """
+    def __init__(self, names, parents, ends, starts, stops, attrs, texts, text, root):
+        self.names = names
+        self.parents = parents
+        self.ends = ends
+        self.starts = starts
+        self.stops = stops
+        self.attrs = attrs
+        self.texts = texts
+        self.text = text
+        # the element returned by the load_text() of the parser backend
+        self.root = root
+        # the attributes set by the extraction, like the marks of DocumentOutline
+        self.marks = {}
+
+    @staticmethod
+    def _new():
+        return {"names": [], "parents": [], "ends": [], "starts": [], "stops": [], "attrs": {}, "texts": {}}
+
+    @staticmethod
+    def _add(tree, name, parent, start, attrs):
+        id = len(tree["names"])
+        tree["names"].append(name)
+        tree["parents"].append(parent)
+        tree["ends"].append(id + 1)
+        tree["starts"].append(start)
+        tree["stops"].append(start)
+        kept = {key: " ".join(value) if isinstance(value, list) else value for key, value in attrs.items() if key in ATTRIBUTES}
+        if len(kept) > 0:
+            tree["attrs"][id] = kept
+        return id
+
+    @staticmethod
+    def from_soup(tag):
+        """
+        build the document of the whole BeautifulSoup tree holding 'tag', which becomes its root
+        """
+        top = tag
+        while top.parent is not None:
+            top = top.parent
+        tree = ParsedDocument._new()
+        pieces = []
+        length = 0
+        # the elements whose subtree is being visited, as (element, id)
+        stack = []
+        def close(parent):
+            while len(stack) > 0 and stack[-1][0] is not parent:
+                element, id = stack.pop()
+                tree["ends"][id] = len(tree["names"])
+                tree["stops"][id] = length
+        stack.append((top, ParsedDocument._add(tree, top.name, -1, 0, top.attrs)))
+        root = 0
+        for node in top.descendants:
+            close(node.parent)
+            if isinstance(node, Tag):
+                index = ParsedDocument._add(tree, node.name, stack[-1][1], length, node.attrs)
+                if node is tag:
+                    root = index
+                if node.interesting_string_types != top.MAIN_CONTENT_STRING_TYPES:
+                    tree["texts"][index] = node.get_text()
+                stack.append((node, index))
+            elif type(node) in TEXT_TYPES:
+                pieces.append(str(node))
+                length += len(pieces[-1])
+        close(None)
+        return ParsedDocument(text="".join(pieces), root=root, **tree)
+
+    @staticmethod
+    def from_lxml(element):
+        """
+        build the document of the whole lxml tree holding 'element', which becomes its root
+        """
+        top = element
+        while top.getparent() is not None:
+            top = top.getparent()
+        tree = ParsedDocument._new()
+        pieces = []
+        length = 0
+        root = 0
+        # (element, parent id) to visit, or (None, id) to close the subtree of the element
+        stack = [(top, -1)]
+        while len(stack) > 0:
+            node, parent = stack.pop()
+            if node is None:
+                tree["ends"][parent] = len(tree["names"])
+                tree["stops"][parent] = length
+                continue
+            if isinstance(node, str):
+                # the tail of an element belongs to its parent
+                pieces.append(node)
+                length += len(node)
+                continue
+            if not isinstance(node.tag, str):
+                # the comments and processing instructions only leave their tails
+                if node.tail:
+                    stack.append((node.tail, parent))
+                continue
+            index = ParsedDocument._add(tree, node.tag, parent, length, node.attrib)
+            if node is element:
+                root = index
+            if node.text:
+                pieces.append(node.text)
+                length += len(node.text)
+            stack.append((None, index))
+            for child in reversed(node):
+                if child.tail:
+                    stack.append((child.tail, index))
+                stack.append((child, index))
+        return ParsedDocument(text="".join(pieces), root=root, **tree)
+
+    def dumps(self):
+        names = sorted(set(self.names))
+        codes = {name: i for i, name in enumerate(names)}
+        data = {"version": PARSE_VERSION, "names": names, "tags": [codes[name] for name in self.names],
+            "parents": self.parents, "ends": self.ends, "starts": self.starts, "stops": self.stops,
+            "attrs": self.attrs, "texts": self.texts, "text": self.text, "root": self.root}
+        return zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def loads(blob):
+        data = json.loads(zlib.decompress(blob))
+        names = [data["names"][code] for code in data["tags"]]
+        return ParsedDocument(names, data["parents"], data["ends"], data["starts"], data["stops"],
+            {int(id): attrs for id, attrs in data["attrs"].items()}, {int(id): text for id, text in data["texts"].items()},
+            data["text"], data["root"])
+
+    def node(self, id):
+        return ParsedNode(self, id) if id is not None and id >= 0 else None
+
+class ParsedNode():
+    """
+    an element of a ParsedDocument which provides the subset of the BeautifulSoup tag interface
+    used by Analysis, like parsers.LxmlNode
+    """
+    __slots__ = ("doc", "id")
+
+    def __init__(self, doc, id):
+        self.doc = doc
+        self.id = id
+
+    @staticmethod
+    def _tags(names):
+        return (names,) if isinstance(names, str) else tuple(names)
+
+    @property
+    def name(self):
+        return self.doc.names[self.id]
+
+    @property
+    def parent(self):
+        return self.doc.node(self.doc.parents[self.id])
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    def get_text(self):
+        text = self.doc.texts.get(self.id)
+        if text is not None:
+            return text
+        return self.doc.text[self.doc.starts[self.id]:self.doc.stops[self.id]]
+
+    def has_attr(self, name):
+        return name in self.doc.marks.get(self.id, ()) or name in self.doc.attrs.get(self.id, ())
+
+    def __getitem__(self, name):
+        marks = self.doc.marks.get(self.id, {})
+        return marks[name] if name in marks else self.doc.attrs.get(self.id, {})[name]
+
+    def __setitem__(self, name, value):
+        self.doc.marks.setdefault(self.id, {})[name] = value
+
+    @property
+    def children(self):
+        children = []
+        id = self.id + 1
+        while id < self.doc.ends[self.id]:
+            children.append(ParsedNode(self.doc, id))
+            id = self.doc.ends[id]
+        return children
+
+    def _descendants(self, names):
+        names = self._tags(names)
+        for id in range(self.id + 1, self.doc.ends[self.id]):
+            if self.doc.names[id] in names:
+                yield id
+
+    def find_all(self, names):
+        return [ParsedNode(self.doc, id) for id in self._descendants(names)]
+
+    def find(self, names, href=None):
+        for id in self._descendants(names):
+            if href is None or ("href" in self.doc.attrs.get(id, ())) == href:
+                return ParsedNode(self.doc, id)
+        return None
+
+    def findNextSibling(self, names):
+        names = self._tags(names)
+        parent = self.doc.parents[self.id]
+        id = self.doc.ends[self.id]
+        while id < len(self.doc.names) and self.doc.parents[id] == parent:
+            if self.doc.names[id] in names:
+                return ParsedNode(self.doc, id)
+            id = self.doc.ends[id]
+        return None
+
+# build the ParsedDocument of the tag returned by the load_text() of every parser backend
+BUILDERS = {
+    "bs4": ParsedDocument.from_soup,
+    "lxml": lambda node: ParsedDocument.from_lxml(node.element),
+}
+
+class CachedParser():
+    """
+    the parser backend which looks the parse product of a filing up in a ParseCache by the hash
+    of its content, and only runs the wrapped backend on a miss
+    """
+    windowed = False
+
+    def __init__(self, cache, backend):
+        self.cache = cache
+        self.backend = backend
+        self.name = backend.name
+
+    def load_text(self, filename):
+        size, digest = store.filing_digest(filename)
+        key = f"{self.backend.name}-{self.backend.version}-{PARSE_VERSION}:{digest}"
+        found, doc = self.cache.get(key)
+        if not found:
+            text_tag = self.backend.load_text(filename)
+            doc = BUILDERS[self.backend.name](text_tag) if text_tag is not None else None
+            self.cache.put(key, doc)
+        return doc.node(doc.root) if doc is not None else None
+
+    def release(self, tag):
+        pass
+
+class ParseCache():
+    """
+    persistent cache of the parse product of the filings, keyed by the parser backend, its version
+    and the hash of the filing content, so that the extraction runs again on a filing without
+    parsing it. The least recently used entries are evicted once the cache grows beyond 'max_bytes'.
+    """
+    def __init__(self, path="parse_cache.db", max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS parsed (
+            key TEXT PRIMARY KEY, accessed REAL, size INTEGER, data BLOB)""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS parsed_accessed ON parsed (accessed)")
+        self._conn.commit()
+        self.size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM parsed").fetchone()[0]
+
+    def backend(self, backend):
+        return CachedParser(self, backend)
+
+    def get(self, key):
+        """
+        return (True, the ParsedDocument or None for a filing without the text section) if the key is
+        cached, otherwise (False, None)
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM parsed WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            self._conn.execute("UPDATE parsed SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return True, ParsedDocument.loads(row[0]) if row[0] is not None else None
+
+    def put(self, key, doc):
+        data = doc.dumps() if doc is not None else None
+        size = len(key) + (len(data) if data is not None else 0)
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM parsed WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self.size -= old[0]
+            self._conn.execute("INSERT OR REPLACE INTO parsed VALUES (?, ?, ?, ?)", (key, time.time(), size, data))
+            self.size += size
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.size <= self.max_bytes:
+            return
+        # drop the least recently used entries until the cache fits in 90% of its budget
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM parsed ORDER BY accessed").fetchall()
+        evicted = 0
+        for key, size in rows:
+            if self.size <= target:
+                break
+            self._conn.execute("DELETE FROM parsed WHERE key = ?", (key,))
+            self.size -= size
+            evicted += 1
+        utils.logger.debug(f"evicted {evicted} documents from the parse cache {self.path}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,527 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from bs4 import BeautifulSoup
+from lxml import etree
+import bs4
+from html.parser import HTMLParser
+import bisect,codecs,re
+import store
+import utils
+
+CHUNK_SIZE = 1 << 20
+DESCRIPTION_PATTERN = re.compile(rb"<description[\s>]", re.IGNORECASE)
+TEXT_PATTERN = re.compile(rb"<text>", re.IGNORECASE)
+TEXT_END_PATTERN = re.compile(rb"</text>", re.IGNORECASE)
+
+def iter_text_section(filename, chunk_size=CHUNK_SIZE):
+    """
+    stream the raw bytes of the <TEXT> section following the first <DESCRIPTION> tag of a filing
+    in chunks, without reading the rest of the file into memory; nothing is yielded if the
+    file has no such section.
+    """
+    patterns = [DESCRIPTION_PATTERN, TEXT_PATTERN, TEXT_END_PATTERN]
+    state = 0
+    buf = b""
+    # keep the tail of a chunk in case a tag is split between two chunks
+    keep = 16
+    with store.open_filing(filename) as input:
+        while True:
+            chunk = input.read(chunk_size)
+            if not chunk:
+                break
+            buf += chunk
+            while state < 2:
+                match = patterns[state].search(buf)
+                if match is None:
+                    buf = buf[-keep:]
+                    break
+                buf = buf[match.end():]
+                state += 1
+            if state < 2:
+                continue
+            match = TEXT_END_PATTERN.search(buf)
+            if match is not None:
+                yield buf[:match.start()]
+                return
+            if len(buf) > keep:
+                yield buf[:-keep]
+                buf = buf[-keep:]
+    if state == 2 and len(buf) > 0:
+        yield buf
+
+# the elements which BeautifulSoup closes right after their start tag
+VOID_ELEMENTS = frozenset(["area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem",
+    "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex", "nextid",
+    "spacer"])
+# the longest bold text which could be a section title, see Analysis.guess_acquisition_title()
+MAX_TITLE_LENGTH = 150
+# the characters between the byte offsets kept by OutlineScanner for a non-ASCII document
+BYTE_MARK_STEP = 4096
+
+class _SectionEnd(Exception):
+    pass
+
+class OutlineScanner(HTMLParser):
+    """
+    a tokenizer-only pass over the <TEXT> section of the primary document, which records the element
+    tree exactly the way BeautifulSoup with html.parser nests it but without building it: every element
+    has its name, character extent, parent, depth and whether a hyperlink lies within it, the <b>
+    elements keep their text, and the text of the section is kept as one string with the element every
+    piece belongs to. Analysis.locate_windows() cuts the fragments worth parsing out of it.
+    The element ids index the lists, ROOT stands for the <TEXT> element itself.
+    """
+    ROOT = -1
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.data = ""
+        self.names = []
+        self.starts = []
+        self.content_starts = []
+        self.ends = []
+        self.parents = []
+        self.depths = []
+        self.links = []
+        self.root_link = False
+        # the <b> element ids in document order with their text
+        self.bolds = []
+        self.bold_texts = {}
+        # the text pieces with their character extents and the element containing them
+        self.pieces = []
+        self.piece_starts = []
+        self.piece_ends = []
+        self.piece_elements = []
+        self.text = ""
+        self.region = None
+        # set when the section has markup the scanner doesn't follow like BeautifulSoup
+        self.unsupported = False
+        self._state = 0
+        self._outer = set()
+        self._stack = []
+        self._open = {}
+        self._open_bolds = []
+        # the decoded chunks, their length in characters and in bytes, and where the lines start
+        self._texts = []
+        self._length = 0
+        self._bytes = 0
+        self._line_starts = [0]
+        self._byte_marks = None
+        # the (element, position) of the end tags, the end is found in the data once it is whole
+        self._end_tags = []
+
+    @staticmethod
+    def scan(filename, chunk_size=CHUNK_SIZE):
+        """
+        return the scanner of the primary document of a filing, or None if the section is missing,
+        the file isn't utf-8, or the section has markup the scanner doesn't follow.
+        The filing is decoded and fed chunk by chunk, only the text up to the end of the section is kept.
+        """
+        scanner = OutlineScanner()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        ended = False
+        try:
+            for chunk in store.iter_filing(filename, chunk_size):
+                text = decoder.decode(chunk)
+                # the rest is still decoded, BeautifulSoup takes the whole file as utf-8 or not at all
+                if ended:
+                    continue
+                scanner._append(text, len(chunk))
+                try:
+                    scanner.feed(text)
+                except _SectionEnd:
+                    ended = True
+            decoder.decode(b"", final=True)
+            if not ended:
+                scanner.close()
+        except UnicodeDecodeError:
+            return None
+        except _SectionEnd:
+            pass
+        if scanner.region is None or scanner.unsupported:
+            return None
+        scanner.data = "".join(scanner._texts)
+        scanner._texts = None
+        # the byte offset of every BYTE_MARK_STEP characters, unless they are the same
+        if len(scanner.data) != scanner._bytes:
+            scanner._byte_marks = [0]
+            for start in range(0, len(scanner.data), BYTE_MARK_STEP):
+                scanner._byte_marks.append(scanner._byte_marks[-1] +
+                    len(scanner.data[start:start + BYTE_MARK_STEP].encode("utf-8")))
+        scanner._finish()
+        return scanner
+
+    def _append(self, text, size):
+        self._line_starts += [self._length + match.end() for match in re.finditer("\n", text)]
+        self._texts.append(text)
+        self._length += len(text)
+        self._bytes += size
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+
+    def _end_piece(self, pos):
+        if len(self.piece_ends) < len(self.piece_starts):
+            self.piece_ends.append(pos)
+
+    def _push(self, name, pos, void):
+        parent = self._stack[-1] if len(self._stack) > 0 else OutlineScanner.ROOT
+        id = len(self.names)
+        self.names.append(name)
+        self.starts.append(pos)
+        self.content_starts.append(pos + len(self.get_starttag_text()))
+        self.ends.append(None)
+        self.parents.append(parent)
+        self.depths.append(len(self._stack))
+        self.links.append(False)
+        if name == "b":
+            self.bolds.append(id)
+            self.bold_texts[id] = []
+        if void:
+            self.ends[id] = self.content_starts[id]
+            return
+        self._stack.append(id)
+        self._open[name] = self._open.get(name, 0) + 1
+        if name == "b":
+            self._open_bolds.append(id)
+
+    def _pop(self, end):
+        id = self._stack.pop()
+        self.ends[id] = end
+        self._open[self.names[id]] -= 1
+        if self.names[id] == "b":
+            self._open_bolds.remove(id)
+        return id
+
+    def handle_starttag(self, tag, attrs, void=None):
+        if self._state < 2:
+            self._outer.add(tag)
+            if self._state == 0 and tag == "description":
+                self._state = 1
+            elif self._state == 1 and tag == "text":
+                self._state = 2
+                self.region = [self._offset() + len(self.get_starttag_text()), None]
+            return
+        pos = self._offset()
+        self._end_piece(pos)
+        if tag in ("script", "style"):
+            self.unsupported = True
+        if tag == "a" and any(name == "href" for name, value in attrs):
+            # the hyperlink lies within every open element
+            for id in reversed(self._stack):
+                if self.links[id]:
+                    break
+                self.links[id] = True
+            self.root_link = True
+        self._push(tag, pos, tag in VOID_ELEMENTS if void is None else void)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, void=True)
+
+    def handle_endtag(self, tag):
+        if self._state < 2:
+            if self._state == 1 and tag == "description":
+                self.unsupported = True
+            return
+        pos = self._offset()
+        self._end_piece(pos)
+        if self._open.get(tag, 0) == 0:
+            if tag == "text":
+                self.region[1] = pos
+                raise _SectionEnd()
+            # it would close an element enclosing the section
+            if tag in self._outer:
+                self.unsupported = True
+            return
+        while True:
+            id = self._pop(pos)
+            if self.names[id] == tag:
+                self._end_tags.append((id, pos))
+                break
+
+    def handle_data(self, data):
+        if self._state < 2:
+            return
+        # every other token ends the piece, a text split by the chunks goes on in the same piece
+        if len(self.piece_ends) < len(self.piece_starts):
+            self.pieces[-1] += data
+        else:
+            self.piece_starts.append(self._offset())
+            self.piece_elements.append(self._stack[-1] if len(self._stack) > 0 else OutlineScanner.ROOT)
+            self.pieces.append(data)
+        for id in self._open_bolds:
+            texts = self.bold_texts[id]
+            if sum(len(text) for text in texts) <= MAX_TITLE_LENGTH:
+                texts.append(data)
+
+    def handle_comment(self, data):
+        if self._state == 2:
+            self._end_piece(self._offset())
+
+    def handle_decl(self, decl):
+        self.handle_comment(decl)
+
+    def handle_pi(self, data):
+        self.handle_comment(data)
+
+    def unknown_decl(self, data):
+        if self._state == 2:
+            self.unsupported = True
+
+    def _finish(self):
+        for id, pos in self._end_tags:
+            self.ends[id] = self.data.find(">", pos) + 1
+        self._end_tags = None
+        if self.region[1] is None:
+            self.region[1] = len(self.data)
+        self._end_piece(self.region[1])
+        while len(self._stack) > 0:
+            self._pop(self.region[1])
+        self.text = "".join(self.pieces)
+        self.pieces = None
+        self.bold_texts = {id: "".join(texts) for id, texts in self.bold_texts.items()}
+
+    def char_offset(self, offset):
+        """
+        return the character offset in the data of a byte offset in the utf-8 file
+        """
+        if self._byte_marks is None:
+            return offset
+        index = bisect.bisect_right(self._byte_marks, offset) - 1
+        start = index * BYTE_MARK_STEP
+        head = self.data[start:start + BYTE_MARK_STEP].encode("utf-8")[:offset - self._byte_marks[index]]
+        return start + len(head.decode("utf-8", "ignore"))
+
+    def pieces_within(self, start, end):
+        """
+        return the indexes of the text pieces overlapping the data between the character offsets
+        """
+        first = bisect.bisect_right(self.piece_starts, start) - 1
+        if first < 0 or self.piece_ends[first] <= start:
+            first += 1
+        return list(range(first, bisect.bisect_left(self.piece_starts, end)))
+
+    def ancestor(self, id, names):
+        """
+        return the nearest ancestor of an element with one of the 'names', or None
+        """
+        id = self.parents[id]
+        while id != OutlineScanner.ROOT:
+            if self.names[id] in names:
+                return id
+            id = self.parents[id]
+        return None
+
+    def child(self, top, id):
+        """
+        return the child of 'top' enclosing the element 'id'
+        """
+        while self.parents[id] != top:
+            id = self.parents[id]
+        return id
+
+    def next_sibling(self, id, names):
+        """
+        return the next sibling of an element with one of the 'names', or None
+        """
+        parent = self.parents[id]
+        end = self.ends[parent] if parent != OutlineScanner.ROOT else self.region[1]
+        next = bisect.bisect_left(self.starts, self.ends[id])
+        while next < len(self.names) and self.starts[next] < end:
+            if self.names[next] in names:
+                return next
+            next = bisect.bisect_left(self.starts, self.ends[next])
+        return None
+
+    def content_start(self, id):
+        return self.content_starts[id] if id != OutlineScanner.ROOT else self.region[0]
+
+    def depth(self, id):
+        return self.depths[id] if id != OutlineScanner.ROOT else -1
+
+    def parent(self, id):
+        return self.parents[id] if id != OutlineScanner.ROOT else None
+
+    def has_link(self, id):
+        return self.links[id] if id != OutlineScanner.ROOT else self.root_link
+
+    def common_ancestor(self, a, b):
+        """
+        return the deepest element enclosing both elements, which might be one of them
+        """
+        while self.depth(a) > self.depth(b):
+            a = self.parents[a]
+        while self.depth(b) > self.depth(a):
+            b = self.parents[b]
+        while a != b:
+            a = self.parents[a]
+            b = self.parents[b]
+        return a
+
+class SoupParser():
+    """
+    the original backend which builds the BeautifulSoup tree of the whole filing with html.parser
+    """
+    name = "bs4"
+    version = bs4.__version__
+    # OutlineScanner follows the tree building of this backend, see Analysis.locate_windows()
+    windowed = True
+
+    def load_text(self, filename):
+        """
+        return the <text> tag of the primary document, or None
+        """
+        # BeautifulSoup takes the whole markup at once, the other readers stream the filing in chunks
+        html = store.read_filing(filename)
+        soup = BeautifulSoup(html, 'html.parser', from_encoding="UTF-8")
+        # locate the ../<description>/<text>
+        desc_tag = soup.find('description')
+        if desc_tag is None:
+            return None
+        return desc_tag.find('text')
+
+    def load_fragment(self, text):
+        """
+        return the root of an html fragment cut out of the <TEXT> section
+        """
+        return BeautifulSoup(text, 'html.parser')
+
+    def release(self, tag):
+        pass
+
+class LxmlNode():
+    """
+    a thin wrapper of an lxml element which provides the subset of the BeautifulSoup tag interface
+    used by Analysis, so the extraction works the same on both backends.
+    """
+    __slots__ = ("element",)
+
+    def __init__(self, element):
+        self.element = element
+
+    @staticmethod
+    def wrap(element):
+        return LxmlNode(element) if element is not None else None
+
+    @staticmethod
+    def _tags(names):
+        return (names,) if isinstance(names, str) else tuple(names)
+
+    @property
+    def name(self):
+        return self.element.tag
+
+    @property
+    def parent(self):
+        return LxmlNode.wrap(self.element.getparent())
+
+    @property
+    def children(self):
+        return [LxmlNode(e) for e in self.element if isinstance(e.tag, str)]
+
+    @property
+    def text(self):
+        return self.get_text()
+
+    def get_text(self):
+        return "".join(self.element.itertext())
+
+    def has_attr(self, name):
+        return name in self.element.attrib
+
+    def __getitem__(self, name):
+        return self.element.attrib[name]
+
+    def __setitem__(self, name, value):
+        self.element.attrib[name] = value
+
+    def find_all(self, names):
+        return [LxmlNode(e) for e in self.element.iterdescendants(*self._tags(names))]
+
+    def find(self, names, href=None):
+        for e in self.element.iterdescendants(*self._tags(names)):
+            if href is None or ("href" in e.attrib) == href:
+                return LxmlNode(e)
+        return None
+
+    def findNextSibling(self, names):
+        for e in self.element.itersiblings(*self._tags(names)):
+            return LxmlNode(e)
+        return None
+
+class LxmlParser():
+    """
+    the experimental backend which feeds only the <TEXT> section of the primary document to the lxml
+    HTML parser chunk by chunk, and frees the blocks preceding the one being analyzed. The file is
+    never read whole, but the tree of the whole section is still built before the analysis starts, so
+    the memory isn't bounded by the chunk size. libxml2 closes the unclosed tags the way browsers do,
+    so the reports differ from bs4 on such markup, see tests/test_parsers.py.
+    """
+    name = "lxml"
+    version = etree.__version__
+    # the tree building of libxml2 isn't followed by OutlineScanner, the whole section is always parsed
+    windowed = False
+
+    def load_text(self, filename):
+        parser = etree.HTMLParser(encoding="UTF-8", remove_comments=True, remove_pis=True)
+        fed = False
+        for chunk in iter_text_section(filename):
+            parser.feed(chunk)
+            fed = True
+        if not fed:
+            return None
+        root = parser.close()
+        if root is None:
+            return None
+        body = root.find("body")
+        return LxmlNode(body if body is not None else root)
+
+    def release(self, tag):
+        """
+        drop the top-level blocks before the one enclosing the tag, the analysis never walks back
+        """
+        element = tag.element
+        parent = element.getparent()
+        while parent is not None and parent.getparent() is not None and parent.tag != "body":
+            element = parent
+            parent = element.getparent()
+        if parent is None:
+            return
+        for previous in list(element.itersiblings(preceding=True)):
+            parent.remove(previous)
+
+PARSERS = {
+    SoupParser.name: SoupParser,
+    LxmlParser.name: LxmlParser,
+}
+
+def get_parser(name):
+    if name not in PARSERS:
+        raise ValueError(f"unknown parser backend:{name}, expecting one of {', '.join(PARSERS.keys())}")
+    return PARSERS[name]()
+
+def compare_parsers(index_file, target_name, flags=0, names=("bs4", "lxml")):
+    """
+    run the extraction with every backend on the documents mentioning the target, and return
+    the list of (filename, {backend: info}) where the backends disagree
+    """
+    from analysis import Analysis
+    ana = Analysis(target_name, index_file)
+    diffs = []
+    for filename, _ in ana.iter_target_documents(flags):
+        infos = {name: ana.extract_assets(filename, flags, parser=name) for name in names}
+        if len(set(infos.values())) > 1:
+            utils.logger.error(f"parser backends disagree on {filename}")
+            diffs.append((filename, infos))
+    return diffs
+
+if __name__ == '__main__':
+    # check the backends against the golden specs which have been downloaded
+    import os
+    from main import TestMainFlow
+    for spec in TestMainFlow.specs:
+        index_file = os.path.join(".", spec[0], "download.idx")
+        if os.path.exists(index_file):
+            diffs = compare_parsers(index_file, spec[1])
+            utils.logger.info(f"{spec[0]} {spec[1]}: {len(diffs)} documents differ")
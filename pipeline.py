@@ -0,0 +1,342 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from analysis import Analysis
+from fillings import Company
+from textindex import TextIndex
+from store import FilingStore
+from catalog import FilingCatalog
+from fullindex import FullIndex
+from parsecache import ParseCache
+from planner import plan_specs
+from cache import default_cache
+from collections import OrderedDict
+import concurrent.futures
+import multiprocessing,os,queue,threading
+import client
+import metrics
+import sinks
+import utils
+
+class ScanPipeline():
+    """
+    producer/consumer pipeline which overlaps the downloading and the scanning of the filings:
+    a producer thread downloads the documents of a cik from oldest to latest and pushes them into
+    a bounded queue, and a pool of worker threads scans each document as soon as it lands on disk.
+    The later documents mentioning a target are listed after its earliest acquisition report, unless
+    'list_rest' is False, then the downloading and the scanning stop once it is located.
+    """
+
+    def __init__(self, workers=4, queue_size=16, flags=0, refresh=False, text_index=None, parser=None, matcher=None,
+            windowed=False, store=None, catalog=None, parse_cache=None, submission=False, list_rest=True):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        # case-sensitive by default, or re.IGNORECASE for case-insensive match
+        self.flags = flags
+        # download the filings missing from an existing index instead of using it as it is
+        self.refresh = refresh
+        # an optional TextIndex which is kept up to date with the downloaded documents, and
+        # narrows down the documents to scan for every target
+        self.text_index = text_index
+        # the html parser backend of the extraction, see parsers.PARSERS
+        self.parser = parser
+        # the matcher backend of the keyword sets, see matchers.BACKENDS
+        self.matcher = matcher
+        # parse only the fragments around the target mentions, see Analysis.extract_assets()
+        self.windowed = windowed
+        # an optional FilingStore which keeps the downloaded documents compressed and deduplicated
+        self.store = store
+        # an optional FilingCatalog which records the downloaded documents of all the ciks, and
+        # serves the documents of the period from an existing index
+        self.catalog = catalog
+        # an optional ParseCache which the extraction reuses the parse product of the documents from
+        self.parse_cache = parse_cache
+        # retrieve every filing by its complete submission text file, see Company.download_submission()
+        self.submission = submission
+        # keep downloading and scanning after every target has its acquisition report, so that all the
+        # later matches are listed, without being analyzed, like Analysis.iter_acquisition_reports()
+        self.list_rest = list_rest
+
+    def run(self, cik, target_name, since_date, to_date, filling_types={"10-K", "10-Q"}, raw_dir="."):
+        """
+        locate the documents mentioning the target in time-asending order, and return a list of
+        dictionaries with 'FILENAME'/'FILLING_TYPE'/'FILLING_DATE'/'FILLING_URL'/'INFO' keyed-values,
+        where only the earliest acquisition report has a non-empty 'INFO', and is the last one.
+        The documents failed to be analyzed have the error message as 'ERROR' too.
+        """
+        return self.run_targets(cik, [target_name], since_date, to_date, filling_types, raw_dir)[target_name]
+
+    def run_targets(self, cik, target_names, since_date, to_date, filling_types={"10-K", "10-Q"}, raw_dir=".",
+            fillings=None, windows=None, target_windows=None):
+        """
+        the same as run() but for all the targets acquired by a cik, every document is downloaded
+        and scanned once for all of them. Return a map with target name as key and the list of
+        run() as value; without 'list_rest', the downloading is cancelled once every target has its
+        acquisition report.
+        The filings of the cik discovered during the period, see FullIndex.discover(), are
+        downloaded without searching the browse-edgar listing.
+        With 'windows', a sorted list of (since_date, to_date) without overlaps within the period, see
+        planner.CikPlan, only the filings within them are downloaded and scanned, and with 'target_windows',
+        a map with target name as key and its windows as value, a target is only searched in the filings
+        within its own windows.
+        """
+        index_file = os.path.join(raw_dir, cik, "download.idx")
+        target_names = list(OrderedDict.fromkeys(target_names))
+        analyses = {target_name: Analysis(target_name, index_file, self.parser, self.matcher, self.catalog) for target_name in target_names}
+        jobs = queue.Queue(maxsize=self.queue_size)
+        cancel = threading.Event()
+        lock = threading.Lock()
+        state = {"error": None}
+        found = {}
+        results = {target_name: {} for target_name in target_names}
+        candidates = {}
+        if self.text_index is not None:
+            candidates = {target_name: self.text_index.candidates(target_name) for target_name in target_names}
+
+        periods = windows if windows is not None else [(since_date, to_date)]
+
+        def in_periods(dict, periods=periods):
+            date = Company.try_parsing_date(dict["FILLING_DATE"])
+            return any(Company.try_parsing_date(since) <= date and (to == "" or date <= Company.try_parsing_date(to))
+                for since, to in periods)
+
+        def download(company):
+            for since, to in periods:
+                if cancel.is_set():
+                    return
+                yield from company.iter_documents(since, to, filling_types, raw_dir, cancel, incremental=True,
+                    store=self.store, catalog=self.catalog, submission=self.submission)
+
+        def produce():
+            try:
+                # the index left by a cancelled download misses the later filings, which are fetched
+                if os.path.exists(index_file) and not self.refresh and not Company.index_incomplete(os.path.dirname(index_file)):
+                    if self.catalog is not None:
+                        with metrics.timer("index"):
+                            self.catalog.import_index(index_file, cik)
+                            entries = [entry for since, to in periods
+                                for entry in self.catalog.documents(cik, filling_types, since, to).items()]
+                    else:
+                        entries = [(filename, dict) for filename, dict in Analysis.read_index(index_file).items() if in_periods(dict)]
+                else:
+                    company = Company(cik)
+                    if fillings is not None:
+                        company.use_fillings(fillings, since_date, to_date)
+                    utils.logger.info(f"\tdownloading {'/'.join(filling_types)} documents for cik:{cik}...")
+                    entries = download(company)
+                # the downloading generator stops by itself once cancelled, the index entries here
+                for seq, (filename, dict) in enumerate(entries):
+                    if cancel.is_set():
+                        break
+                    jobs.put((seq, filename, dict))
+            except Exception as e:
+                state["error"] = e
+                cancel.set()
+            finally:
+                for _ in range(self.workers):
+                    jobs.put(None)
+
+        def analyze(seq, filename, dict, target_name, offsets=None):
+            record = {"FILENAME": filename, "INFO": None}
+            record.update(dict)
+            with lock:
+                results[target_name][seq] = record
+                # an earlier document has already been confirmed, skip the extraction
+                if target_name in found and found[target_name] < seq:
+                    return
+            utils.logger.info(f'\tfound {target_name} in {filename}, analyzing...')
+            try:
+                with metrics.default_metrics().profile(filename, target_name):
+                    info = analyses[target_name].extract_assets(filename, self.flags, windowed=self.windowed,
+                        parse_cache=self.parse_cache, offsets=offsets)
+            except Exception as e:
+                error = utils.traceback.format_exc()
+                utils.logger.error(f"Failed in analyzing document:{filename}...\n{error}")
+                with lock:
+                    record["ERROR"] = error
+                return
+            if info is None:
+                return
+            with lock:
+                record["INFO"] = info
+                if target_name not in found or seq < found[target_name]:
+                    found[target_name] = seq
+                # no need to download the later documents any more, unless they are listed
+                if len(found) == len(target_names) and not self.list_rest:
+                    cancel.set()
+
+        def consume():
+            while True:
+                job = jobs.get()
+                if job is None:
+                    return
+                seq, filename, dict = job
+                if state["error"] is not None:
+                    continue
+                # a failed document is logged and skipped, the queue is always drained so that the
+                # producer never blocks on a full queue
+                try:
+                    names = target_names
+                    if target_windows is not None:
+                        names = [name for name in names if name not in target_windows or in_periods(dict, target_windows[name])]
+                    # the candidates are unknown for the documents which are not indexed yet
+                    if self.text_index is not None and not self.text_index.add(filename):
+                        names = [name for name in names if candidates[name] is None or os.path.normpath(filename) in candidates[name]]
+                    # a target with an earlier acquisition report isn't searched any more, unless listed
+                    if not self.list_rest:
+                        with lock:
+                            names = [name for name in names if name not in found or seq < found[name]]
+                    # the windowed extraction cuts the fragments around the mentions found by the scan
+                    offsets = {} if self.windowed else None
+                    for target_name in Analysis.full_text_search_targets(filename, names, self.flags, offsets):
+                        analyze(seq, filename, dict, target_name, offsets.get(target_name) if offsets is not None else None)
+                except Exception as e:
+                    utils.logger.error(f"Failed in scanning document:{filename}...\n{utils.traceback.format_exc()}")
+
+        threads = [threading.Thread(target=produce, name=f"download-{cik}")]
+        threads += [threading.Thread(target=consume, name=f"scan-{cik}-{i}") for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if state["error"] is not None:
+            raise state["error"]
+
+        targets = OrderedDict()
+        for target_name in target_names:
+            docs = []
+            for seq in sorted(results[target_name].keys()):
+                record = results[target_name][seq]
+                # the documents scanned concurrently after the acquisition report aren't listed either
+                if not self.list_rest and target_name in found and seq > found[target_name]:
+                    continue
+                # only the earliest acquisition report is kept, the later matches are listed without it
+                if seq != found.get(target_name):
+                    record["INFO"] = None
+                docs.append(record)
+            targets[target_name] = docs
+        return targets
+
+def _init_worker(rate):
+    # every worker process takes its share of the requests-per-second budget
+    client.configure_default_client(rate=rate)
+
+def _run_group(cik, target_names, since_date, to_date, filling_types, raw_dir, options, fillings=None, windows=None,
+        target_windows=None):
+    """
+    scan the documents of a cik for all of its targets in a worker process, return a tuple of
+    (cik, the map of ScanPipeline.run_targets(), error message, Metrics.records()) which pickles as
+    plain data.
+    """
+    options = dict(options)
+    # the stages of the cik are recorded apart from the rest of the process
+    group_metrics = metrics.Metrics(options.pop("profile_dir", None))
+    previous_metrics = metrics.configure_default_metrics(group_metrics)
+    text_index_path = options.pop("text_index", None)
+    text_index = TextIndex(text_index_path) if text_index_path is not None else None
+    store_path = options.pop("store", None)
+    store = FilingStore(store_path) if store_path is not None else None
+    catalog_path = options.pop("catalog", None)
+    catalog = FilingCatalog(catalog_path) if catalog_path is not None else None
+    parse_cache_path = options.pop("parse_cache", None)
+    parse_cache = ParseCache(parse_cache_path) if parse_cache_path is not None else None
+    pipeline = ScanPipeline(text_index=text_index, store=store, catalog=catalog, parse_cache=parse_cache, **options)
+    try:
+        return cik, pipeline.run_targets(cik, target_names, since_date, to_date, filling_types, raw_dir, fillings,
+            windows, target_windows), None, group_metrics.records()
+    except Exception as e:
+        return cik, None, utils.traceback.format_exc(), group_metrics.records()
+    finally:
+        metrics.configure_default_metrics(previous_metrics)
+        utils.logger.info(f"EDGAR page cache after cik:{cik}: {default_cache().stats()}")
+        if text_index is not None:
+            text_index.close()
+        if catalog is not None:
+            catalog.close()
+        if parse_cache is not None:
+            utils.logger.info(f"parse cache after cik:{cik}: {parse_cache.stats()}")
+            parse_cache.close()
+
+class SpecRunner():
+    """
+    run the specs over a pool of processes, where the specs of one cik are handled together by a
+    ScanPipeline in one worker. The results are keyed by cik, so the report could be written in the
+    original spec order no matter which worker finishes first.
+    """
+
+    def __init__(self, processes=None, workers=4, queue_size=16, flags=0, refresh=False, text_index=None, parser=None,
+            matcher=None, windowed=False, store=None, catalog=None, full_index=None, parse_cache=None, profile_dir=None,
+            submission=False, list_rest=True):
+        self.processes = processes if processes is not None else (os.cpu_count() or 1)
+        # the directory of the quarterly full-index files, which the filings of all the ciks are
+        # discovered from at once instead of the browse-edgar listing of every cik
+        self.full_index = full_index
+        # the options passed to the ScanPipeline of every worker, the TextIndex, the FilingStore, the
+        # FilingCatalog and the ParseCache are given by their paths, and the directory which the
+        # cProfile dump of every analyzed document is kept in, if any, goes to the Metrics
+        self.options = {"workers": workers, "queue_size": queue_size, "flags": flags, "refresh": refresh,
+            "text_index": text_index, "parser": parser, "matcher": matcher, "windowed": windowed, "store": store,
+            "catalog": catalog, "parse_cache": parse_cache, "profile_dir": profile_dir, "submission": submission,
+            "list_rest": list_rest}
+
+    def run(self, specs, since_date, to_date, filling_types={"10-K", "10-Q"}, raw_dir=".", sink=None, journal=None,
+            window=None):
+        """
+        return a map with cik as key and the map of ScanPipeline.run_targets() as value, which is
+        None if the documents of the cik failed to be downloaded.
+        With a sink, see sinks.JsonlSink, the records of every cik are written into it as soon as the
+        cik is done instead of being kept, and the map only has True as the value of the done ciks.
+        With a RunJournal, the outcome of every cik is committed into it as soon as the cik is done,
+        see RunJournal.pending() for the specs to run again.
+        The stages of every cik are merged into the metrics.default_metrics() of this process.
+        The specs are planned by cik at one pass, see planner.plan_specs(), so they could be streamed;
+        with 'window', like planner.deal_window(), every spec is searched within its own dates and
+        the period from 'since_date' to 'to_date' is only for the specs without any.
+        """
+        plans = plan_specs(specs, since_date, to_date, window)
+        # every cik is downloaded within the hull of its windows, and the filings of all of them are
+        # discovered within the hull of those
+        hulls = OrderedDict((cik, (plan.windows[0][0], plan.windows[-1][1])) for cik, plan in plans.items())
+        discovered = {}
+        if self.full_index is not None and len(hulls) > 0:
+            discovered = FullIndex(self.full_index).discover(plans.keys(), min(since for since, _ in hulls.values()),
+                max(to for _, to in hulls.values()), filling_types)
+        args = [(cik, plan.target_names, hulls[cik][0], hulls[cik][1], filling_types, raw_dir, self.options,
+            discovered.get(cik), plan.windows, plan.target_windows) for cik, plan in plans.items()]
+        results = OrderedDict((cik, None) for cik in plans.keys())
+
+        def done(outcome):
+            cik, result, error, records = outcome
+            metrics.default_metrics().merge(records, cik)
+            if error is not None:
+                utils.logger.error(f"Failed to download documents for cik:{cik}...\n{error}")
+                if journal is not None:
+                    journal.fail(cik, plans[cik].target_names, "download", error)
+                return
+            if sink is None:
+                results[cik] = result
+            else:
+                for record in sinks.spec_records(cik, result):
+                    sink.write(record)
+                results[cik] = True
+            # the records are in the sink before the cik is recorded as done
+            if journal is not None:
+                journal.complete(cik, result)
+
+        if self.processes <= 1 or len(args) <= 1:
+            for arg in args:
+                done(_run_group(*arg))
+        else:
+            processes = min(self.processes, len(args))
+            with concurrent.futures.ProcessPoolExecutor(max_workers=processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker, initargs=(client.MAX_RATE / processes,)) as executor:
+                futures = [executor.submit(_run_group, *arg) for arg in args]
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        done(future.result())
+                except BaseException:
+                    # on Ctrl-C the ciks not started yet are dropped, the done ones are journaled
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+        return results
@@ -0,0 +1,83 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from collections import OrderedDict
+from datetime import timedelta
+from fillings import Company
+import utils
+
+# the days searched before the announcement of a deal, for the filings mentioning it first
+LEAD_DAYS = 90
+# the days searched after the deal is effective, so the 10-K of its fiscal year is covered
+LAG_DAYS = 450
+
+def deal_window(lead_days=LEAD_DAYS, lag_days=LAG_DAYS):
+    """
+    return the window function of plan_specs() which searches a spec from 'lead_days' before its
+    announcement date to 'lag_days' after its effective date, see utils.iter_specs(); a spec with one
+    of the dates uses it for both, and one without any date gets None, i.e. the default period
+    """
+    def window(spec):
+        dates = sorted(Company.try_parsing_date(date) for date in spec[3:5] if date != "")
+        if len(dates) == 0:
+            return None
+        return ((dates[0] - timedelta(days=lead_days)).strftime("%Y/%m/%d"),
+            (dates[-1] + timedelta(days=lag_days)).strftime("%Y/%m/%d"))
+    return window
+
+class CikPlan():
+    """
+    the work of one cik in a run: the filings of its merged windows are downloaded and scanned
+    once for all of its targets
+    """
+    def __init__(self, cik):
+        self.cik = cik
+        # the target names in the order of their first appearance
+        self.target_names = []
+        # the (since, to) dates of every target, before being merged
+        self.periods = OrderedDict()
+
+    def add(self, target_name, since, to):
+        if target_name not in self.periods:
+            self.target_names.append(target_name)
+            self.periods[target_name] = []
+        self.periods[target_name].append((since, to))
+
+    @staticmethod
+    def _merge(periods):
+        return [(since.strftime("%Y/%m/%d"), to.strftime("%Y/%m/%d")) for since, to in Company.merge_periods(periods)]
+
+    @property
+    def windows(self):
+        """
+        the sorted (since_date, to_date) windows covering the periods of all the targets without overlaps
+        """
+        return self._merge([period for periods in self.periods.values() for period in periods])
+
+    @property
+    def target_windows(self):
+        """
+        a map with target name as key and the sorted windows of the target as value
+        """
+        return OrderedDict((target_name, self._merge(periods)) for target_name, periods in self.periods.items())
+
+def plan_specs(specs, since_date, to_date, window=None):
+    """
+    group the specs by cik in the order of their first appearance, and return a map with cik as key and
+    the CikPlan as value. The specs could be streamed, like utils.iter_specs(), as they are read once.
+    'window(spec)' returns the (since_date, to_date) of a spec, like deal_window(), or None for the
+    default period, which all of them have without it.
+    """
+    plans = OrderedDict()
+    count = 0
+    for spec in specs:
+        spec_since, spec_to = (window(spec) if window is not None else None) or (since_date, to_date)
+        to = Company.try_parsing_date(spec_to) if spec_to != "" else Company.today()
+        plan = plans.get(spec[0])
+        if plan is None:
+            plan = plans[spec[0]] = CikPlan(spec[0])
+        plan.add(spec[1], Company.try_parsing_date(spec_since), to)
+        count += 1
+    windows = sum(len(plan.windows) for plan in plans.values())
+    utils.logger.info(f"planned {count} specs into {len(plans)} ciks and {windows} download windows")
+    return plans
@@ -3,14 +3,15 @@ from fillings import Company
 from analysis import Analysis
 if __name__ == '__main__':
     specs = utils.read_specs("./firms.xlsx")
+    # the metadata of all the acquirors are fetched at once, and kept in the cache for the next runs
+    companies = Company.prefetch_info(spec[0] for spec in specs)
     for spec in specs:
         cik = spec[0]
         target_name = spec[1]
         golden_doc = spec[2]
         acq_name = spec[5]
-        try:
-            company = Company(cik)
-        except Exception as e:
-            utils.logger.error(f"Failed to create instance for {acq_name}...\n{utils.traceback.format_exc()}")
+        company = companies.get(cik)
+        if company is None or company.name is None:
+            utils.logger.error(f"Failed to load the metadata of cik:{cik} for {acq_name}")
             continue
-        del company
+        utils.logger.info(f"{cik}\t{company.name}\tSIC:{company.sic}\t{company.us_state}\t{acq_name}")
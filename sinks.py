@@ -0,0 +1,193 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from collections import OrderedDict
+from datetime import datetime
+import json,os
+import xlsxwriter
+import utils
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# the fields of a result record, one per (spec, filing), where 'SEQ' is the order of the filing in the spec
+# and 'ERROR' the failure of its extraction, if any
+FIELDS = ("CIK", "TARGET_NAME", "SEQ", "FILENAME", "FILLING_TYPE", "FILLING_DATE", "FILLING_URL", "INFO", "ERROR")
+
+def spec_records(cik, targets):
+    """
+    yield the records of the map of ScanPipeline.run_targets() for a cik, target by target and in
+    time-asending order
+    """
+    for target_name, docs in targets.items():
+        for seq, doc in enumerate(docs):
+            record = OrderedDict((field, doc.get(field)) for field in FIELDS)
+            record["CIK"] = cik
+            record["TARGET_NAME"] = target_name
+            record["SEQ"] = seq
+            yield record
+
+class JsonlSink():
+    """
+    write every record as a JSON line as soon as it is produced, so a crash keeps all the records
+    written before it
+    """
+    def __init__(self, filename, append=False):
+        self.filename = filename
+        self._output = open(filename, "a" if append else "w", encoding="UTF-8")
+
+    def write(self, record):
+        self._output.write(json.dumps(record) + "\n")
+        self._output.flush()
+
+    def close(self):
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+
+class ParquetSink():
+    """
+    write the records into a parquet file in row groups of 'batch_size' records, which requires pyarrow;
+    the file is only readable once closed
+    """
+    def __init__(self, filename, batch_size=1024):
+        if pyarrow is None:
+            raise ImportError(f"the pyarrow package is required to write {filename}")
+        self.filename = filename
+        self.batch_size = batch_size
+        self.schema = pyarrow.schema([(field, pyarrow.int32() if field == "SEQ" else pyarrow.string()) for field in FIELDS])
+        self._batch = []
+        self._writer = pyarrow.parquet.ParquetWriter(filename, self.schema)
+
+    def write(self, record):
+        self._batch.append(record)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if len(self._batch) > 0:
+            self._writer.write_table(pyarrow.Table.from_pylist(self._batch, schema=self.schema))
+            self._batch = []
+
+    def close(self):
+        if self._writer is not None:
+            self.flush()
+            self._writer.close()
+            self._writer = None
+
+class MultiSink():
+    """
+    write every record into all the sinks
+    """
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def write(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+class XlsxReport():
+    """
+    build the xlsx report from the records of a JsonlSink or a RunJournal, with a worksheet per
+    spec in the spec order. The workbook is written in constant-memory mode and the records are read back one spec
+    at a time, so the memory doesn't grow with the number of specs.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+
+    @staticmethod
+    def locate_specs(jsonl_file):
+        """
+        return a map with (cik, target name) as key and the (offset, count) of its records in the file
+        as value; the records of a spec written again, like by a rerun, replace the earlier ones
+        """
+        blocks = {}
+        spec = None
+        offset = 0
+        with open(jsonl_file, "rb") as input:
+            for line in input:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line cut short by a crash
+                    break
+                key = (record["CIK"], record["TARGET_NAME"])
+                if key != spec or record["SEQ"] == 0:
+                    spec = key
+                    blocks[key] = (offset, 0)
+                blocks[key] = (blocks[key][0], blocks[key][1] + 1)
+                offset += len(line)
+        return blocks
+
+    def build(self, specs, jsonl_file):
+        """
+        build the report from the records of the specs in a JSON lines file
+        """
+        blocks = self.locate_specs(jsonl_file) if os.path.exists(jsonl_file) else {}
+        input = open(jsonl_file, "rb") if len(blocks) > 0 else None
+
+        def read(cik, target_name):
+            if (cik, target_name) not in blocks:
+                return
+            offset, count = blocks[(cik, target_name)]
+            input.seek(offset)
+            for _ in range(count):
+                yield json.loads(input.readline())
+
+        try:
+            return self.write(specs, read)
+        finally:
+            if input is not None:
+                input.close()
+
+    def write(self, specs, read):
+        """
+        build the report with 'read(cik, target name)' yielding the records of every spec in order
+        """
+        workbook = xlsxwriter.Workbook(self.filename, {"constant_memory": True})
+        red_format = workbook.add_format({
+            'font_color': 'red',
+            'bold':       1,
+            'underline':  1,
+            'font_size':  12,
+            })
+        # keep the report identical between runs with the same results
+        workbook.set_properties({'created': datetime(2000, 1, 1)})
+        reported = set()
+        try:
+            for spec in specs:
+                cik = spec[0]
+                target_name = spec[1]
+                if (cik, target_name) in reported:
+                    continue
+                reported.add((cik, target_name))
+                clean_name = ''.join(e for e in target_name if e.isalnum())
+                # A company could acquire lots of small company during a period
+                worksheet = workbook.add_worksheet(f"{cik}-{clean_name}")
+                worksheet.set_column('A:A', 35)
+                worksheet.set_column('B:B', 150)
+                worksheet.write_string('A1', "Target Name:")
+                worksheet.write_string('B1', target_name)
+                utils.logger.info(f'reporting acquisition asset information about {target_name} in {cik} docs...')
+                for row, record in enumerate(read(cik, target_name), 2):
+                    filename = record['FILENAME']
+                    info = record['INFO']
+                    if info is None:
+                        worksheet.write_url(f"A{row}", record['FILLING_URL'], string=filename)
+                        continue
+                    worksheet.write_url(f"A{row}", record['FILLING_URL'], red_format, string=filename)
+                    worksheet.write_string(f"B{row}", info)
+                    utils.logger.info(f"!!!!located acquisition asset report!!!!")
+                    utils.logger.info(f"\tCIK:{cik}\tTarget:{target_name}\tDate:{record['FILLING_DATE']}\t{record['FILLING_TYPE']}:{filename}")
+                    utils.logger.info(f"\tFilling Details:{record['FILLING_URL']}")
+                    utils.logger.info(f"{info}\n")
+        finally:
+            workbook.close()
+        return self.filename
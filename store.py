@@ -0,0 +1,195 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from contextlib import contextmanager
+import gzip,hashlib,mmap,os,shutil,threading
+import utils
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# the suffixes of the compressed filings, which tell the readers how to decompress them
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+# the size of the chunks a compressed filing is decompressed in
+CHUNK_SIZE = 1 << 20
+
+def open_filing(filename):
+    """
+    open a downloaded filing as a binary stream, the ones compressed by a FilingStore are
+    decompressed on the fly
+    """
+    if filename.endswith(SUFFIXES["gzip"]):
+        return gzip.open(filename, 'rb')
+    if filename.endswith(SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise ImportError(f"the zstandard package is required to read {filename}")
+        return zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'), closefd=True)
+    return open(filename, 'rb')
+
+def read_filing(filename):
+    """
+    return the whole content of a downloaded filing, for the readers which can't do with chunks
+    """
+    with open_filing(filename) as input:
+        return input.read()
+
+def iter_filing(filename, chunk_size=None):
+    """
+    stream the content of a downloaded filing in chunks, the compressed one is decompressed chunk
+    by chunk
+    """
+    with open_filing(filename) as input:
+        while True:
+            chunk = input.read(chunk_size or CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+def filing_digest(filename):
+    """
+    return the (size, sha256) of the content of a downloaded filing, read chunk by chunk
+    """
+    size, digest = 0, hashlib.sha256()
+    for chunk in iter_filing(filename):
+        size += len(chunk)
+        digest.update(chunk)
+    return size, digest.hexdigest()
+
+def is_compressed(filename):
+    return any(filename.endswith(suffix) for suffix in SUFFIXES.values())
+
+def _iter_blocks(filename, delimiter, chunk_size):
+    offset = 0
+    rest = b""
+    for chunk in iter_filing(filename, chunk_size):
+        block = rest + chunk
+        cut = block.rfind(delimiter) + 1
+        # a line longer than a chunk is kept until it ends
+        if cut == 0:
+            rest = block
+            continue
+        yield offset, block[:cut]
+        offset += cut
+        rest = block[cut:]
+    if len(rest) > 0:
+        yield offset, rest
+
+@contextmanager
+def filing_blocks(filename, delimiter=b"\n", chunk_size=None, mapped=True):
+    """
+    provide the content of a downloaded filing for the regex scans as an iterator of (offset, block),
+    where the block is a bytes-like object starting at the byte 'offset'. A plain file is memory mapped
+    as one block, and a compressed one is decompressed block by block, each ending right after a
+    'delimiter', so that a match within a line is never split and only about a chunk is in memory.
+    Without 'mapped', a plain file is read block by block too, for the scans which copy the blocks.
+    """
+    if is_compressed(filename) or not mapped:
+        blocks = _iter_blocks(filename, delimiter, chunk_size)
+        try:
+            yield blocks
+        finally:
+            # the decompressing stream is closed even if the scan stops early
+            blocks.close()
+    elif os.path.getsize(filename) == 0:
+        yield iter([])
+    else:
+        with open(filename, 'rb', 0) as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield iter([(0, mm)])
+
+class FilingStore():
+    """
+    content-addressed store of the downloaded filings: every distinct document is compressed once
+    under the sha256 of its content as 'objects/<first 2 hex digits>/<digest><suffix>', and the
+    filing paths recorded in download.idx are hard links to the objects, so that the identical
+    documents of different filings and ciks share one compressed copy on disk.
+    zstd is used if the zstandard package is installed, otherwise gzip.
+    """
+    def __init__(self, root="store", codec=None, level=None):
+        self.root = root
+        self.codec = codec if codec is not None else ("zstd" if zstandard is not None else "gzip")
+        if self.codec not in SUFFIXES:
+            raise ValueError(f"unknown codec {self.codec}, choose one of {', '.join(SUFFIXES.keys())}")
+        if self.codec == "zstd" and zstandard is None:
+            raise ImportError("the zstandard package is required by the zstd codec")
+        self.suffix = SUFFIXES[self.codec]
+        self.level = level if level is not None else (10 if self.codec == "zstd" else 6)
+        self.stats = {"stored": 0, "deduplicated": 0, "raw_bytes": 0, "stored_bytes": 0}
+        self._lock = threading.Lock()
+
+    def compress(self, content):
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(content)
+        # a fixed mtime keeps the compressed copy of the same content identical
+        return gzip.compress(content, compresslevel=self.level, mtime=0)
+
+    def object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest + self.suffix)
+
+    def put(self, content):
+        """
+        store the content unless an identical one is stored already, return the path of the object
+        """
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        with self._lock:
+            self.stats["raw_bytes"] += len(content)
+            if os.path.exists(path):
+                self.stats["deduplicated"] += 1
+                return path
+        compressed = self.compress(content)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # the temporary name is unique per thread, the first finished copy wins
+        tmpname = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmpname, "wb") as output:
+            output.write(compressed)
+        os.replace(tmpname, path)
+        with self._lock:
+            self.stats["stored"] += 1
+            self.stats["stored_bytes"] += len(compressed)
+        return path
+
+    def link(self, content, filename):
+        """
+        store the content and make 'filename' plus the codec suffix point to it, return the linked
+        filename which is read back by open_filing()
+        """
+        path = self.put(content)
+        target = filename + self.suffix
+        tmpname = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(path, tmpname)
+        except OSError:
+            # no hard link across devices or on some file systems, keep a compressed copy instead
+            shutil.copyfile(path, tmpname)
+        os.replace(tmpname, target)
+        return target
+
+    def migrate(self, index_file):
+        """
+        move the plain documents recorded in a download.idx into the store and rewrite the index
+        with the linked filenames, return the number of documents being moved
+        """
+        entries = utils.read_index(index_file)
+        count = 0
+        with open(index_file + ".tmp", 'w', encoding="UTF-8") as logfile:
+            for filename, dic in entries.items():
+                if os.path.exists(filename) and not is_compressed(filename):
+                    with open(filename, 'rb') as input:
+                        linked = self.link(input.read(), filename)
+                    os.remove(filename)
+                    filename = linked
+                    count += 1
+                logfile.write(f'{dic["FILLING_TYPE"]}\t{dic["FILLING_DATE"]}\t{filename}\t{dic["FILLING_URL"]}\n')
+        os.replace(index_file + ".tmp", index_file)
+        utils.logger.info(f"moved {count} documents of {index_file} into the store {self.root}: {self.stats}")
+        return count
+
+if __name__ == '__main__':
+    # python store.py <store dir> <cik>/download.idx ...
+    import sys
+    store = FilingStore(sys.argv[1])
+    for index_file in sys.argv[2:]:
+        store.migrate(index_file)
@@ -0,0 +1,131 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+import os,re
+import utils
+
+# the partial line kept while splitting is written out once it grows beyond this, so that a document
+# of one long line of html isn't held in memory
+MAX_LINE = 64 * 1024
+HEADER_TAG = re.compile(rb"^<(TYPE|SEQUENCE|FILENAME|DESCRIPTION)>(.*)$")
+
+def submission_url(detail_url):
+    """
+    return the url of the complete submission text file of a filing from its 'Filling Detail' page, like
+    .../000104746906011256/0001047469-06-011256-index.htm -> .../000104746906011256/0001047469-06-011256.txt
+    """
+    return re.sub(r"-index\.html?$", ".txt", detail_url)
+
+class SubmissionSplitter():
+    """
+    split a complete submission text file into its <DOCUMENT> parts while it is fed chunk by chunk, and
+    write every part of the 'types' into 'dir' as a document of its own, named after its <FILENAME> like
+    Company.download_document() names the document urls. The part is written as it is, from <DOCUMENT>
+    to </DOCUMENT>, which is what the parser backends look for; the other parts, like the exhibits and
+    the uuencoded graphics, are dropped line by line.
+    With a FilingStore, the parts are kept compressed in the store instead.
+    """
+    def __init__(self, dir, types, prefix="", store=None):
+        self.dir = dir
+        self.types = set(types)
+        self.prefix = prefix
+        self.store = store
+        # the filenames of the parts written, or found on disk already, in submission order
+        self.filenames = []
+        self._rest = b""
+        # the rest is the tail of a line whose head has been passed on already
+        self._midline = False
+        # the lines and the tags of the header of the part being read, None out of the header
+        self._header = None
+        self._tags = {}
+        # the part being written: its filename and either the chunks for the store or the temporary file
+        self._filename = None
+        self._chunks = None
+        self._output = None
+        self._in_part = False
+
+    def feed(self, chunk):
+        lines = (self._rest + chunk).split(b"\n")
+        self._rest = lines.pop()
+        for line in lines:
+            self._line(line + b"\n")
+            self._midline = False
+        if len(self._rest) > MAX_LINE and self._header is None:
+            self._write(self._rest)
+            self._rest = b""
+            self._midline = True
+
+    def _line(self, line):
+        if self._midline:
+            self._write(line)
+            return
+        stripped = line.strip()
+        if not self._in_part:
+            if stripped == b"<DOCUMENT>":
+                self._in_part = True
+                self._header = [line]
+                self._tags = {}
+            return
+        if self._header is not None:
+            self._header.append(line)
+            match = HEADER_TAG.match(stripped)
+            if match is not None:
+                self._tags[match.group(1)] = match.group(2).strip().decode("UTF-8", "replace")
+            if stripped.startswith(b"<TEXT>") or stripped == b"</DOCUMENT>":
+                self._open()
+            if stripped == b"</DOCUMENT>":
+                self._finish()
+            return
+        self._write(line)
+        if stripped == b"</DOCUMENT>":
+            self._finish()
+
+    def _open(self):
+        header, self._header = self._header, None
+        if self._tags.get(b"TYPE") not in self.types:
+            return
+        name = os.path.basename(self._tags.get(b"FILENAME", "")) or f"{self._tags.get(b'SEQUENCE', len(self.filenames))}.txt"
+        filename = os.path.join(self.dir, f"{self.prefix.strip()}_{name}" if len(self.prefix) != 0 else name)
+        # filings never change, the file left by an earlier run is as good as a new one
+        for existing in ([filename + self.store.suffix] if self.store is not None else []) + [filename]:
+            if os.path.exists(existing):
+                self.filenames.append(existing)
+                return
+        self._filename = filename
+        if self.store is not None:
+            self._chunks = []
+        else:
+            self._output = open(filename + ".tmp", "wb")
+        for line in header:
+            self._write(line)
+
+    def _write(self, data):
+        if self._chunks is not None:
+            self._chunks.append(data)
+        elif self._output is not None:
+            self._output.write(data)
+
+    def _finish(self):
+        if self._chunks is not None:
+            self.filenames.append(self.store.link(b"".join(self._chunks), self._filename))
+        elif self._output is not None:
+            self._output.close()
+            os.replace(self._filename + ".tmp", self._filename)
+            self.filenames.append(self._filename)
+        self._filename, self._chunks, self._output = None, None, None
+        self._in_part = False
+
+    def close(self):
+        """
+        return the filenames of the parts written; a part cut off by the end of the submission is dropped
+        """
+        if self._rest != b"":
+            self.feed(b"\n")
+        if self._in_part:
+            utils.logger.error(f"dropped the truncated document {self._filename or self._tags.get(b'FILENAME')}")
+            if self._output is not None:
+                self._output.close()
+                os.remove(self._filename + ".tmp")
+            self._filename, self._chunks, self._output = None, None, None
+            self._in_part = False
+        return self.filenames
@@ -0,0 +1,219 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from collections import OrderedDict
+import re
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+# the cells which only hold the currency sign or the closing parenthesis/percent sign of the amount
+# in the cell before them, like "$" | "(1,234" | ")" in the EDGAR financial tables
+LEADING_MARKS = {"$"}
+TRAILING_MARKS = {")", "%", ")%"}
+NUMBER = re.compile(r"^-?(\d{1,3}(,\d{3})+|\d+)?(\.\d+)?$")
+
+def parse_number(text):
+    """
+    return the amount of a cell like "$1,234", "(1,234)" or "-12.5" as a float, where the parenthesized
+    amount is negative, or None if it isn't a number
+    """
+    text = text.replace("$", "").replace(" ", "")
+    negative = len(text) > 2 and text[0] == "(" and text[-1] == ")"
+    if negative:
+        text = text[1:-1]
+    if text in ("", "-", ".") or NUMBER.match(text) is None:
+        return None
+    value = float(text.replace(",", ""))
+    return -value if negative else value
+
+def _span(cell, name):
+    try:
+        return max(1, int(cell[name])) if cell.has_attr(name) else 1
+    except ValueError:
+        return 1
+
+def _children(tag, names):
+    """
+    yield the descendants of a tag with one of the 'names', without going into them or into a nested table;
+    the malformed markup could wrap the rows or the cells of a table in other elements
+    """
+    for child in tag.children:
+        if child.name is None or child.name == "table":
+            continue
+        if child.name in names:
+            yield child
+        else:
+            yield from _children(child, names)
+
+class TableGrid():
+    """
+    the cells of a <table> laid out on a grid at one walk through its rows, where a cell spanning
+    several columns or rows covers all of them. The leading rows of header cells, <th> or bold and
+    centered ones, are the headers, and the rest are the body rows, where the currency signs and the
+    closing parentheses of the amounts are merged into their amounts, and the spacer columns without
+    any body cell are dropped. Works on the tags of both the bs4 and the lxml parsers backends.
+    """
+    def __init__(self, table):
+        # the (text, is header, is the first column of its cell) of every slot of the rows, and the slots
+        # of the cells spanning down into the next rows by column
+        grid = []
+        pending = {}
+        for tr in _children(table, ("tr",)):
+            row = []
+            for cell in _children(tr, ("td", "th")):
+                self._fill(row, pending)
+                text = " ".join(cell.get_text().split())
+                header = cell.name == "th" or (cell.has_attr("align") and cell["align"].lower() == "center" and
+                    cell.find("b") is not None)
+                rowspan = _span(cell, "rowspan")
+                for i in range(_span(cell, "colspan")):
+                    if rowspan > 1:
+                        pending[len(row)] = ((text, header, i == 0), rowspan - 1)
+                    row.append((text, header, i == 0))
+            self._fill(row, pending, True)
+            if any(text != "" for text, _, _ in row):
+                grid.append(row)
+        width = max((len(row) for row in grid), default=0)
+        for row in grid:
+            row.extend([("", False, True)] * (width - len(row)))
+
+        count = 0
+        while count < len(grid) and all(header for text, header, _ in grid[count] if text != ""):
+            count += 1
+        header_rows = grid[:count]
+        # a cell spanning columns heads all of them, but only holds a value in the first one
+        body = [self._merge([text if first else "" for text, _, first in row]) for row in grid[count:]]
+        if len(body) > 0:
+            columns = [i for i in range(width) if any(row[i] != "" for row in body)]
+        else:
+            columns = [i for i in range(width) if any(row[i][0] != "" for row in header_rows)]
+        self.headers = [" ".join(row[i][0] for row in header_rows if row[i][0] != "") for i in columns]
+        self.rows = [[row[i] for i in columns] for row in body]
+
+    @staticmethod
+    def _fill(row, pending, last=False):
+        """
+        append the slots of the cells spanning down from the rows above as long as they take the next
+        column of the row, or all of them up to the last one at the end of the row
+        """
+        while len(row) in pending or (last and any(col > len(row) for col in pending)):
+            slot, left = pending.pop(len(row), (("", False, True), 0))
+            if left > 1:
+                pending[len(row)] = (slot, left - 1)
+            row.append(slot)
+
+    @staticmethod
+    def _merge(texts):
+        merged = list(texts)
+        last = None
+        for i, text in enumerate(merged):
+            if text in LEADING_MARKS:
+                merged[i] = ""
+            elif text in TRAILING_MARKS and last is not None:
+                merged[last] += text
+                merged[i] = ""
+            elif text != "":
+                last = i
+        return merged
+
+    @property
+    def values(self):
+        """
+        the body rows with the amounts as floats, the empty cells as None and the rest as text
+        """
+        return [[self._value(text) for text in row] for row in self.rows]
+
+    @staticmethod
+    def _value(text):
+        number = parse_number(text)
+        if number is not None:
+            return number
+        return text if text != "" else None
+
+    @property
+    def columns(self):
+        """
+        the unique column names, the headers or "col<i>" for a column without any
+        """
+        names = []
+        for i, header in enumerate(self.headers):
+            name = header if header != "" else f"col{i}"
+            while name in names:
+                name = f"{name}_{i}"
+            names.append(name)
+        return names
+
+    def to_array(self):
+        """
+        return the body rows as a float numpy array, where the cells which aren't numbers are nan
+        """
+        if numpy is None:
+            raise ImportError("the numpy package is required to build the table arrays")
+        return numpy.array([[value if isinstance(value, float) else numpy.nan for value in row] for row in self.values],
+            dtype=float).reshape(len(self.rows), len(self.headers))
+
+    def to_frame(self):
+        """
+        return the typed body rows as a pandas DataFrame with the column names
+        """
+        if pandas is None:
+            raise ImportError("the pandas package is required to build the table frames")
+        return pandas.DataFrame(self.values, columns=self.columns)
+
+class TableBatch():
+    """
+    the amounts of many tables, e.g. the purchase price allocation tables of many filings, in one
+    columnar result of long format: every amount is one row of the columns 'keys' + ("TABLE", "ROW",
+    "LABEL", "COLUMN", "VALUE"), where the label is the first text cell of its row, so tables of any
+    layout fit together.
+    """
+    FIELDS = ("TABLE", "ROW", "LABEL", "COLUMN", "VALUE")
+
+    def __init__(self, keys=("CIK", "TARGET_NAME", "FILENAME")):
+        self.keys = tuple(keys)
+        self.data = OrderedDict((field, []) for field in self.keys + TableBatch.FIELDS)
+        self.tables = 0
+
+    def add(self, grid, **keys):
+        """
+        add the amounts of a TableGrid with the values of the 'keys' given by name
+        """
+        headers = grid.headers
+        for index, row in enumerate(grid.values):
+            label = next((value for value in row if isinstance(value, str)), None)
+            for column, value in enumerate(row):
+                if not isinstance(value, float):
+                    continue
+                for key in self.keys:
+                    self.data[key].append(keys.get(key))
+                self.data["TABLE"].append(self.tables)
+                self.data["ROW"].append(index)
+                self.data["LABEL"].append(label)
+                self.data["COLUMN"].append(headers[column])
+                self.data["VALUE"].append(value)
+        self.tables += 1
+
+    def __len__(self):
+        return len(self.data["VALUE"])
+
+    def columns(self):
+        """
+        return a map with field as key and the list of its values as value, with the amounts as a float
+        numpy array if numpy is installed
+        """
+        data = OrderedDict(self.data)
+        if numpy is not None:
+            data["VALUE"] = numpy.array(data["VALUE"], dtype=float)
+        return data
+
+    def to_frame(self):
+        if pandas is None:
+            raise ImportError("the pandas package is required to build the table frames")
+        return pandas.DataFrame(self.columns())
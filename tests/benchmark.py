@@ -0,0 +1,227 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+"""
+benchmarks of the scan, the extraction and the download over synthetic EDGAR-like filings.
+
+    PYTHONPATH=. python tests/benchmark.py          # compare with benchmark_baseline.json, exit 1 on a regression
+    PYTHONPATH=. python tests/benchmark.py --save   # record the results as the new baseline
+    PYTHONPATH=. python tests/benchmark.py --size 2000000 --titles 0.1 --tables 50 --placement table
+
+The timings are kept as ratios to a pure python calibration loop timed in the same run, so that the
+baseline roughly carries over to another machine; it only holds for the corpus parameters it was
+recorded with, and should be recorded again once the machine differs a lot, e.g. in its python.
+"""
+
+from collections import OrderedDict
+import argparse,io,json,os,platform,random,shutil,statistics,sys,tempfile,time
+from bs4 import BeautifulSoup
+from analysis import Analysis
+from cache import ResponseCache
+from client import EdgarClient
+from fillings import Company
+from parsecache import ParseCache
+import utils
+from edgar_stub import StubClient, document, serve
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+# a benchmark regresses once it takes longer than its baseline times this
+THRESHOLD = 1.5
+# and more than this many seconds longer, the shortest ones are mostly noise
+NOISE = 0.005
+TARGET = "Sherman Oaks"
+PLACEMENTS = ("section", "table", "toc", "none")
+TITLES = ["Commitments and Contingencies", "Income Taxes", "Segment Information", "Stockholders' Equity", "Debt",
+    "Goodwill and Intangible Assets", "Subsequent Events", "Fair Value Measurements"]
+WORDS = ["the", "company", "revenue", "net", "income", "operations", "quarter", "results", "compared", "to",
+    "prior", "year", "increase", "due", "primarily", "higher", "sales", "costs", "expenses", "cash", "flows"]
+
+def sentence(r):
+    words = [r.choice(WORDS) for _ in range(r.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+def financial_table(r, rows=12):
+    header = "<tr><td></td>" + "".join(f'<td align="center"><b>{year}</b></td>' for year in (2006, 2005)) + "</tr>"
+    body = "".join(f"<tr><td>{r.choice(WORDS).capitalize()} {r.choice(WORDS)}</td><td>$</td><td>{r.randint(1, 99999):,}</td>"
+        f"<td>$</td><td>({r.randint(1, 9999):,})</td></tr>" for _ in range(rows))
+    return f'<table border="0" width="100%">{header}{body}</table>'
+
+def target_block(placement, note):
+    if placement == "section":
+        return (f"<p><b>Note {note}. Business Acquisition</b></p><p><font>On March 1, 2006 we acquired {TARGET} "
+            "for cash. The purchase price was allocated to goodwill and intangible assets.</font></p>")
+    if placement == "table":
+        return (f"<table><tr><td><b>Acquisition of {TARGET}</b></td></tr><tr><td>{TARGET} goodwill</td><td>$</td>"
+            "<td>1,200</td></tr><tr><td>Intangible assets</td><td>$</td><td>300</td></tr></table>")
+    if placement == "toc":
+        return f'<p><a href="#n{note}">Acquisition of {TARGET}</a></p>'
+    return ""
+
+def synthetic_filing(size=500000, titles=0.05, tables=20, placement="section", position=0.7, seed=0, type="10-Q"):
+    """
+    return a raw 10-K/10-Q filing of about 'size' bytes, where 'titles' is the share of the paragraphs
+    following a bold note title, 'tables' is the number of financial tables spread over the document,
+    and the target is mentioned at 'position' (0 to 1) of it as one of PLACEMENTS
+    """
+    if placement not in PLACEMENTS:
+        raise ValueError(f"unknown placement {placement}, choose one of {', '.join(PLACEMENTS)}")
+    r = random.Random(seed)
+    blocks = []
+    length = 0
+    while length < size:
+        block = f"<p><font>{' '.join(sentence(r) for _ in range(r.randint(2, 5)))}</font></p>"
+        if r.random() < titles:
+            block = f"<p><b>Note {len(blocks) + 1}. {r.choice(TITLES)}</b></p>" + block
+        blocks.append(block)
+        length += len(block)
+    for i in range(tables):
+        blocks.insert((i + 1) * len(blocks) // (tables + 1), financial_table(r))
+    blocks.insert(int(position * len(blocks)), target_block(placement, len(blocks)))
+    return document("".join(blocks), type)
+
+def write_corpus(dir, cik="100", docs=8, reported=1, **params):
+    """
+    write the filings of a cik and its download.idx, where the last 'reported' ones have the target
+    section and the others only mention the target in their table of contents, return the index file
+    """
+    os.makedirs(os.path.join(dir, cik), exist_ok=True)
+    index_file = os.path.join(dir, cik, "download.idx")
+    with open(index_file, "w", encoding="UTF-8") as index:
+        for i in range(docs):
+            placement = params.get("placement", "section") if i >= docs - reported else "toc"
+            filename = os.path.join(dir, cik, f"2006{i + 1:02d}15_doc{i}.htm")
+            with open(filename, "w", encoding="UTF-8") as output:
+                output.write(synthetic_filing(seed=i, **dict(params, placement=placement)))
+            index.write(f"10-Q\t2006-{i + 1:02d}-15\t{filename}\thttp://edgar.test/Archives/{cik}/{i}-index.htm\n")
+    return index_file
+
+def measure(function, repeat):
+    """
+    return the fastest and the median seconds of running the function 'repeat' times
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"seconds": min(times), "median": statistics.median(times)}
+
+def calibrate():
+    """
+    a pure python loop which the timings are divided by, to tell the speed of the machine apart
+    """
+    return sum(i * i % 7 for i in range(200000))
+
+def bench_download(dir, docs, size, repeat):
+    """
+    time the download of 'docs' filings of 'size' bytes from a local stub server through EdgarClient,
+    starting from an empty cache and directory every time
+    """
+    body = synthetic_filing(size=size)
+    filings = [(f"2006-{i % 12 + 1:02d}-15", "10-Q", body) for i in range(docs)]
+    server = serve(StubClient({"100": filings}))
+    client = EdgarClient(base_url=f"http://127.0.0.1:{server.server_address[1]}", rate=0)
+    def download():
+        root = tempfile.mkdtemp(dir=dir)
+        cache = ResponseCache(os.path.join(root, "cache.db"))
+        try:
+            Company("100", client, cache).download_documents("2006/01/01", "2006/12/31", {"10-Q"}, root)
+        finally:
+            cache.close()
+            shutil.rmtree(root)
+    try:
+        return measure(download, repeat)
+    finally:
+        client.close()
+        server.shutdown()
+        server.server_close()
+
+def run_benchmarks(size=500000, titles=0.05, tables=20, placement="section", docs=8, repeat=3):
+    """
+    return the map of the benchmark results keyed by name, see measure(), with the 'ratio' of the
+    fastest seconds to the ones of calibrate()
+    """
+    results = OrderedDict()
+    results["calibration"] = measure(calibrate, repeat)
+    dir = tempfile.mkdtemp()
+    try:
+        index_file = write_corpus(dir, docs=docs, size=size, titles=titles, tables=tables, placement=placement)
+        filenames = list(utils.read_index(index_file).keys())
+        results["full_text_search"] = measure(lambda: [Analysis.full_text_search(filename, TARGET) for filename in filenames], repeat)
+        results["locate_target_documents"] = measure(lambda: Analysis(TARGET, index_file).locate_target_documents(), repeat)
+        for name, options in (("bs4", {"parser": "bs4"}), ("bs4-windowed", {"parser": "bs4", "windowed": True}),
+                ("lxml", {"parser": "lxml"})):
+            results[f"extract_assets[{name}]"] = measure(lambda: Analysis(TARGET, None).extract_assets(filenames[-1], **options), repeat)
+        # the parse product is cached by the first run, so this measures the lookups
+        parse_cache = ParseCache(os.path.join(dir, "parse_cache.db"))
+        try:
+            Analysis(TARGET, None).extract_assets(filenames[-1], parser="bs4", parse_cache=parse_cache)
+            results["extract_assets[cached]"] = measure(lambda: Analysis(TARGET, None).extract_assets(filenames[-1],
+                parser="bs4", parse_cache=parse_cache), repeat)
+        finally:
+            parse_cache.close()
+        with open(filenames[-1], "rb") as input:
+            soup_tables = BeautifulSoup(input.read(), "html.parser").find_all("table")
+        results["table2csv"] = measure(lambda: [Analysis.table2csv(table, io.StringIO()) for table in soup_tables], repeat)
+        results["download"] = bench_download(dir, docs, size, repeat)
+    finally:
+        shutil.rmtree(dir)
+    for result in results.values():
+        result["ratio"] = result["seconds"] / results["calibration"]["seconds"]
+    return results
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    return the list of (name, seconds, baseline seconds) of the benchmarks slower than their baseline
+    times the threshold (and by more than NOISE), which could be overridden per benchmark in the 'thresholds' of the baseline.
+    The baseline seconds are its ratios scaled by the calibration of this run.
+    """
+    regressions = []
+    scale = results["calibration"]["seconds"]
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if base is None or name == "calibration":
+            continue
+        expected = base["ratio"] * scale
+        limit = baseline.get("thresholds", {}).get(name, threshold)
+        if result["seconds"] > expected * limit and result["seconds"] - expected > NOISE:
+            regressions.append((name, result["seconds"], expected))
+    return regressions
+
+if __name__ == '__main__':
+    argparser = argparse.ArgumentParser(description="benchmark the pipeline over synthetic filings")
+    argparser.add_argument("--size", type=int, default=500000, help="bytes of every filing")
+    argparser.add_argument("--titles", type=float, default=0.05, help="share of the paragraphs with a bold title")
+    argparser.add_argument("--tables", type=int, default=20, help="financial tables in every filing")
+    argparser.add_argument("--placement", default="section", choices=PLACEMENTS, help="how the target is reported")
+    argparser.add_argument("--docs", type=int, default=8, help="filings in the corpus")
+    argparser.add_argument("--repeat", type=int, default=3)
+    argparser.add_argument("--baseline", default=BASELINE)
+    argparser.add_argument("--threshold", type=float, default=THRESHOLD)
+    argparser.add_argument("--save", action="store_true", help="record the results as the baseline")
+    args = argparser.parse_args()
+    utils.logger.setLevel("ERROR")
+    params = {"size": args.size, "titles": args.titles, "tables": args.tables, "placement": args.placement,
+        "docs": args.docs}
+    results = run_benchmarks(repeat=args.repeat, **params)
+    for name, result in results.items():
+        print(f"{name:32}{result['seconds']:10.4f}s{result['median']:10.4f}s{result['ratio']:10.2f}x")
+    if args.save:
+        with open(args.baseline, "w") as output:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "params": params,
+                "threshold": args.threshold, "results": results}, output, indent=2)
+        sys.exit(0)
+    if not os.path.exists(args.baseline):
+        print(f"no baseline {args.baseline}, record one with --save")
+        sys.exit(0)
+    with open(args.baseline) as input:
+        baseline = json.load(input)
+    if "calibration" not in baseline["results"]:
+        print(f"the baseline holds absolute timings, record it again with --save")
+        sys.exit(0)
+    if baseline["params"] != params:
+        print(f"the baseline was recorded with {baseline['params']}, nothing to compare")
+        sys.exit(0)
+    regressions = compare(results, baseline, baseline.get("threshold", args.threshold))
+    for name, seconds, base in regressions:
+        print(f"REGRESSION {name}: {seconds:.4f}s against {base:.4f}s")
+    sys.exit(1 if len(regressions) > 0 else 0)
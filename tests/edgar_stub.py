@@ -0,0 +1,161 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import concurrent.futures
+import re,threading
+from urllib.parse import urlparse, parse_qs
+from client import Response
+
+BASE_URL = "http://edgar.test"
+# the listing walk of a company never takes more pages than this, see StubClient
+MAX_LISTING_REQUESTS = 50
+
+def document(body, type="10-Q", filename="x.htm"):
+    """
+    a raw filing document with the html 'body' in its <TEXT> section
+    """
+    return ("<DOCUMENT>\n<TYPE>%s\n<SEQUENCE>1\n<FILENAME>%s\n<DESCRIPTION>FORM %s\n<TEXT>\n"
+        "<html><body>%s</body></html>\n</TEXT>\n</DOCUMENT>\n" % (type, filename, type, body))
+
+def submission(cik, i, date, type, body):
+    """
+    the complete submission text file of a filing: its header, the document of the filing and an exhibit
+    """
+    return ("<SEC-DOCUMENT>%s.txt : %s\n<SEC-HEADER>%s.hdr.sgml : %s\nCONFORMED SUBMISSION TYPE:\t%s\n"
+        "FILED AS OF DATE:\t\t%s\n</SEC-HEADER>\n%s<DOCUMENT>\n<TYPE>EX-31.1\n<SEQUENCE>2\n<FILENAME>ex31.txt\n"
+        "<TEXT>\nCertification of %s\n</TEXT>\n</DOCUMENT>\n</SEC-DOCUMENT>\n" % (i, date, i, date, type,
+        date.replace("-", ""), document(body, type, f"doc{i}.htm"), cik))
+
+class StubClient():
+    """
+    an in-memory stand-in of EdgarClient serving the browse-edgar listing, 'Filling Detail' and
+    document pages of the filings given as cik: [(date, type, body)], and counting the requests
+    of every kind of page. The listing pages behave like EDGAR: 'dateb' is inclusive and 'count'
+    caps the rows in time-desending order.
+    """
+    def __init__(self, filings):
+        self.base_url = BASE_URL
+        self.filings = filings
+        self.requests = {"company": 0, "listing": 0, "detail": 0, "document": 0, "full-index": 0, "submission": 0}
+        self._lock = threading.Lock()
+
+    def _count(self, kind):
+        with self._lock:
+            self.requests[kind] += 1
+            if kind == "listing" and self.requests[kind] > MAX_LISTING_REQUESTS:
+                raise RuntimeError("the listing walk doesn't stop")
+
+    def get(self, url):
+        parsed = urlparse(url)
+        query = parse_qs(parsed.query)
+        if parsed.path.endswith("browse-edgar"):
+            cik = query["CIK"][0]
+            filings = self.filings.get(cik, [])
+            if "type" not in query and "dateb" not in query and "count" not in query:
+                self._count("company")
+                return Response(url, 200, (f"<html><div class='companyInfo'><span class='companyName'>ACME CORP "
+                    f"CIK#: <a href='#'>{cik}</a></span><p class='identInfo'><acronym>SIC</acronym>: <a href='#'>7372</a>"
+                    " - SERVICES<br/>State location: <a href='#'>CA</a> | State of Inc.: <strong>DE</strong></p></div>"
+                    "</html>").encode())
+            self._count("listing")
+            prior_to = query.get("dateb", [""])[0]
+            count = int(query.get("count", ["100"])[0])
+            rows = [(date, type, i) for i, (date, type, body) in enumerate(filings)
+                if prior_to == "" or date.replace("-", "/") <= prior_to]
+            rows = sorted(rows, reverse=True)[:count]
+            cells = "".join(f"<tr><td>{type}</td><td><a href='/Archives/{cik}/{i}-index.htm'>Documents</a></td>"
+                f"<td>desc</td><td>{date}</td><td>000-{i}</td></tr>" for date, type, i in rows)
+            return Response(url, 200, f"<html><table class='tableFile2'><tr><th>Type</th></tr>{cells}</table></html>".encode())
+        match = re.match(r"/Archives/edgar/full-index/(\d+)/QTR(\d)/master.idx", parsed.path)
+        if match:
+            self._count("full-index")
+            return Response(url, 200, master_index(self.filings, int(match.group(1)), int(match.group(2))).encode())
+        match = (re.match(r"/Archives/(\d+)/(\d+)-index.htm", parsed.path) or
+            re.match(r"/Archives/edgar/data/(\d+)/\d+/\d{10}-\d{2}-(\d{6})-index.htm", parsed.path))
+        if match:
+            self._count("detail")
+            cik, i = match.group(1), int(match.group(2))
+            type = self.filings[cik][i][1]
+            return Response(url, 200, (f"<html><table summary='Document Format Files'><tr><th>Seq</th></tr>"
+                f"<tr><td>1</td><td>doc</td><td><a href='/Archives/{cik}/{i}/doc{i}.htm'>doc{i}.htm</a></td>"
+                f"<td>{type}</td><td>100</td></tr></table></html>").encode())
+        match = (re.match(r"/Archives/(\d+)/(\d+)\.txt", parsed.path) or
+            re.match(r"/Archives/edgar/data/(\d+)/\d+/\d{10}-\d{2}-(\d{6})\.txt", parsed.path))
+        if match:
+            self._count("submission")
+            cik, i = match.group(1), int(match.group(2))
+            date, type, body = self.filings[cik][i]
+            return Response(url, 200, submission(cik, i, date, type, body).encode())
+        match = re.match(r"/Archives/(\d+)/(\d+)/", parsed.path)
+        if match:
+            self._count("document")
+            date, type, body = self.filings[match.group(1)][int(match.group(2))]
+            return Response(url, 200, document(body, type).encode())
+        return Response(url, 404, b"")
+
+    def submit(self, url):
+        future = concurrent.futures.Future()
+        future.set_result(self.get(url))
+        return future
+
+    def stream(self, url, feed, chunk_size=7):
+        """
+        feed the content in tiny chunks, so that the tags are split across them
+        """
+        response = self.get(url)
+        if response.status == 200:
+            for i in range(0, len(response.content), chunk_size):
+                feed(response.content[i:i + chunk_size])
+        return response.status
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    serve the pages of the server's StubClient over http
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        page = self.server.stub.get(self.server.stub.base_url + self.path)
+        self.send_response(page.status)
+        self.send_header("Content-Length", str(len(page.content)))
+        self.end_headers()
+        self.wfile.write(page.content)
+
+def serve(stub):
+    """
+    serve a StubClient on a local port in a daemon thread, return the server, whose url is
+    http://127.0.0.1:<server.server_address[1]>; shut it down with server.shutdown() and server.server_close()
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.stub = stub
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def quarterly_filings(since_year, years, bodies=None):
+    """
+    the 10-K/10-Q filings of a company on the 15th of every quarter, with the html 'bodies' by index
+    """
+    filings = []
+    for i in range(years * 4):
+        type = "10-K" if i % 4 == 0 else "10-Q"
+        body = bodies.get(i, "<p>Filler</p>") if bodies is not None else "<p>Filler</p>"
+        filings.append((f"{since_year + i // 4}-{1 + 3 * (i % 4):02d}-15", type, body))
+    return filings
+
+def accession_number(cik, date, i):
+    return "%010d-%s-%06d" % (int(cik), date[2:4], i)
+
+def master_index(filings, year, qtr):
+    """
+    the master.idx of EDGAR listing the filings of a quarter, like the full-index files
+    """
+    lines = ["Description:           Master Index of EDGAR Dissemination Feed", "", "",
+        "CIK|Company Name|Form Type|Date Filed|Filename", "-" * 80]
+    for cik, rows in filings.items():
+        for i, (date, type, body) in enumerate(rows):
+            if int(date[:4]) == year and (int(date[5:7]) - 1) // 3 + 1 == qtr:
+                lines.append(f"{cik}|ACME CORP {cik}|{type}|{date}|edgar/data/{cik}/{accession_number(cik, date, i)}.txt")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,299 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,random,re,shutil,tempfile,unittest
+from collections import deque
+from unittest import mock
+import analysis
+import metrics
+import parsers
+import utils
+from analysis import Analysis
+
+SECTION = ("<p><b>Note 3. Business Acquisition</b></p><p><font>On March 1 we acquired Sherman Oaks for cash. "
+    "The purchase price was allocated.</font></p>")
+FILLER = "".join("<p><font>Filler %d about our operations and results.</font></p>" % i for i in range(50))
+
+def document(body):
+    """
+    a raw filing document with the html 'body' in its <TEXT> section and an exhibit after it
+    """
+    return ("<DOCUMENT>\n<TYPE>10-Q\n<SEQUENCE>1\n<FILENAME>x.htm\n<DESCRIPTION>FORM 10-Q\n<TEXT>\n"
+        "<html><body>%s</body></html>\n</TEXT>\n</DOCUMENT>\n<DOCUMENT><TYPE>EX-31<TEXT>junk</TEXT></DOCUMENT>" % body)
+
+class TestWindowedExtraction(unittest.TestCase):
+    """
+    the windowed extraction parses only the fragments around the target mentions, but must
+    report exactly what parsing the whole section does
+    """
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.analysis = Analysis("Sherman", None)
+        # always parse the fragments, however much of the section they cover
+        self.share, analysis.MAX_WINDOW_SHARE = analysis.MAX_WINDOW_SHARE, 1.0
+
+    def tearDown(self):
+        analysis.MAX_WINDOW_SHARE = self.share
+        shutil.rmtree(self.dir)
+
+    def extract(self, body):
+        filename = os.path.join(self.dir, "doc.htm")
+        with open(filename, "w") as file:
+            file.write(document(body))
+        outcomes = []
+        for windowed in (False, True):
+            try:
+                outcomes.append(self.analysis.extract_assets(filename, parser="bs4", windowed=windowed))
+            except AttributeError as e:
+                # a title in the last row of a <tr> without any table breaks the whole section walk
+                outcomes.append(type(e))
+        self.assertEqual(outcomes[0], outcomes[1], body)
+        return outcomes[0]
+
+    def test_section(self):
+        info = self.extract(FILLER + "<p><b>Note 3. Business Acquisition</b></p><p><font>On March 1 we acquired "
+            "Sherman Oaks for cash.</font></p>" + FILLER)
+        self.assertEqual(info, "On March 1 we acquired Sherman Oaks for cash.\n\n")
+
+    def test_mention_without_title(self):
+        self.assertIsNone(self.extract(FILLER + "<p><font>We acquired Sherman Inc.</font></p>"))
+
+    def test_later_title_ends_section(self):
+        # the walk from the first title stops at the <div> holding the second one
+        self.assertIsNone(self.extract(FILLER + "<div><p><b>Note 3 Acquisition</b></p>x</div>"
+            "<div><p><b>Note 4 Commitments</b></p></div><p><font>We acquired Sherman Inc.</font></p>"))
+
+    def test_title_in_nested_block(self):
+        info = self.extract(FILLER + "<div><div><b>Acquisitions</b></div><div><p><font>We acquired Sherman</font>"
+            "</p></div></div><p><b>Other</b></p>")
+        self.assertEqual(info, "We acquired Sherman\n\n")
+
+    def test_title_before_table(self):
+        # the walk from the title skips the table holding the later titles
+        self.extract(FILLER + "<p><b>Note 3 Acquisition</b></p><table><tr><td><b>Goodwill</b></td></tr>"
+            "<tr><td><div>We acquired Sherman</div></td></tr></table><div>we acquired Sherman</div>" + FILLER)
+
+    def test_last_row_title(self):
+        # the walk from the last row of a table goes on with the <div> after the table, so both
+        # titles report the mention
+        info = self.extract(FILLER + "<table><tr><td><b>Acquisition</b></td></tr></table><p><b>Goodwill</b></p>"
+            "<div>We acquired Sherman Inc.</div>" + FILLER)
+        self.assertEqual(info, "We acquired Sherman Inc.\n\nWe acquired Sherman Inc.\n\n")
+
+    def test_hyperlink(self):
+        info = self.extract("<p><a href='#x'>x</a><b>Acquisition</b></p>" + FILLER + "<div><b>Goodwill</b></div>"
+            "<div><font>We acquired Sherman in 2006.</font><font>Sherman acquisition will operate later</font></div>")
+        self.assertEqual(info, "We acquired Sherman in 2006.\n\n")
+
+    def test_offsets(self):
+        # the offsets found by the scan are in bytes, the data before the mention isn't ASCII
+        body = FILLER.replace("Filler", "Filler —") + "<p><b>Note 3. Acquisition</b></p><p><font>On March 1 we " \
+            "acquired Sherman Oaks for €5 million.</font></p>"
+        self.assertEqual(self.extract(body), "On March 1 we acquired Sherman Oaks for €5 million.\n\n")
+        filename = os.path.join(self.dir, "doc.htm")
+        offsets = {}
+        self.assertEqual(Analysis.full_text_search_targets(filename, ["Sherman", "Oaks"], 0, offsets), {"Sherman", "Oaks"})
+        self.assertEqual(offsets["Sherman"], Analysis.mention_offsets(filename, "Sherman"))
+        previous = metrics.configure_default_metrics(metrics.Metrics())
+        try:
+            info = self.analysis.extract_assets(filename, parser="bs4", windowed=True, offsets=offsets["Sherman"])
+            parsed = metrics.default_metrics().aggregate(("stage",))[("parse",)]["bytes"]
+        finally:
+            metrics.configure_default_metrics(previous)
+        self.assertEqual(info, "On March 1 we acquired Sherman Oaks for €5 million.\n\n")
+        self.assertLess(parsed, os.path.getsize(filename) / 4)
+
+    def test_no_window(self):
+        # the mentions before any title leave no fragment, the whole section is parsed then
+        filename = os.path.join(self.dir, "doc.htm")
+        with open(filename, "w") as file:
+            file.write(document("<p><font>We acquired Sherman Inc.</font></p>" + FILLER + "<p><b>Acquisition</b></p>"
+                "<p><font>We acquired a business.</font></p>"))
+        previous = metrics.configure_default_metrics(metrics.Metrics())
+        try:
+            self.assertIsNone(self.analysis.extract_assets(filename, parser="bs4", windowed=True))
+            parsed = metrics.default_metrics().aggregate(("stage",))[("parse",)]["bytes"]
+        finally:
+            metrics.configure_default_metrics(previous)
+        self.assertEqual(parsed, os.path.getsize(filename))
+
+    def test_random_markup(self):
+        # unbalanced random markup, the way html.parser nests it decides the sections
+        words = ["Filler", "we", "acquired", "Sherman", "Inc.", "purchase price", "goodwill", "was allocated"]
+        titles = ["Note 3 Acquisition", "Goodwill", "Note 4 Commitments", "Other"]
+        def node(r, depth):
+            k = r.random()
+            if depth > 4 or k < 0.25:
+                return " ".join(r.choice(words) for _ in range(r.randint(1, 6)))
+            if k < 0.35:
+                return "<b>%s</b>" % r.choice(titles)
+            if k < 0.4:
+                return "<a href='#x'>x</a>"
+            if k < 0.45:
+                return r.choice(["</div>", "</p>", "</td>", "<br>", "</b>"])
+            if k < 0.55:
+                return "<table>%s</table>" % "".join("<tr>%s</tr>" % "".join("<td>%s</td>" % nodes(r, depth + 2)
+                    for _ in range(r.randint(1, 3))) for _ in range(r.randint(1, 3)))
+            tag = r.choice(["p", "div", "font"])
+            return "<%s>%s%s" % (tag, nodes(r, depth + 1), "</%s>" % tag if r.random() < 0.85 else "")
+        def nodes(r, depth):
+            return "".join(node(r, depth) for _ in range(r.randint(1, 4)))
+        for seed in range(200):
+            r = random.Random(seed)
+            self.extract("".join(node(r, 0) + (FILLER if r.random() < 0.3 else "") for _ in range(r.randint(3, 12))))
+
+class TestTargetSearch(unittest.TestCase):
+    """
+    several target names are searched at one pass over a document
+    """
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def search(self, data, patterns, flags=0):
+        filename = os.path.join(self.dir, "doc.htm")
+        with open(filename, "wb") as file:
+            file.write(data)
+        return Analysis.full_text_search_targets(filename, patterns, flags)
+
+    def test_overlapping_targets(self):
+        # the match of 'Sherman' overlaps those of the other targets
+        patterns = ["Sherman", "Sherman Oaks", "man Oak", "Oaks Inc"]
+        self.assertEqual(self.search(b"we acquired Sherman Oaks Inc. in 2006", patterns), set(patterns))
+
+    def test_nested_targets(self):
+        self.assertEqual(self.search(b"G&L Fishing", ["G&L", "G&L Fishing", "Fish"]), {"G&L", "G&L Fishing", "Fish"})
+
+    def test_missing_targets(self):
+        self.assertEqual(self.search(b"we acquired Sherman", ["Sherman", "Oaks", "Sher+man"]), {"Sherman", "Sher+man"})
+        self.assertEqual(self.search(b"", ["Sherman"]), set())
+        self.assertEqual(self.search(b"Sherman", []), set())
+
+    def test_case_insensitive(self):
+        self.assertEqual(self.search(b"SHERMAN OAKS", ["Sherman", "Oaks"]), set())
+        self.assertEqual(self.search(b"SHERMAN OAKS", ["Sherman", "Oaks"], re.IGNORECASE), {"Sherman", "Oaks"})
+
+class TestTargetDocuments(unittest.TestCase):
+    """
+    the documents of a target are scanned in filing order, and no further than needed
+    """
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.metrics = metrics.Metrics()
+        self.previous = metrics.configure_default_metrics(self.metrics)
+
+    def tearDown(self):
+        metrics.configure_default_metrics(self.previous)
+        shutil.rmtree(self.dir)
+
+    def write_index(self, cik, bodies):
+        os.makedirs(os.path.join(self.dir, cik))
+        index_file = os.path.join(self.dir, cik, "download.idx")
+        with open(index_file, "w") as index:
+            for i, body in enumerate(bodies):
+                filename = os.path.join(self.dir, cik, f"doc{i}.htm")
+                with open(filename, "w") as file:
+                    file.write(document(body))
+                index.write(f"10-Q\t2006-0{i + 1}-15\t{filename}\thttp://edgar.test/{cik}/{i}-index.htm\n")
+        return index_file
+
+    def test_early_stop(self):
+        index_file = self.write_index("100", [FILLER + SECTION, FILLER, FILLER + SECTION, SECTION])
+        analysis = Analysis("Sherman", index_file)
+        reports = list(analysis.iter_acquisition_reports(parser="bs4"))
+        self.assertEqual([os.path.basename(filename) for filename, _, _ in reports], ["doc0.htm"])
+        self.assertIsNotNone(reports[0][2])
+        # the documents after the acquisition report are never scanned
+        self.assertEqual(self.metrics.aggregate(("stage",))[("scan",)]["count"], 1)
+        self.metrics = metrics.Metrics()
+        metrics.configure_default_metrics(self.metrics)
+        reports = list(analysis.iter_acquisition_reports(parser="bs4", list_rest=True))
+        self.assertEqual([(os.path.basename(filename), info is not None) for filename, _, info in reports],
+            [("doc0.htm", True), ("doc2.htm", False), ("doc3.htm", False)])
+        self.assertEqual(self.metrics.aggregate(("stage", "target"))[("parse", "Sherman")]["count"], 1)
+
+    def test_chronological(self):
+        index_file = self.write_index("100", [SECTION, SECTION])
+        # a later download appended an earlier filing
+        with open(index_file, "a") as index:
+            filename = os.path.join(self.dir, "100", "early.htm")
+            with open(filename, "w") as file:
+                file.write(document(SECTION))
+            # in another date format, which doesn't sort as a string
+            index.write(f"10-K\t2006/02/01\t{filename}\thttp://edgar.test/100/early-index.htm\n")
+        filenames = [os.path.basename(filename) for filename, _ in Analysis("Sherman", index_file).iter_target_documents()]
+        self.assertEqual(filenames, ["doc0.htm", "early.htm", "doc1.htm"])
+
+class TreeWalk():
+    """
+    the baseline section walk: the <b> elements are classified again every time a sibling is checked
+    """
+
+    def __init__(self, analysis, text_tag, flags=0):
+        self.analysis = analysis
+        self.flags = flags
+        self.titles = deque(tag for tag in text_tag.find_all('b') if analysis.guess_acquisition_title(tag, flags))
+
+    def has_title(self, tag):
+        return any(self.analysis.guess_acquisition_title(b, self.flags) for b in tag.find_all('b'))
+
+class TestDocumentOutline(unittest.TestCase):
+    """
+    the marked outline and the scanned one agree with the tree walk on the golden fixtures
+    """
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+
+    def fixtures(self):
+        from test_parsers import FIXTURES, GOLDEN
+        for name, (target_name, expected) in GOLDEN.items():
+            yield os.path.join(FIXTURES, name), Analysis(target_name, None)
+
+    def test_marks(self):
+        for filename, ana in self.fixtures():
+            for parser in ("bs4", "lxml"):
+                text_tag = parsers.get_parser(parser).load_text(filename)
+                walk = TreeWalk(ana, text_tag, re.IGNORECASE)
+                outline = analysis.DocumentOutline(ana, text_tag, re.IGNORECASE)
+                self.assertEqual([tag.get_text() for tag in outline.titles], [tag.get_text() for tag in walk.titles], filename)
+                self.assertGreater(len(outline.titles), 0)
+                for tag in text_tag.find_all(['p', 'div', 'tr']):
+                    self.assertEqual(outline.has_title(tag), walk.has_title(tag), f"{filename} {parser}")
+
+    def test_sections(self):
+        for filename, ana in self.fixtures():
+            for parser in ("bs4", "lxml"):
+                info = ana.extract_assets(filename, parser=parser)
+                with mock.patch.object(analysis, "DocumentOutline", TreeWalk):
+                    self.assertEqual(ana.extract_assets(filename, parser=parser), info, f"{filename} {parser}")
+            # the fragments cut out of the scanned outline report the same
+            self.assertEqual(ana.extract_assets(filename, parser="bs4", windowed=True), info, filename)
+
+    def test_scanner(self):
+        for filename, ana in self.fixtures():
+            scanner = parsers.OutlineScanner.scan(filename)
+            text_tag = parsers.get_parser("bs4").load_text(filename)
+            tags = text_tag.find_all(True)
+            # the elements are nested the way BeautifulSoup does
+            self.assertEqual(scanner.names, [tag.name for tag in tags], filename)
+            ids = {id(tag): i for i, tag in enumerate(tags)}
+            self.assertEqual(scanner.parents, [ids.get(id(tag.parent), parsers.OutlineScanner.ROOT) for tag in tags])
+            self.assertEqual([scanner.has_link(i) for i in range(len(tags))],
+                [tag.find('a', href=True) is not None for tag in tags], filename)
+            self.assertEqual([scanner.bold_texts[i] for i in scanner.bolds], [tag.get_text() for tag in text_tag.find_all('b')])
+            self.assertEqual(scanner.text, text_tag.get_text(), filename)
+            # the filing fed in chunks is scanned the same
+            chunked = parsers.OutlineScanner.scan(filename, chunk_size=7)
+            for name in ("names", "starts", "ends", "parents", "links", "piece_starts", "piece_ends", "text", "region"):
+                self.assertEqual(getattr(chunked, name), getattr(scanner, name), f"{filename} {name}")
+            self.assertEqual(chunked.data, scanner.data[:len(chunked.data)])
+
+if __name__ == '__main__':
+    unittest.main()
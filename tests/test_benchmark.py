@@ -0,0 +1,58 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,shutil,tempfile,unittest
+import utils
+from analysis import Analysis
+from benchmark import PLACEMENTS, TARGET, compare, run_benchmarks, synthetic_filing, write_corpus
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_synthetic_filing(self):
+        filing = synthetic_filing(size=20000, titles=0.2, tables=3, seed=1)
+        self.assertGreaterEqual(len(filing), 20000)
+        self.assertEqual(filing.count("<table"), 3)
+        self.assertGreater(filing.count("<b>Note "), 1)
+        self.assertEqual(filing, synthetic_filing(size=20000, titles=0.2, tables=3, seed=1))
+        self.assertNotIn(TARGET, synthetic_filing(size=20000, placement="none"))
+        self.assertRaises(ValueError, synthetic_filing, placement="footnote")
+
+    def test_placement(self):
+        index_file = write_corpus(self.dir, docs=3, size=20000, tables=2)
+        filenames = list(Analysis(TARGET, index_file).locate_target_documents().keys())
+        self.assertEqual(len(filenames), 3)
+        # only the last filing reports the target, the others mention it in their contents
+        self.assertIsNone(Analysis(TARGET, None).extract_assets(filenames[0]))
+        self.assertIn(TARGET, Analysis(TARGET, None).extract_assets(filenames[-1]))
+        for placement in PLACEMENTS[:2]:
+            filename = os.path.join(self.dir, f"{placement}.htm")
+            with open(filename, "w") as output:
+                output.write(synthetic_filing(size=20000, placement=placement))
+            self.assertIn(TARGET, Analysis(TARGET, None).extract_assets(filename))
+
+    def test_run(self):
+        results = run_benchmarks(size=5000, tables=1, docs=2, repeat=1)
+        self.assertIn("download", results)
+        self.assertIn("extract_assets[lxml]", results)
+        self.assertTrue(all(result["seconds"] > 0 for result in results.values()))
+        self.assertEqual(results["calibration"]["ratio"], 1.0)
+
+    def test_compare(self):
+        baseline = {"results": {"calibration": {"ratio": 1.0}, "a": {"ratio": 10.0}, "b": {"ratio": 10.0},
+            "c": {"ratio": 0.01}}, "thresholds": {"b": 3.0}}
+        # this machine is half as fast as the baseline one
+        results = {"calibration": {"seconds": 0.2}, "a": {"seconds": 4.0}, "b": {"seconds": 4.0}, "c": {"seconds": 0.006},
+            "new": {"seconds": 9.0}}
+        self.assertEqual(compare(results, baseline), [("a", 4.0, 2.0)])
+        self.assertEqual(compare(results, baseline, threshold=2.5), [])
+        results["a"]["seconds"] = 2.5
+        self.assertEqual(compare(results, baseline), [])
+
+if __name__ == '__main__':
+    unittest.main()
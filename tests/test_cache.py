@@ -0,0 +1,94 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,shutil,tempfile,time,unittest
+import utils
+from cache import ResponseCache
+from edgar_stub import StubClient, quarterly_filings
+from fillings import Company
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.client = StubClient({"100": quarterly_filings(2006, 2)})
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def cache(self, **kwargs):
+        cache = ResponseCache(os.path.join(self.dir, "cache.db"), **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_listing_cached(self):
+        cache = self.cache()
+        company = Company("100", self.client, cache)
+        first = company.get_search_results(prior_to="2007/12/31")
+        second = company.get_search_results(prior_to="2007/12/31")
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 8)
+        self.assertEqual(self.client.requests["listing"], 1)
+        self.assertEqual(cache.stats()["listing"], {"hits": 1, "misses": 1})
+
+    def test_detail_cached(self):
+        company = Company("100", self.client, self.cache())
+        url = next(iter(company.get_search_results(prior_to="2007/12/31").keys()))
+        first = company.get_document_urls(url, "10-Q")
+        second = company.get_document_urls(url, "10-Q")
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 1)
+        self.assertEqual(self.client.requests["detail"], 1)
+        # the parsed documents are kept with any type
+        self.assertEqual(company.get_document_urls(url, "10-K"), [])
+        self.assertEqual(self.client.requests["detail"], 1)
+
+    def test_cache_persists(self):
+        Company("100", self.client, self.cache()).get_search_results(prior_to="2007/12/31")
+        Company("100", self.client, self.cache()).get_search_results(prior_to="2007/12/31")
+        self.assertEqual(self.client.requests["listing"], 1)
+
+    def test_company_info(self):
+        cache = self.cache()
+        company = Company("100", self.client, cache)
+        company.get_search_results(prior_to="2007/12/31")
+        self.assertEqual(self.client.requests["company"], 0)
+        self.assertEqual((company.name, company.sic, company.us_state), ("ACME CORP", "7372", "CA"))
+        self.assertEqual(Company("100", self.client, self.cache()).name, "ACME CORP")
+        self.assertEqual(self.client.requests["company"], 1)
+        companies = Company.prefetch_info(["100", "200", "300", "200"], self.client, cache)
+        self.assertEqual(list(companies.keys()), ["100", "200", "300"])
+        self.assertEqual(self.client.requests["company"], 3)
+        self.assertEqual([company.name for company in companies.values()], ["ACME CORP"] * 3)
+        self.assertEqual(self.client.requests["company"], 3)
+
+    def test_listing_expires(self):
+        cache = self.cache(ttls={"listing": 60})
+        company = Company("100", self.client, cache)
+        company.get_search_results(prior_to="2007/12/31")
+        url = company._get_filings_url(prior_to="2007/12/31")
+        self.assertTrue(cache.contains(url, "listing"))
+        # age the entry beyond its time-to-live
+        cache._conn.execute("UPDATE pages SET created = ?", (time.time() - 120,))
+        self.assertFalse(cache.contains(url, "listing"))
+        company.get_search_results(prior_to="2007/12/31")
+        self.assertEqual(self.client.requests["listing"], 2)
+
+    def test_detail_never_expires(self):
+        cache = self.cache()
+        cache.put("http://edgar.test/detail", "detail", b"page", [["url", "10-K"]])
+        cache._conn.execute("UPDATE pages SET created = 0")
+        self.assertEqual(cache.get("http://edgar.test/detail", "detail"), b"page")
+        self.assertEqual(cache.get_parsed("http://edgar.test/detail", "detail"), [["url", "10-K"]])
+
+    def test_eviction(self):
+        cache = self.cache(max_bytes=3000)
+        for i in range(10):
+            cache.put(f"http://edgar.test/{i}", "detail", os.urandom(500))
+        self.assertLessEqual(cache.size, 3000)
+        # the least recently used pages are evicted first
+        self.assertIsNone(cache.get("http://edgar.test/0", "detail"))
+        self.assertIsNotNone(cache.get("http://edgar.test/9", "detail"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import hashlib,logging,os,shutil,tempfile,threading,unittest
+import utils
+from analysis import Analysis
+from cache import ResponseCache
+from catalog import FilingCatalog, accession_number
+from edgar_stub import StubClient, document, quarterly_filings
+from fillings import Company
+
+class TestFilingCatalog(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.client = StubClient({"100": quarterly_filings(2005, 2, {5: "<p>Sherman Oaks</p>"}),
+            "200": quarterly_filings(2006, 1)})
+        self.cache = ResponseCache(os.path.join(self.dir, "cache.db"))
+        self.catalog = FilingCatalog(os.path.join(self.dir, "catalog.db"))
+
+    def tearDown(self):
+        self.catalog.close()
+        self.cache.close()
+        shutil.rmtree(self.dir)
+
+    def download(self, cik, since_date, to_date, catalog=None):
+        company = Company(cik, self.client, self.cache)
+        return company.download_documents(since_date, to_date, root_dir=self.dir, incremental=True, catalog=catalog)
+
+    def test_download(self):
+        index_file = self.download("100", "2005/01/01", "2006/12/31", self.catalog)
+        docs = self.catalog.documents("100")
+        self.assertEqual(docs, utils.read_index(index_file))
+        filename = list(docs.keys())[5]
+        with open(filename, "rb") as file:
+            content = file.read()
+        row = self.catalog._conn.execute("SELECT form_type, accession, size, hash FROM filings WHERE path = ?",
+            (filename,)).fetchone()
+        self.assertEqual(row, ("10-Q", "5", len(content), hashlib.sha256(content).hexdigest()))
+        self.assertEqual(list(self.catalog.documents("100", {"10-K"}).values()),
+            [{"FILLING_TYPE": "10-K", "FILLING_DATE": f"{year}-01-15", "FILLING_URL": f"http://edgar.test/Archives/100/{i}-index.htm"}
+                for i, year in ((0, 2005), (4, 2006))])
+        self.assertEqual(len(self.catalog.documents("100", since_date="2006/01/01", to_date="2006/06/30")), 2)
+        # the analysis layer looks the documents up in the catalog
+        analysis = Analysis("Sherman", index_file, catalog=self.catalog)
+        self.assertEqual(list(analysis.locate_target_documents().keys()), [filename])
+
+    def test_plan(self):
+        self.download("100", "2005/01/01", "2006/12/31", self.catalog)
+        self.download("200", "2006/01/01", "2006/12/31", self.catalog)
+        plan = self.catalog.plan(["200", "100", "300"], {"10-Q"}, "2006/01/01", "2006/12/31")
+        self.assertEqual(list(plan.keys()), ["200", "100", "300"])
+        self.assertEqual([len(docs) for docs in plan.values()], [3, 3, 0])
+        dates = [dic["FILLING_DATE"] for dic in plan["100"].values()]
+        self.assertEqual(dates, ["2006-04-15", "2006-07-15", "2006-10-15"])
+
+    def test_migrate(self):
+        # the indexes downloaded before the catalog existed
+        self.download("100", "2005/01/01", "2006/12/31")
+        self.download("200", "2006/01/01", "2006/12/31")
+        self.assertEqual(self.catalog.migrate(self.dir), 12)
+        self.assertEqual(self.catalog.migrate(self.dir), 0)
+        self.assertEqual(self.catalog.documents("200"), utils.read_index(os.path.join(self.dir, "200", "download.idx")))
+        # the documents dropped from an index leave the catalog
+        index_file = os.path.join(self.dir, "200", "download.idx")
+        with open(index_file) as file:
+            lines = file.readlines()
+        with open(index_file, "w") as file:
+            file.writelines(lines[:1])
+        self.catalog.import_index(index_file)
+        self.assertEqual(len(self.catalog.documents("200")), 1)
+        self.assertEqual(len(self.catalog.documents()), 9)
+
+    def test_accession_number(self):
+        self.assertEqual(accession_number("https://www.sec.gov/Archives/edgar/data/1750/000104746906011256/"
+            "0001047469-06-011256-index.htm"), "0001047469-06-011256")
+
+if __name__ == '__main__':
+    unittest.main()
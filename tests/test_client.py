@@ -0,0 +1,128 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import asyncio,threading,time,unittest
+from client import EdgarClient, EdgarError, RateLimiter
+import metrics
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    answer every path with the statuses queued for it in the server's 'script', then with 200
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append((self.path, time.monotonic()))
+            statuses = self.server.script.get(self.path, [])
+            status = statuses.pop(0) if len(statuses) > 0 else 200
+        body = self.path.encode() if status == 200 else b""
+        self.send_response(status)
+        if status == 429:
+            self.send_header("Retry-After", "0.05")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class TestEdgarClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.script = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.client = EdgarClient(base_url=self.base_url, rate=1000, retries=3, backoff=0.01)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retry_on_throttling(self):
+        self.server.script["/a"] = [429, 429]
+        response = self.client.get(self.base_url + "/a")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.content, b"/a")
+        times = [when for path, when in self.server.requests if path == "/a"]
+        self.assertEqual(len(times), 3)
+        # the Retry-After header is honored
+        self.assertGreaterEqual(times[2] - times[1], 0.04)
+
+    def test_retry_on_server_errors(self):
+        self.server.script["/b"] = [500, 502, 503]
+        recorded = metrics.Metrics()
+        previous = metrics.configure_default_metrics(recorded)
+        try:
+            self.assertEqual(self.client.get(self.base_url + "/b").status, 200)
+        finally:
+            metrics.configure_default_metrics(previous)
+        self.assertEqual(len(self.server.requests), 4)
+        # every attempt is an http call
+        http = recorded.aggregate(("stage",))[("http",)]
+        self.assertEqual((http["count"], http["bytes"]), (4, 2))
+
+    def test_retries_exhausted(self):
+        self.server.script["/c"] = [503] * 10
+        with self.assertRaises(EdgarError):
+            self.client.get(self.base_url + "/c")
+        self.assertEqual(len(self.server.requests), 4)
+
+    def test_stream(self):
+        self.server.script["/e"] = [503]
+        chunks = []
+        self.assertEqual(self.client.stream(self.base_url + "/e", chunks.append, chunk_size=1), 200)
+        self.assertEqual(chunks, [b"/", b"e"])
+        self.server.script["/f"] = [404]
+        self.assertEqual(self.client.stream(self.base_url + "/f", chunks.append), 404)
+        self.assertEqual(len(chunks), 2)
+
+    def test_client_errors_not_retried(self):
+        self.server.script["/d"] = [404]
+        self.assertEqual(self.client.get(self.base_url + "/d").status, 404)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_backoff_grows(self):
+        delays = [self.client._get_delay(attempt) for attempt in range(4)]
+        for attempt, delay in enumerate(delays):
+            self.assertGreaterEqual(delay, 0.01 * 2 ** attempt * 0.5)
+            self.assertLessEqual(delay, 0.01 * 2 ** attempt * 1.5)
+        self.assertEqual(self.client._get_delay(0, "2"), 2.0)
+
+    def test_rate_limit(self):
+        client = EdgarClient(base_url=self.base_url, rate=20)
+        try:
+            start = time.monotonic()
+            responses = client.get_all([f"{self.base_url}/r{i}" for i in range(6)])
+            elapsed = time.monotonic() - start
+        finally:
+            client.close()
+        self.assertEqual([response.content for response in responses], [f"/r{i}".encode() for i in range(6)])
+        # 6 requests at 20 per second are spread over at least 5 intervals
+        self.assertGreaterEqual(elapsed, 5 / 20 - 0.01)
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_spacing(self):
+        async def run():
+            limiter = RateLimiter(rate=50)
+            loop = asyncio.get_event_loop()
+            times = []
+            async def acquire():
+                await limiter.acquire()
+                times.append(loop.time())
+            await asyncio.gather(*[acquire() for _ in range(5)])
+            return times
+        times = sorted(asyncio.run(run()))
+        for a, b in zip(times, times[1:]):
+            self.assertGreaterEqual(b - a, 1 / 50 * 0.9)
+
+    def test_unlimited(self):
+        self.assertEqual(RateLimiter(rate=0).interval, 0)
+
+if __name__ == '__main__':
+    unittest.main()
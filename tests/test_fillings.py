@@ -0,0 +1,77 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+from datetime import datetime
+import logging,os,shutil,tempfile,threading,unittest
+import utils
+from cache import ResponseCache
+from edgar_stub import StubClient, quarterly_filings
+from fillings import Company
+
+class TestIncrementalDownload(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.client = StubClient({"100": quarterly_filings(2005, 4)})
+        self.cache = ResponseCache(os.path.join(self.dir, "cache.db"))
+        self.company = Company("100", self.client, self.cache)
+        self.result_dir = os.path.join(self.dir, "100")
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.dir)
+
+    def download(self, since_date, to_date, cancel_after=None):
+        cancel = threading.Event()
+        dates = []
+        for filename, dic in self.company.iter_documents(since_date, to_date, {"10-K", "10-Q"}, self.dir, cancel,
+                incremental=True):
+            dates.append(dic["FILLING_DATE"])
+            if cancel_after is not None and len(dates) >= cancel_after:
+                cancel.set()
+        return dates
+
+    def test_listing_walk_stops(self):
+        # every filing of the company is newer than the period start
+        docs = self.company.search_fillings("2000/01/01", "2010/12/31", {"10-K", "10-Q"})
+        self.assertEqual(len(docs), 16)
+        self.assertLessEqual(self.client.requests["listing"], 2)
+
+    def test_listing_walk_pages(self):
+        client = StubClient({"100": quarterly_filings(1990, 60)})
+        company = Company("100", client, self.cache)
+        docs = company.search_fillings("1995/01/01", "2010/12/31", {"10-K"})
+        self.assertEqual(sorted(dic["FILLING_DATE"] for dic in docs.values()),
+            [f"{year}-01-15" for year in range(1995, 2011)])
+
+    def test_delta_fetch(self):
+        self.assertEqual(len(self.download("2006/01/01", "2006/12/31")), 4)
+        self.assertEqual(self.client.requests["document"], 4)
+        # the same period again is served from the index alone
+        listing = self.client.requests["listing"]
+        self.assertEqual(len(self.download("2006/01/01", "2006/12/31")), 4)
+        self.assertEqual(self.client.requests["listing"], listing)
+        self.assertEqual(self.client.requests["document"], 4)
+        # a longer period only fetches the filings of the missing years
+        dates = self.download("2005/01/01", "2007/12/31")
+        self.assertEqual(dates, sorted(dates))
+        self.assertEqual(len(dates), 12)
+        self.assertEqual(self.client.requests["document"], 12)
+        self.assertEqual(Company.read_searched_periods(self.result_dir, {"10-K", "10-Q"}),
+            [(datetime(2005, 1, 1), datetime(2007, 12, 31))])
+
+    def test_cancelled_download(self):
+        self.assertEqual(len(self.download("2005/01/01", "2008/12/31", cancel_after=3)), 3)
+        self.assertTrue(Company.index_incomplete(self.result_dir))
+        self.assertEqual(len(utils.read_index(os.path.join(self.result_dir, "download.idx"))), 3)
+        # the next run picks up from the first filing not downloaded
+        self.assertEqual(len(self.download("2005/01/01", "2008/12/31")), 16)
+        self.assertFalse(Company.index_incomplete(self.result_dir))
+        self.assertEqual(self.client.requests["document"], 16)
+
+    def test_other_types_searched(self):
+        self.download("2006/01/01", "2006/12/31")
+        self.assertEqual(Company.read_searched_periods(self.result_dir, {"10-K", "10-Q", "8-K"}), [])
+
+if __name__ == '__main__':
+    unittest.main()
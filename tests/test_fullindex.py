@@ -0,0 +1,73 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,shutil,tempfile,threading,unittest
+import utils
+from cache import ResponseCache
+from edgar_stub import StubClient, quarterly_filings
+from fillings import Company
+from fullindex import FullIndex, parse_form, parse_master
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "full-index")
+
+class TestFullIndex(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.client = StubClient({"100": quarterly_filings(2005, 2), "200": quarterly_filings(2006, 1)})
+        self.cache = ResponseCache(os.path.join(self.dir, "cache.db"))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.dir)
+
+    def test_parse(self):
+        quarter = os.path.join(FIXTURES, "2006", "QTR1")
+        with open(os.path.join(quarter, "master.idx"), "rb") as file:
+            master = list(parse_master(file.read()))
+        with open(os.path.join(quarter, "form.idx"), "rb") as file:
+            form = list(parse_form(file.read()))
+        self.assertEqual(len(master), 7)
+        self.assertEqual(sorted(master), sorted(form))
+        self.assertIn(("1750", "AAR CORP", "SC 13G", "2006-02-14", "edgar/data/1750/0000315066-06-001018.txt"), form)
+        self.assertIn(("1051512", "AMERICAN INTERNATIONAL INDUSTRIES HOLDINGS AND SUBSIDIARIES OF NEVADA INC", "10-Q",
+            "2006-02-21", "edgar/data/1051512/0001051512-06-000004.txt"), form)
+
+    def test_discover_fixtures(self):
+        for kind in ("master", "form"):
+            discovered = FullIndex(FIXTURES, kind, self.client).discover(["0000001750", "320193", "2488", "999"],
+                "2006/01/01", "2006/03/31", {"10-K", "10-Q"})
+            self.assertEqual(self.client.requests["full-index"], 0)
+            self.assertEqual(list(discovered.keys()), ["0000001750", "320193", "2488", "999"])
+            self.assertEqual(list(discovered["0000001750"].keys()),
+                ["http://edgar.test/Archives/edgar/data/1750/000104746906000310/0001047469-06-000310-index.htm"])
+            # the amendment isn't a 10-K
+            self.assertEqual([dic["FILLING_TYPE"] for dic in discovered["320193"].values()], ["10-Q"])
+            self.assertEqual(discovered["2488"][next(iter(discovered["2488"]))]["FILLING_DATE"], "2006-03-01")
+            self.assertEqual(len(discovered["999"]), 0)
+
+    def download(self, cik, docs, since_date, to_date):
+        company = Company(cik, self.client, self.cache)
+        company.use_fillings(docs, "2006/01/01", "2006/12/31")
+        return [dic["FILLING_DATE"] for _, dic in company.iter_documents(since_date, to_date, {"10-K", "10-Q"},
+            self.dir, threading.Event(), incremental=True)]
+
+    def test_download(self):
+        index_dir = os.path.join(self.dir, "full-index")
+        discovered = FullIndex(index_dir, client=self.client).discover(["100", "200"], "2006/01/01", "2006/12/31",
+            {"10-K", "10-Q"})
+        self.assertEqual(self.client.requests["full-index"], 4)
+        self.assertEqual([len(docs) for docs in discovered.values()], [4, 4])
+        self.assertEqual(self.download("200", discovered["200"], "2006/01/01", "2006/12/31"),
+            ["2006-01-15", "2006-04-15", "2006-07-15", "2006-10-15"])
+        self.assertEqual(self.client.requests["listing"], 0)
+        self.assertEqual(self.client.requests["document"], 4)
+        # the quarters over are read from their local copies
+        FullIndex(index_dir, client=self.client).discover(["100"], "2006/01/01", "2006/12/31", {"10-K", "10-Q"})
+        self.assertEqual(self.client.requests["full-index"], 4)
+        # the time-frame out of the discovered period is still searched in the listing
+        self.assertEqual(len(self.download("100", discovered["100"], "2005/01/01", "2006/12/31")), 8)
+        self.assertGreater(self.client.requests["listing"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
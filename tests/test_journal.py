@@ -0,0 +1,71 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,shutil,tempfile,unittest
+import utils
+from journal import RunJournal
+from pipeline import SpecRunner
+from test_analysis import FILLER, document
+
+SECTION = ("<p><b>Note 3. Business Acquisition</b></p><p><font>On March 1 we acquired Sherman Oaks for cash. "
+    "The purchase price was allocated.</font></p>")
+
+def doc(filename, info=None, error=None):
+    record = {"FILENAME": filename, "FILLING_TYPE": "10-Q", "FILLING_DATE": "2006-01-15",
+        "FILLING_URL": f"http://edgar.test/{filename}", "INFO": info}
+    if error is not None:
+        record["ERROR"] = error
+    return record
+
+class TestRunJournal(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.journal = RunJournal(os.path.join(self.dir, "journal.db"))
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.dir)
+
+    def test_pending(self):
+        specs = [["100", "Sherman"], ["100", "Oaks"], ["200", "Gas"], ["300", "Sirius"], ["400", "G&.*L"]]
+        self.journal.complete("100", {"Sherman": [doc("a.htm"), doc("b.htm", "acquired")],
+            "Oaks": [doc("a.htm", error="Traceback\nValueError: bad")]})
+        self.journal.fail("200", ["Gas"], "download", "Traceback\nEdgarError: HTTP 403")
+        # the journal survives the process
+        self.journal.close()
+        self.journal = RunJournal(os.path.join(self.dir, "journal.db"))
+        self.assertEqual(self.journal.pending(specs), [["100", "Oaks"], ["200", "Gas"], ["300", "Sirius"], ["400", "G&.*L"]])
+        self.assertEqual(self.journal.pending(specs, "failed"), [["100", "Oaks"], ["200", "Gas"]])
+        self.assertEqual(self.journal.pending(specs, "failed", ["extract"]), [["100", "Oaks"]])
+        self.assertRaises(ValueError, self.journal.pending, specs, "all")
+        self.assertEqual([record["INFO"] for record in self.journal.records("100", "Sherman")], [None, "acquired"])
+        self.assertEqual(self.journal.outcomes()[("200", "Gas")][:2], ("failed", "download"))
+        # a spec run again replaces its records
+        self.journal.complete("100", {"Sherman": [doc("c.htm", "acquired")]})
+        self.assertEqual([record["FILENAME"] for record in self.journal.records("100", "Sherman")], ["c.htm"])
+
+    def write_index(self, cik, bodies):
+        os.makedirs(os.path.join(self.dir, cik))
+        with open(os.path.join(self.dir, cik, "download.idx"), "w") as index:
+            for i, body in enumerate(bodies):
+                filename = os.path.join(self.dir, cik, f"doc{i}.htm")
+                with open(filename, "w") as file:
+                    file.write(document(body))
+                index.write(f"10-Q\t2006-0{i + 1}-15\t{filename}\thttp://edgar.test/{cik}/{i}-index.htm\n")
+
+    def test_resume(self):
+        self.write_index("100", [FILLER, FILLER + SECTION])
+        self.write_index("200", [SECTION])
+        specs = [["100", "Sherman"], ["200", "Sherman"]]
+        # the extraction fails with an unknown parser
+        SpecRunner(processes=1, parser="none").run(specs, "2006/01/01", "2006/12/31", raw_dir=self.dir, journal=self.journal)
+        self.assertEqual(self.journal.pending(specs, "failed", ["extract"]), specs)
+        self.assertEqual([record["ERROR"] is not None for record in self.journal.records("100", "Sherman")], [True])
+        SpecRunner(processes=1).run(self.journal.pending(specs, "failed"), "2006/01/01", "2006/12/31", raw_dir=self.dir,
+            journal=self.journal)
+        self.assertEqual(self.journal.pending(specs), [])
+        self.assertIn("Sherman Oaks", list(self.journal.records("200", "Sherman"))[-1]["INFO"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,re,unittest
+import matchers
+import parsers
+import utils
+from analysis import Analysis
+from test_parsers import FIXTURES
+
+# the blocks where the case folding or the regex syntax could tell the backends apart
+TRICKY = ["G&.*L Inc. was acquired", "G&L Inc. was acquired", "G&#038;L", "g&.*l", "GOODWILL", "goodwill",
+    "Intangible  Assets", "INTANGIBLE ASSETS", "purchaſe price", "PURCHASE PRICE", "acquİsition", "Keep",
+    "Initial\ncosts", "", "—"]
+
+class TestMatchers(unittest.TestCase):
+    """
+    the "re" and the "literal" backends match the same blocks
+    """
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.blocks = list(TRICKY)
+        for name in sorted(os.listdir(FIXTURES)):
+            text_tag = parsers.get_parser("bs4").load_text(os.path.join(FIXTURES, name))
+            self.blocks.extend(tag.get_text() for tag in text_tag.find_all(['p', 'div', 'font', 'b', 'tr']))
+        self.word_sets = {name: getattr(Analysis, name) for name in ("acq_title_words", "acq_text_words", "asset_words",
+            "acq_exclude_words", "asset_table_following_indicators")}
+        # the regex-looking names are literal words for both backends
+        self.word_sets["names"] = {"G&.*L", "Sherman", "Senior Health", "ſ", "\u212a"}
+
+    def hits(self, words, flags, backend):
+        matcher = matchers.compile_words(frozenset(words), flags, backend)
+        return ({i for i, block in enumerate(self.blocks) if matcher.search(block)},
+            {i for i, block in enumerate(self.blocks) if matcher.search_bytes(block.encode("utf8"))})
+
+    def test_same_hits(self):
+        for flags in (0, re.IGNORECASE):
+            for name, words in self.word_sets.items():
+                expected = self.hits(words, flags, "re")
+                self.assertEqual(self.hits(words, flags, "literal"), expected, f"{name} {flags}")
+                self.assertGreater(len(expected[0]), 0, name)
+
+    def test_regex_names(self):
+        for flags in (0, re.IGNORECASE):
+            matcher = matchers.compile_words(frozenset({"G&.*L"}), flags, "literal")
+            self.assertTrue(matcher.search("G&.*L Inc."))
+            self.assertFalse(matcher.search("G&L Inc."))
+        self.assertTrue(matchers.compile_words(frozenset({"G&.*L"}), re.IGNORECASE, "literal").search("g&.*l"))
+
+    def test_flags(self):
+        self.assertIsInstance(matchers.compile_words(frozenset({"Goodwill"}), re.IGNORECASE, "literal"),
+            matchers.LiteralMatcher)
+        # any other flag falls back to the regex
+        matcher = matchers.compile_words(frozenset({"Goodwill"}), re.IGNORECASE | re.ASCII, "literal")
+        self.assertIsInstance(matcher, matchers.RegexMatcher)
+        self.assertEqual(matcher.search("Keep"), matchers.compile_words(frozenset({"keep"}), re.IGNORECASE | re.ASCII).search("Keep"))
+        with self.assertRaises(ValueError):
+            matchers.LiteralMatcher(["Goodwill"], re.MULTILINE)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import json,logging,os,shutil,tempfile,unittest
+import metrics
+import utils
+from analysis import Analysis
+from pipeline import SpecRunner
+from test_analysis import FILLER, SECTION, document
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.metrics = metrics.Metrics()
+        self.previous = metrics.configure_default_metrics(self.metrics)
+
+    def tearDown(self):
+        metrics.configure_default_metrics(self.previous)
+        shutil.rmtree(self.dir)
+
+    def write_index(self, cik, bodies):
+        os.makedirs(os.path.join(self.dir, cik))
+        index_file = os.path.join(self.dir, cik, "download.idx")
+        with open(index_file, "w") as index:
+            for i, body in enumerate(bodies):
+                filename = os.path.join(self.dir, cik, f"doc{i}.htm")
+                with open(filename, "w") as file:
+                    file.write(document(body))
+                index.write(f"10-Q\t2006-0{i + 1}-15\t{filename}\thttp://edgar.test/{cik}/{i}-index.htm\n")
+        return index_file
+
+    def test_aggregate(self):
+        self.metrics.add("scan", 1.0, 100)
+        self.metrics.add("scan", 2.0, 50)
+        self.metrics.add("parse", 0.5, 10, target="a")
+        with self.metrics.timer("parse", "b") as counters:
+            counters["bytes"] = 7
+        other = metrics.Metrics()
+        other.add("parse", 1.5, 20, target="a")
+        other.add("http", 0.1, 5, cik="2")
+        self.metrics.merge(other.records(), cik="1")
+        totals = self.metrics.aggregate(("stage",))
+        self.assertEqual(totals[("scan",)], {"count": 2, "seconds": 3.0, "bytes": 150})
+        self.assertEqual(totals[("parse",)]["count"], 3)
+        self.assertEqual(totals[("parse",)]["bytes"], 37)
+        specs = self.metrics.aggregate(("cik", "target"))
+        self.assertEqual(specs[("1", "a")]["seconds"], 1.5)
+        self.assertIn(("2", None), specs)
+        summary = self.metrics.summary().splitlines()
+        self.assertEqual(summary[0].split(), ["cik", "http", "scan", "parse"])
+        self.assertEqual([line.split()[0] for line in summary[1:]], ["-", "1", "2", "seconds", "count", "MB"])
+        filename = os.path.join(self.dir, "metrics.jsonl")
+        self.metrics.write_jsonl(filename)
+        with open(filename) as input:
+            records = [json.loads(line) for line in input]
+        self.assertEqual(records, self.metrics.records())
+
+    def test_stages(self):
+        index_file = self.write_index("100", [FILLER, FILLER + SECTION + FILLER])
+        analysis = Analysis("Sherman", index_file)
+        filenames = list(analysis.locate_target_documents().keys())
+        self.assertIsNotNone(analysis.extract_assets(filenames[0], parser="bs4"))
+        totals = self.metrics.aggregate(("stage", "target"))
+        self.assertEqual(totals[("index", None)]["count"], 1)
+        self.assertEqual(totals[("scan", None)]["count"], 2)
+        self.assertEqual(totals[("scan", None)]["bytes"], sum(os.path.getsize(filename) for filename in utils.read_index(index_file)))
+        self.assertEqual(totals[("parse", "Sherman")]["count"], 1)
+        self.assertEqual(totals[("classify", "Sherman")]["count"], 1)
+
+    def test_run(self):
+        self.write_index("100", [FILLER, FILLER + SECTION + FILLER])
+        self.write_index("200", [SECTION])
+        profile_dir = os.path.join(self.dir, "profiles")
+        results = SpecRunner(processes=1, workers=2, profile_dir=profile_dir).run(
+            [["100", "Sherman"], ["100", "Oaks"], ["200", "Sherman"]], "2006/01/01", "2006/12/31", raw_dir=self.dir)
+        self.assertIsNotNone(results["100"]["Sherman"][-1]["INFO"])
+        specs = self.metrics.aggregate(("cik", "target", "stage"))
+        self.assertEqual(specs[("100", None, "scan")]["count"], 2)
+        self.assertEqual(specs[("100", "Oaks", "parse")]["count"], 1)
+        self.assertEqual(specs[("200", "Sherman", "parse")]["count"], 1)
+        # a dump per analyzed document and target
+        self.assertEqual(sorted(os.listdir(profile_dir)), ["100_doc1.htm-Oaks.prof", "100_doc1.htm-Sherman.prof", "200_doc0.htm-Sherman.prof"])
+
+if __name__ == '__main__':
+    unittest.main()
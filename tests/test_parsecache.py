@@ -0,0 +1,133 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,random,shutil,tempfile,unittest
+import parsers
+import utils
+from analysis import Analysis
+from parsecache import ParseCache, ParsedDocument
+from test_analysis import FILLER, document
+
+SECTION = ("<p><b>Note 3. Business Acquisition</b></p><p><font>On March 1 we acquired Sherman Oaks for cash. "
+    "The purchase price was allocated.</font></p>")
+
+class CountingParser(parsers.SoupParser):
+    """
+    the bs4 backend counting the documents it parses
+    """
+    def __init__(self):
+        self.parsed = 0
+
+    def load_text(self, filename):
+        self.parsed += 1
+        return super().load_text(filename)
+
+class TestParseCache(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.cache = ParseCache(os.path.join(self.dir, "parse_cache.db"))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.dir)
+
+    def write(self, body, name="doc.htm"):
+        filename = os.path.join(self.dir, name)
+        with open(filename, "w") as file:
+            file.write(document(body))
+        return filename
+
+    def extract(self, filename, parse_cache=None):
+        try:
+            return Analysis("Sherman", None).extract_assets(filename, parser="bs4", parse_cache=parse_cache)
+        except AttributeError as e:
+            # a title in the last row of a <tr> without any table breaks the whole section walk
+            return type(e)
+
+    def test_reuse(self):
+        filename = self.write(FILLER + SECTION + FILLER)
+        backend = CountingParser()
+        cached = self.cache.backend(backend)
+        for target_name in ("Sherman", "Oaks", "Sherman"):
+            Analysis(target_name, None).extract_sections(cached.load_text(filename), cached)
+        self.assertEqual(backend.parsed, 1)
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 1})
+        # a reopened cache still has it
+        self.cache.close()
+        self.cache = ParseCache(os.path.join(self.dir, "parse_cache.db"))
+        info = self.extract(filename, self.cache)
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 0})
+        self.assertEqual(info, self.extract(filename))
+        self.assertIn("Sherman Oaks", info)
+        # the same content under another name is the same entry, a changed one is not
+        self.extract(self.write(FILLER + SECTION + FILLER, "copy.htm"), self.cache)
+        self.extract(self.write(SECTION, "other.htm"), self.cache)
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 1})
+
+    def test_missing_section(self):
+        filename = os.path.join(self.dir, "none.htm")
+        with open(filename, "w") as file:
+            file.write("<DOCUMENT><TYPE>10-Q<TEXT>no description</TEXT></DOCUMENT>")
+        self.assertIsNone(self.extract(filename, self.cache))
+        self.assertIsNone(self.extract(filename, self.cache))
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_tree(self):
+        filename = self.write("<div><p align='center'>a<b>b</b><script>x</script><style>y</style><!-- c -->"
+            "<template>z</template></p><a href='#'>d</a><p>e</p><div>f<table><tr><td>g</td></tr></table></div></div>")
+        text_tag = parsers.SoupParser().load_text(filename)
+        doc = ParsedDocument.loads(ParsedDocument.from_soup(text_tag).dumps())
+        root = doc.node(doc.root)
+        tags = [text_tag] + text_tag.find_all(True)
+        nodes = [root] + root.find_all([tag.name for tag in tags])
+        self.assertEqual([node.name for node in nodes], [tag.name for tag in tags])
+        for tag, node in zip(tags, nodes):
+            self.assertEqual(node.get_text(), tag.get_text())
+            self.assertEqual(node.parent.name, tag.parent.name)
+            self.assertEqual(node.find('a', href=True) is None, tag.find('a', href=True) is None)
+            sibling, next = node.findNextSibling(['p', 'div']), tag.findNextSibling(['p', 'div'])
+            self.assertEqual(sibling.get_text() if sibling else None, next.get_text() if next else None)
+        p = root.find('p')
+        self.assertEqual(p['align'], "center")
+        p["mark"] = "1"
+        self.assertTrue(p.has_attr("mark"))
+        self.assertFalse(root.find('div').has_attr("mark"))
+
+    def test_random_markup(self):
+        words = ["Filler", "we", "acquired", "Sherman", "Inc.", "purchase price", "goodwill", "was allocated"]
+        titles = ["Note 3 Acquisition", "Goodwill", "Note 4 Commitments", "Other"]
+        def node(r, depth):
+            k = r.random()
+            if depth > 4 or k < 0.25:
+                return " ".join(r.choice(words) for _ in range(r.randint(1, 6)))
+            if k < 0.35:
+                return "<b>%s</b>" % r.choice(titles)
+            if k < 0.4:
+                return "<a href='#x'>x</a>"
+            if k < 0.45:
+                return r.choice(["</div>", "</p>", "</td>", "<br>", "</b>", "<!-- Sherman -->"])
+            if k < 0.55:
+                return "<table>%s</table>" % "".join("<tr>%s</tr>" % "".join("<td>%s</td>" % nodes(r, depth + 2)
+                    for _ in range(r.randint(1, 3))) for _ in range(r.randint(1, 3)))
+            tag = r.choice(["p", "div", "font"])
+            return "<%s>%s%s" % (tag, nodes(r, depth + 1), "</%s>" % tag if r.random() < 0.85 else "")
+        def nodes(r, depth):
+            return "".join(node(r, depth) for _ in range(r.randint(1, 4)))
+        for seed in range(200):
+            r = random.Random(seed)
+            filename = self.write("".join(node(r, 0) for _ in range(r.randint(3, 12))))
+            expected = self.extract(filename)
+            # parsed on the first run, and reused on the second
+            self.assertEqual(self.extract(filename, self.cache), expected)
+            self.assertEqual(self.extract(filename, self.cache), expected)
+        self.assertEqual(self.cache.stats()["hits"], self.cache.stats()["misses"])
+
+    def test_evict(self):
+        self.cache.max_bytes = 1
+        self.extract(self.write(SECTION, "a.htm"), self.cache)
+        self.extract(self.write(FILLER, "b.htm"), self.cache)
+        self.assertEqual(self.cache._conn.execute("SELECT COUNT(*) FROM parsed").fetchone()[0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,shutil,tempfile,unittest
+import utils
+from analysis import Analysis
+from test_analysis import document
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "documents")
+# the well-formed fixture documents with their target and a piece of the expected report, None if
+# the target has no acquisition report in it
+GOLDEN = {
+    "section.htm": ("Sherman", "On March 1, 2006 we acquired Sherman Oaks Medical, Inc."),
+    "table.htm": ("Sherman", "we acquired Sherman Technologies for $40.0 million"),
+    "div.htm": ("Senior Health", "On April 3, 2006 the Company acquired Senior Health Partners LLC."),
+    "mention.htm": ("Sherman", None),
+}
+
+class TestParserBackends(unittest.TestCase):
+    """
+    the known documents where the lxml backend reports differently from bs4, as lxml closes
+    the unclosed tags the way browsers do while html.parser keeps nesting them
+    """
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.analysis = Analysis("Sherman", None)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def extract(self, body):
+        filename = os.path.join(self.dir, "doc.htm")
+        with open(filename, "w") as file:
+            file.write(document(body))
+        return {name: self.analysis.extract_assets(filename, parser=name) for name in ("bs4", "lxml")}
+
+    def test_unclosed_paragraphs(self):
+        # html.parser nests the second <P> in the first one, so the title has no sibling
+        infos = self.extract("<P><B>Acquisition</B><P><FONT>We acquired Sherman Inc.</FONT>")
+        self.assertIsNone(infos["bs4"])
+        self.assertEqual(infos["lxml"], "We acquired Sherman Inc.\n\n")
+
+    def test_table_in_paragraph(self):
+        # lxml closes the <p> before the table, so the <div> after it follows the table
+        infos = self.extract("<p><table><tr><td>x</td></tr><tr><td><b>Acquisition</b></td></tr></table></p>"
+            "<div>We acquired Sherman Inc.</div>")
+        self.assertIsNone(infos["bs4"])
+        self.assertEqual(infos["lxml"], "We acquired Sherman Inc.\n\n")
+
+    def test_table_section(self):
+        infos = self.extract("<p><table><tr><td><b>Acquisition</b></td></tr><tr><td><font>We acquired Sherman Inc. "
+            "goodwill</font></td></tr></table></p>")
+        self.assertEqual(infos["bs4"], infos["lxml"])
+
+class TestGoldenFixtures(unittest.TestCase):
+    """
+    both backends report the same on the well-formed fixture documents
+    """
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+
+    def test_parity(self):
+        for name, (target_name, expected) in GOLDEN.items():
+            analysis = Analysis(target_name, None)
+            infos = {parser: analysis.extract_assets(os.path.join(FIXTURES, name), parser=parser) for parser in ("bs4", "lxml")}
+            self.assertEqual(infos["lxml"], infos["bs4"], name)
+            if expected is None:
+                self.assertIsNone(infos["bs4"], name)
+            else:
+                self.assertIn(expected, infos["bs4"], name)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import concurrent.futures
+import logging,os,shutil,tempfile,unittest
+from unittest import mock
+import cache
+import client
+import metrics
+import utils
+from edgar_stub import StubClient, quarterly_filings, serve
+from journal import RunJournal
+from pipeline import ScanPipeline, SpecRunner
+from test_analysis import FILLER, SECTION, document
+
+class TestScanPipeline(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write_index(self, cik, bodies):
+        os.makedirs(os.path.join(self.dir, cik))
+        with open(os.path.join(self.dir, cik, "download.idx"), "w") as index:
+            for i, body in enumerate(bodies):
+                filename = os.path.join(self.dir, cik, f"doc{i}.htm")
+                with open(filename, "w") as file:
+                    file.write(document(body))
+                index.write(f"10-Q\t2006-0{i + 1}-15\t{filename}\thttp://edgar.test/{cik}/{i}-index.htm\n")
+
+    def test_later_matches_listed(self):
+        self.write_index("100", [FILLER, FILLER + SECTION, SECTION, "<p>Sherman Oaks</p>", FILLER])
+        docs = ScanPipeline(workers=2).run("100", "Sherman", "2006/01/01", "2006/12/31", raw_dir=self.dir)
+        # the later matches are not analyzed, but still listed for the report
+        self.assertEqual([(os.path.basename(doc["FILENAME"]), doc["INFO"] is not None) for doc in docs],
+            [("doc1.htm", True), ("doc2.htm", False), ("doc3.htm", False)])
+        self.assertEqual(docs[2]["FILLING_URL"], "http://edgar.test/100/3-index.htm")
+
+    def test_list_rest(self):
+        self.write_index("100", [FILLER + SECTION, FILLER, "<p>Sherman Oaks</p>"])
+        docs = ScanPipeline(workers=2).run("100", "Sherman", "2006/01/01", "2006/12/31", raw_dir=self.dir)
+        self.assertEqual([(os.path.basename(doc["FILENAME"]), doc["INFO"] is not None) for doc in docs],
+            [("doc0.htm", True), ("doc2.htm", False)])
+        # the scanning stops at the acquisition report, like Analysis.iter_acquisition_reports()
+        for workers in (1, 2):
+            docs = ScanPipeline(workers=workers, list_rest=False).run("100", "Sherman", "2006/01/01", "2006/12/31",
+                raw_dir=self.dir)
+            self.assertEqual([os.path.basename(doc["FILENAME"]) for doc in docs], ["doc0.htm"])
+
+class TestSpecRunner(unittest.TestCase):
+    """
+    the process pool of SpecRunner gives the same records as a run in one process
+    """
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.stub = StubClient({"100": quarterly_filings(2006, 1, {1: SECTION}),
+            "200": quarterly_filings(2006, 1, {2: FILLER + SECTION, 3: "<p>Sherman Oaks</p>"}),
+            "300": quarterly_filings(2006, 1)})
+        self.server = serve(self.stub)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.dir)
+
+    def run_specs(self, processes):
+        """
+        return the results, the journal outcomes and the per cik stages of a run in its own directory
+        """
+        dir = os.path.join(self.dir, str(processes))
+        os.makedirs(dir)
+        specs = [["100", "Sherman"], ["200", "Sherman"], ["200", "Oaks"], ["300", "Sherman"]]
+        journal = RunJournal(os.path.join(dir, "journal.db"))
+        run_metrics = metrics.Metrics()
+        previous_metrics = metrics.configure_default_metrics(run_metrics)
+        # the workers are spawned, they read the server and their page cache from the environment
+        environ = {"EDGAR_BASE_URL": self.url, "EDGAR_CACHE": os.path.join(dir, "worker_cache.db")}
+        run_cache = cache.ResponseCache(os.path.join(dir, "cache.db"))
+        previous_client = client.configure_default_client(base_url=self.url, rate=0)
+        try:
+            with mock.patch.dict(os.environ, environ), mock.patch.object(cache, "_default_cache", run_cache):
+                results = SpecRunner(processes=processes, workers=2).run(specs, "2006/01/01", "2006/12/31",
+                    raw_dir=dir, journal=journal)
+            outcomes = {spec: outcome[0] for spec, outcome in journal.outcomes().items()}
+        finally:
+            client.configure_default_client()
+            metrics.configure_default_metrics(previous_metrics)
+            run_cache.close()
+            journal.close()
+        # the records are compared without the directory of the run
+        for targets in results.values():
+            for docs in targets.values():
+                for doc in docs:
+                    doc["FILENAME"] = os.path.relpath(doc["FILENAME"], dir)
+        stages = {key: total["count"] for key, total in run_metrics.aggregate(("cik", "stage")).items()
+            if key[1] != "http"}
+        return results, outcomes, stages
+
+    def test_processes(self):
+        expected = self.run_specs(1)
+        with mock.patch("concurrent.futures.ProcessPoolExecutor", wraps=concurrent.futures.ProcessPoolExecutor) as pool:
+            results, outcomes, stages = self.run_specs(2)
+        # two spawned workers, each one with half of the requests-per-second budget
+        kwargs = pool.call_args.kwargs
+        self.assertEqual((kwargs["max_workers"], kwargs["mp_context"].get_start_method(), kwargs["initargs"]),
+            (2, "spawn", (client.MAX_RATE / 2,)))
+        self.assertEqual(results, expected[0])
+        self.assertEqual([os.path.basename(doc["FILENAME"]) for doc in results["200"]["Sherman"]],
+            ["20060715_doc2.htm", "20061015_doc3.htm"])
+        self.assertIn("Sherman Oaks", results["100"]["Sherman"][0]["INFO"])
+        self.assertEqual(results["300"]["Sherman"], [])
+        # every cik is journaled and its stages are merged into the metrics of this process
+        self.assertEqual(outcomes, expected[1])
+        self.assertEqual(set(outcomes.values()), {"done"})
+        self.assertEqual(len(outcomes), 4)
+        self.assertEqual(stages, expected[2])
+        self.assertEqual({cik for cik, _ in stages.keys()}, {"100", "200", "300"})
+
+if __name__ == '__main__':
+    unittest.main()
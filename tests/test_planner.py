@@ -0,0 +1,110 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+from datetime import datetime
+import logging,os,shutil,tempfile,unittest
+import xlsxwriter
+import utils
+from pipeline import ScanPipeline, SpecRunner
+from planner import deal_window, plan_specs
+from textindex import TextIndex
+from test_analysis import document
+
+class TestPlanner(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_plan(self):
+        specs = [["100", "Sherman", "2006/01/01", "2006/03/31"], ["200", "Gas", "2006/01/01", "2006/12/31"],
+            ["100", "Oaks", "2006/03/01", "2006/06/30"], ["100", "Sherman", "2007/07/01", "2007/12/31"],
+            ["100", "Sirius", "2006/07/01", "2006/09/30"]]
+        # the specs are read once, like streamed from the spreadsheet
+        plans = plan_specs(iter(specs), "", "", window=lambda spec: (spec[2], spec[3]))
+        self.assertEqual(list(plans.keys()), ["100", "200"])
+        self.assertEqual(plans["100"].target_names, ["Sherman", "Oaks", "Sirius"])
+        # the adjacent windows are merged too
+        self.assertEqual(plans["100"].windows, [("2006/01/01", "2006/09/30"), ("2007/07/01", "2007/12/31")])
+        self.assertEqual(plan_specs(specs, "2006/01/01", "2008/12/31")["200"].windows, [("2006/01/01", "2008/12/31")])
+
+    def test_read_specs(self):
+        filename = os.path.join(self.dir, "firms.xlsx")
+        workbook = xlsxwriter.Workbook(filename)
+        sheet = workbook.add_worksheet("data")
+        date_format = workbook.add_format({"num_format": "yyyy-mm-dd"})
+        sheet.write_row(0, 0, ["Date_Announced", "Date_Effective", "CIK", "AcquirorName", "TargetName", "", "TargetName"])
+        rows = [(949341, "CheckFree Corp", "PhoneCharge Inc", "PhoneCharge"), ("x", "Nobody", "None", "None"),
+            (1109189, "Basic Energy Services Inc", "G & L Fishing Tool Co", "G&L"), (726958, "Other", "Gas Co", "Gas")]
+        for i, (cik, acquiror, target, name) in enumerate(rows, 1):
+            sheet.write_datetime(i, 0, datetime(2006, 1, 3), date_format)
+            sheet.write_datetime(i, 1, datetime(2006, 2, 28), date_format)
+            sheet.write(i, 2, cik)
+            sheet.write_row(i, 3, [acquiror, target, "", name])
+        workbook.close()
+        specs = list(utils.iter_specs(filename, 1, 4))
+        self.assertEqual([spec[:2] + spec[5:] for spec in specs],
+            [["949341", "PhoneCharge", "CheckFree Corp", "PhoneCharge Inc"],
+            ["1109189", "G&.*L", "Basic Energy Services Inc", "G & L Fishing Tool Co"]])
+        # the effective date is read from its own column
+        self.assertEqual(specs[0][3:5], ["2006/01/03", "2006/02/28"])
+
+    def test_excel_date(self):
+        self.assertEqual(utils.excel_date(datetime(2006, 1, 3, 12)), "2006/01/03")
+        # the serial number of xlrd
+        self.assertEqual(utils.excel_date(38720.0), "2006/01/03")
+        self.assertEqual(utils.excel_date("2006-01-03"), "2006/01/03")
+        self.assertEqual([utils.excel_date(value) for value in ("", 0, "n/a")], ["", "", ""])
+
+    def test_deal_window(self):
+        window = deal_window(lead_days=10, lag_days=30)
+        self.assertEqual(window(["100", "Sherman", "", "2006/03/01", "2006/05/31"]), ("2006/02/19", "2006/06/30"))
+        # the dates could be in any order, or only one of them known
+        self.assertEqual(window(["100", "Sherman", "", "2006/05/31", "2006/03/01"]), ("2006/02/19", "2006/06/30"))
+        self.assertEqual(window(["100", "Sherman", "", "", "2006/03/01"]), ("2006/02/19", "2006/03/31"))
+        specs = [["100", "Sherman", "", "2006/03/01", "2006/05/31"], ["100", "Oaks", "", "", ""]]
+        plans = plan_specs(specs, "2005/01/01", "2005/12/31", window)
+        self.assertEqual(plans["100"].target_windows["Oaks"], [("2005/01/01", "2005/12/31")])
+        self.assertEqual(plans["100"].windows, [("2005/01/01", "2005/12/31"), ("2006/02/19", "2006/06/30")])
+
+    def test_windows(self):
+        os.makedirs(os.path.join(self.dir, "100"))
+        with open(os.path.join(self.dir, "100", "download.idx"), "w") as index:
+            for date in ("2006-01-15", "2006-06-15", "2007-01-15"):
+                filename = os.path.join(self.dir, "100", f"{date}.htm")
+                with open(filename, "w") as file:
+                    file.write(document("Sherman"))
+                index.write(f"10-Q\t{date}\t{filename}\thttp://edgar.test/100/{date}-index.htm\n")
+        targets = ScanPipeline(workers=1).run_targets("100", ["Sherman"], "2006/01/01", "2007/12/31", raw_dir=self.dir,
+            windows=[("2006/01/01", "2006/03/31"), ("2006/12/01", "2007/02/01")])
+        self.assertEqual([doc["FILLING_DATE"] for doc in targets["Sherman"]], ["2006-01-15", "2007-01-15"])
+        # every target is only searched within its own deal
+        specs = [["100", "Sherman", "", "2006/01/10", "2006/01/20"], ["100", "Sher", "", "2006/12/01", "2006/12/31"]]
+        results = SpecRunner(processes=1).run(specs, "", "", raw_dir=self.dir, window=deal_window(lead_days=10, lag_days=30))
+        self.assertEqual([doc["FILLING_DATE"] for doc in results["100"]["Sherman"]], ["2006-01-15"])
+        self.assertEqual([doc["FILLING_DATE"] for doc in results["100"]["Sher"]], ["2007-01-15"])
+
+    def test_windows_with_text_index(self):
+        os.makedirs(os.path.join(self.dir, "100"))
+        index_file = os.path.join(self.dir, "100", "download.idx")
+        with open(index_file, "w") as index:
+            for date in ("2006-01-15", "2006-06-15", "2007-01-15"):
+                filename = os.path.join(self.dir, "100", f"{date}.htm")
+                with open(filename, "w") as file:
+                    file.write(document("Sherman Oaks"))
+                index.write(f"10-Q\t{date}\t{filename}\thttp://edgar.test/100/{date}-index.htm\n")
+        # the documents are indexed already, so the candidates of the text index narrow down the targets
+        path = os.path.join(self.dir, "index.db")
+        text_index = TextIndex(path)
+        text_index.update(index_file)
+        text_index.close()
+        specs = [["100", "Sherman", "", "2006/01/10", "2006/01/20"], ["100", "Oaks", "", "2006/12/01", "2006/12/31"]]
+        results = SpecRunner(processes=1, text_index=path).run(specs, "", "", raw_dir=self.dir,
+            window=deal_window(lead_days=10, lag_days=30))
+        self.assertEqual([doc["FILLING_DATE"] for doc in results["100"]["Sherman"]], ["2006-01-15"])
+        self.assertEqual([doc["FILLING_DATE"] for doc in results["100"]["Oaks"]], ["2007-01-15"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import json,logging,os,re,shutil,tempfile,unittest,zipfile
+from xml.etree import ElementTree
+import sinks
+import utils
+from pipeline import SpecRunner
+from test_analysis import FILLER, document
+
+SECTION = ("<p><b>Note 3. Business Acquisition</b></p><p><font>On March 1 we acquired Sherman Oaks for cash. "
+    "The purchase price was allocated.</font></p>")
+
+def doc(filename, date, info=None):
+    return {"FILENAME": filename, "FILLING_TYPE": "10-Q", "FILLING_DATE": date, "FILLING_URL": f"http://edgar.test/{filename}",
+        "INFO": info}
+
+class TestSinks(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.jsonl_file = os.path.join(self.dir, "results.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, cik, targets, append=True):
+        sink = sinks.JsonlSink(self.jsonl_file, append)
+        try:
+            for record in sinks.spec_records(cik, targets):
+                sink.write(record)
+        finally:
+            sink.close()
+
+    def read_report(self, filename):
+        """
+        return the cells of columns A and B of every worksheet, xlrd can't read xlsx on this python
+        """
+        ns = {"s": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+        report = {}
+        with zipfile.ZipFile(filename) as book:
+            strings = []
+            if "xl/sharedStrings.xml" in book.namelist():
+                strings = ["".join(t.text or "" for t in si.iter(f"{{{ns['s']}}}t"))
+                    for si in ElementTree.fromstring(book.read("xl/sharedStrings.xml")).findall("s:si", ns)]
+            sheets = ElementTree.fromstring(book.read("xl/workbook.xml")).findall("s:sheets/s:sheet", ns)
+            for i, sheet in enumerate(sheets):
+                rows = []
+                for row in ElementTree.fromstring(book.read(f"xl/worksheets/sheet{i + 1}.xml")).iter(f"{{{ns['s']}}}row"):
+                    cells = {"A": "", "B": ""}
+                    for cell in row.findall("s:c", ns):
+                        column = re.match("[A-Z]+", cell.get("r")).group()
+                        if cell.get("t") == "inlineStr":
+                            cells[column] = "".join(t.text or "" for t in cell.iter(f"{{{ns['s']}}}t"))
+                        elif cell.get("t") == "s":
+                            cells[column] = strings[int(cell.find("s:v", ns).text)]
+                    rows.append([cells["A"], cells["B"]])
+                report[sheet.get("name")] = rows
+        return report
+
+    def test_records(self):
+        self.write("100", {"Sherman": [doc("a.htm", "2006-01-15"), doc("b.htm", "2006-04-15", "acquired")], "Oaks": []})
+        with open(self.jsonl_file) as input:
+            records = [json.loads(line) for line in input]
+        self.assertEqual([list(record.keys()) for record in records], [list(sinks.FIELDS)] * 2)
+        self.assertEqual([(record["CIK"], record["TARGET_NAME"], record["INFO"]) for record in records],
+            [("100", "Sherman", None), ("100", "Sherman", "acquired")])
+
+    def test_report(self):
+        # the ciks are done in any order, and a spec written again replaces the earlier records
+        self.write("200", {"Gas": [doc("g.htm", "2006-02-15")]})
+        self.write("100", {"Sherman": [doc("a.htm", "2006-01-15")]})
+        self.write("100", {"Sherman": [doc("a.htm", "2006-01-15"), doc("b.htm", "2006-04-15", "acquired")]})
+        with open(self.jsonl_file, "a") as output:
+            output.write('{"CIK": "300", "TARG')
+        filename = sinks.XlsxReport(os.path.join(self.dir, "report.xlsx")).build(
+            [["100", "Sherman"], ["300", "G&.*L"], ["200", "Gas"], ["100", "Sherman"]], self.jsonl_file)
+        report = self.read_report(filename)
+        self.assertEqual(list(report.keys()), ["100-Sherman", "300-GL", "200-Gas"])
+        self.assertEqual(report["100-Sherman"], [["Target Name:", "Sherman"], ["a.htm", ""], ["b.htm", "acquired"]])
+        self.assertEqual(report["300-GL"], [["Target Name:", "G&.*L"]])
+        self.assertEqual(report["200-Gas"], [["Target Name:", "Gas"], ["g.htm", ""]])
+
+    @unittest.skipIf(sinks.pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        filename = os.path.join(self.dir, "results.parquet")
+        sink = sinks.ParquetSink(filename, batch_size=2)
+        records = list(sinks.spec_records("100", {"Sherman": [doc(f"{i}.htm", "2006-01-15") for i in range(5)]}))
+        for record in records:
+            sink.write(record)
+        sink.close()
+        self.assertEqual(sinks.pyarrow.parquet.read_table(filename).to_pylist(), [dict(record) for record in records])
+
+    def test_run(self):
+        os.makedirs(os.path.join(self.dir, "100"))
+        filename = os.path.join(self.dir, "100", "doc0.htm")
+        with open(filename, "w") as file:
+            file.write(document(FILLER + SECTION))
+        with open(os.path.join(self.dir, "100", "download.idx"), "w") as index:
+            index.write(f"10-Q\t2006-01-15\t{filename}\thttp://edgar.test/100/0-index.htm\n")
+        sink = sinks.JsonlSink(self.jsonl_file)
+        try:
+            results = SpecRunner(processes=1).run([["100", "Sherman"], ["100", "Gas"]], "2006/01/01", "2006/12/31",
+                raw_dir=self.dir, sink=sink)
+        finally:
+            sink.close()
+        self.assertEqual(results, {"100": True})
+        report = self.read_report(sinks.XlsxReport(os.path.join(self.dir, "report.xlsx")).build(
+            [["100", "Sherman"], ["100", "Gas"]], self.jsonl_file))
+        self.assertEqual(report["100-Sherman"][1][0], filename)
+        self.assertIn("Sherman Oaks", report["100-Sherman"][1][1])
+        self.assertEqual(report["100-Gas"], [["Target Name:", "Gas"]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,shutil,tempfile,threading,unittest
+from unittest import mock
+import utils
+import store
+from analysis import Analysis
+from cache import ResponseCache
+from edgar_stub import StubClient, document, quarterly_filings
+from fillings import Company
+from parsers import iter_text_section
+from store import FilingStore
+from textindex import TextIndex
+
+SECTION = ("<p><b>Note 3. Business Acquisition</b></p><p><font>On March 1 we acquired Sherman Oaks for cash. "
+    "The purchase price was allocated to goodwill.</font></p>")
+
+class TestFilingStore(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.store = FilingStore(os.path.join(self.dir, "store"), codec="gzip")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def objects(self):
+        return [name for _, _, names in os.walk(os.path.join(self.dir, "store", "objects")) for name in names]
+
+    def test_dedup(self):
+        content = document("<p>Filler</p>" * 100).encode()
+        first = self.store.link(content, os.path.join(self.dir, "a.htm"))
+        second = self.store.link(content, os.path.join(self.dir, "b.htm"))
+        self.store.link(b"other", os.path.join(self.dir, "c.htm"))
+        self.assertEqual(first, os.path.join(self.dir, "a.htm.gz"))
+        self.assertEqual(len(self.objects()), 2)
+        self.assertEqual(self.store.stats["deduplicated"], 1)
+        self.assertEqual(os.stat(first).st_ino, os.stat(second).st_ino)
+        self.assertLess(os.path.getsize(first), len(content))
+        self.assertEqual(store.read_filing(second), content)
+
+    def test_readers(self):
+        content = document(SECTION).encode()
+        plain = os.path.join(self.dir, "plain.htm")
+        with open(plain, "wb") as file:
+            file.write(content)
+        packed = self.store.link(content, os.path.join(self.dir, "packed.htm"))
+        for filename in (plain, packed):
+            for chunk_size in (7, store.CHUNK_SIZE):
+                with store.filing_blocks(filename, chunk_size=chunk_size) as blocks:
+                    blocks = [(offset, bytes(block)) for offset, block in blocks]
+                self.assertEqual(b"".join(block for offset, block in blocks), content)
+                self.assertTrue(all(content.startswith(block, offset) for offset, block in blocks))
+            # a compressed filing is decompressed block by block, each cut after a line break
+            with store.filing_blocks(filename, chunk_size=64) as blocks:
+                blocks = [bytes(block) for offset, block in blocks]
+            self.assertEqual(len(blocks) > 1, filename == packed)
+            self.assertTrue(all(block.endswith(b"\n") for block in blocks[:-1]))
+            with mock.patch.object(store, "CHUNK_SIZE", 64):
+                self.assertEqual(Analysis.mention_offsets(filename, "Sherman"), Analysis.mention_offsets(plain, "Sherman"))
+                offsets = {}
+                self.assertEqual(Analysis.full_text_search_targets(filename, ["Oaks", "Sherman"], 0, offsets), {"Oaks", "Sherman"})
+                self.assertEqual(offsets["Sherman"], Analysis.mention_offsets(plain, "Sherman"))
+            self.assertEqual(Analysis.full_text_search(filename, "Sherman"), b"Sherman")
+            self.assertEqual(Analysis.full_text_search_targets(filename, ["Oaks", "Acme"]), {"Oaks"})
+            self.assertEqual(b"".join(iter_text_section(filename)), b"".join(iter_text_section(plain)))
+        self.assertEqual(Analysis("Sherman", None).extract_assets(packed, parser="bs4"),
+            Analysis("Sherman", None).extract_assets(plain, parser="bs4"))
+        with store.filing_blocks(self.store.link(b"", os.path.join(self.dir, "empty.htm"))) as blocks:
+            self.assertEqual(list(blocks), [])
+
+    def test_text_index(self):
+        packed = self.store.link(document(SECTION).encode(), os.path.join(self.dir, "packed.htm"))
+        index = TextIndex(os.path.join(self.dir, "index.db"))
+        try:
+            self.assertTrue(index.add(packed))
+            self.assertEqual(index.search("Sherman Oaks"), {os.path.normpath(packed)})
+        finally:
+            index.close()
+
+    def test_download(self):
+        bodies = {i: SECTION for i in range(4)}
+        client = StubClient({"100": quarterly_filings(2006, 1, bodies), "200": quarterly_filings(2006, 1, bodies)})
+        cache = ResponseCache(os.path.join(self.dir, "cache.db"))
+        try:
+            for cik in ("100", "200"):
+                filenames = [filename for filename, _ in Company(cik, client, cache).iter_documents("2006/01/01",
+                    "2006/12/31", {"10-K", "10-Q"}, self.dir, threading.Event(), incremental=True, store=self.store)]
+                self.assertEqual(len(filenames), 4)
+                self.assertTrue(all(filename.endswith(".gz") for filename in filenames))
+                self.assertEqual(list(utils.read_index(os.path.join(self.dir, cik, "download.idx")).keys()), filenames)
+            # the 10-K and the 10-Q differ in their header only, shared by both ciks
+            self.assertEqual(len(self.objects()), 2)
+            # the documents on disk are not downloaded again
+            requests = client.requests["document"]
+            Company("100", client, cache).download_documents("2006/01/01", "2006/12/31", root_dir=self.dir,
+                store=self.store)
+            self.assertEqual(client.requests["document"], requests)
+        finally:
+            cache.close()
+
+    def test_migrate(self):
+        os.makedirs(os.path.join(self.dir, "100"))
+        index_file = os.path.join(self.dir, "100", "download.idx")
+        filename = os.path.join(self.dir, "100", "20060115_doc0.htm")
+        content = document(SECTION).encode()
+        with open(filename, "wb") as file:
+            file.write(content)
+        with open(index_file, "w") as file:
+            file.write(f"10-K\t2006-01-15\t{filename}\thttp://edgar.test/Archives/100/0-index.htm\n")
+        self.assertEqual(self.store.migrate(index_file), 1)
+        self.assertFalse(os.path.exists(filename))
+        entries = utils.read_index(index_file)
+        self.assertEqual(list(entries.keys()), [filename + ".gz"])
+        self.assertEqual(store.read_filing(filename + ".gz"), content)
+        # nothing left to move
+        self.assertEqual(self.store.migrate(index_file), 0)
+
+if __name__ == '__main__':
+    unittest.main()
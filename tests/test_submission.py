@@ -0,0 +1,106 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import logging,os,shutil,tempfile,unittest
+import store
+import utils
+from analysis import Analysis
+from cache import ResponseCache
+from edgar_stub import StubClient, quarterly_filings
+from fillings import Company
+from submission import MAX_LINE, SubmissionSplitter, submission_url
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "submissions", "0000000100-06-000001.txt")
+
+class TestSubmissionSplitter(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        with open(FIXTURE, "rb") as input:
+            self.content = input.read()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def split(self, content, types, chunk_size, dir=None, **kwargs):
+        splitter = SubmissionSplitter(dir or self.dir, types, **kwargs)
+        for i in range(0, len(content), chunk_size):
+            splitter.feed(content[i:i + chunk_size])
+            self.assertLessEqual(len(splitter._rest), MAX_LINE + chunk_size)
+        return splitter.close()
+
+    def part(self, type):
+        start = self.content.index(b"<DOCUMENT>\n<TYPE>%s\n" % type)
+        return self.content[start:self.content.index(b"</DOCUMENT>\n", start) + len(b"</DOCUMENT>\n")]
+
+    def test_submission_url(self):
+        self.assertEqual(submission_url("https://www.sec.gov/Archives/edgar/data/1750/000104746906011256/"
+            "0001047469-06-011256-index.htm"), "https://www.sec.gov/Archives/edgar/data/1750/000104746906011256/"
+            "0001047469-06-011256.txt")
+
+    def test_split(self):
+        for chunk_size in (1, 7, 4096, len(self.content)):
+            dir = os.path.join(self.dir, str(chunk_size))
+            os.makedirs(dir)
+            filenames = self.split(self.content, {"10-Q"}, chunk_size, dir, prefix="20060515")
+            self.assertEqual(filenames, [os.path.join(dir, "20060515_d10q.htm")])
+            with open(filenames[0], "rb") as input:
+                self.assertEqual(input.read(), self.part(b"10-Q"))
+            self.assertEqual(sorted(os.listdir(dir)), ["20060515_d10q.htm"])
+        info = Analysis("Sherman Oaks", None).extract_assets(filenames[0], parser="bs4")
+        self.assertIn("we acquired Sherman Oaks", info)
+
+    def test_types(self):
+        filenames = self.split(self.content, {"10-Q", "EX-31.1"}, 13)
+        self.assertEqual([os.path.basename(filename) for filename in filenames], ["d10q.htm", "dex311.htm"])
+        # a document on disk already is kept as it is
+        with open(filenames[1], "wb") as output:
+            output.write(b"kept")
+        self.assertEqual(self.split(self.content, {"EX-31.1"}, 13), filenames[1:])
+        with open(filenames[1], "rb") as input:
+            self.assertEqual(input.read(), b"kept")
+
+    def test_long_line(self):
+        body = b"<p>" + b"Sherman " * (4 * MAX_LINE // 8) + b"</p>"
+        content = self.content.replace(b"<BODY>\n", b"<BODY>" + body, 1)
+        filenames = self.split(content, {"10-Q"}, 1000)
+        with open(filenames[0], "rb") as input:
+            self.assertEqual(input.read(), self.part(b"10-Q").replace(b"<BODY>\n", b"<BODY>" + body, 1))
+
+    def test_truncated(self):
+        cut = self.content.index(b"</TABLE>")
+        self.assertEqual(self.split(self.content[:cut], {"10-Q"}, 100), [])
+        self.assertEqual(os.listdir(self.dir), [])
+
+    def test_store(self):
+        filings = store.FilingStore(os.path.join(self.dir, "store"), codec="gzip")
+        filenames = self.split(self.content, {"10-Q"}, 100, store=filings)
+        self.assertEqual(filenames, [os.path.join(self.dir, "d10q.htm.gz")])
+        self.assertEqual(store.read_filing(filenames[0]), self.part(b"10-Q"))
+
+class TestSubmissionDownload(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+        self.cache = ResponseCache(os.path.join(self.dir, "cache.db"))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.dir)
+
+    def test_download(self):
+        client = StubClient({"100": quarterly_filings(2006, 1, {2: "<p>we acquired Sherman Oaks</p>"})})
+        index_file = Company("100", client, self.cache).download_documents("2006/01/01", "2006/12/31", {"10-Q"},
+            self.dir, submission=True)
+        # one request per filing, no 'Filling Detail' page
+        self.assertEqual((client.requests["submission"], client.requests["detail"], client.requests["document"]), (3, 0, 0))
+        docs = utils.read_index(index_file)
+        self.assertEqual([os.path.basename(filename) for filename in docs.keys()],
+            ["20060415_doc1.htm", "20060715_doc2.htm", "20061015_doc3.htm"])
+        self.assertEqual([dic["FILLING_TYPE"] for dic in docs.values()], ["10-Q"] * 3)
+        self.assertEqual(list(Analysis("Sherman Oaks", index_file).locate_target_documents().keys()),
+            [os.path.join(self.dir, "100", "20060715_doc2.htm")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import io,logging,os,shutil,tempfile,unittest
+from bs4 import BeautifulSoup
+import parsers
+import tables
+import utils
+from analysis import Analysis
+from test_analysis import FILLER, document
+from test_parsers import FIXTURES as DOCUMENTS
+
+# the CSV text of every table of the fixture documents, as the report has it
+GOLDEN_CSV = os.path.join(os.path.dirname(__file__), "fixtures", "csv")
+
+# a purchase price allocation table the EDGAR way: the headers span the "$" and the amount columns,
+# and the closing parenthesis of a negative amount is a cell of its own
+ALLOCATION = ("<table><tr><td></td><td colspan='4' align='center'><b>Sherman Oaks</b></td></tr>"
+    "<tr><td></td><td colspan='2' align='center'><b>2006</b></td><td colspan='2' align='center'><b>2005</b></td></tr>"
+    "<tr><td rowspan='2'>Goodwill</td><td>$</td><td>1,234</td><td>$</td><td>(56</td><td>)</td></tr>"
+    "<tr><td>&nbsp;</td><td>7.5</td><td></td><td>&#8212;</td></tr>"
+    "<tr><td>Intangible assets</td><td>$</td><td>(12)</td><td></td><td>3</td></tr></table>")
+
+class TestTableGrid(unittest.TestCase):
+
+    def setUp(self):
+        utils.logger.setLevel(logging.ERROR)
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def grids(self, markup):
+        filename = os.path.join(self.dir, "doc.htm")
+        with open(filename, "w") as file:
+            file.write(document(markup))
+        return {name: tables.TableGrid(parsers.get_parser(name).load_text(filename).find_all("table")[0])
+            for name in ("bs4", "lxml")}
+
+    def test_parse_number(self):
+        self.assertEqual([tables.parse_number(text) for text in ("$1,234", "(1,234)", "$ (1,234.5)", "-12.5", ".5")],
+            [1234.0, -1234.0, -1234.5, -12.5, 0.5])
+        self.assertEqual([tables.parse_number(text) for text in ("", "-", "—", "1,2", "2006 Plan", "()")], [None] * 6)
+
+    def test_spans(self):
+        for name, grid in self.grids(ALLOCATION).items():
+            self.assertEqual(grid.headers, ["", "Sherman Oaks 2006", "Sherman Oaks 2005"], name)
+            # the label spanning two rows is in both of them
+            self.assertEqual(grid.rows, [["Goodwill", "1,234", "(56)"], ["Goodwill", "7.5", "—"],
+                ["Intangible assets", "(12)", "3"]], name)
+            self.assertEqual(grid.values, [["Goodwill", 1234.0, -56.0], ["Goodwill", 7.5, "—"],
+                ["Intangible assets", -12.0, 3.0]], name)
+
+    def test_th_headers(self):
+        grid = tables.TableGrid(BeautifulSoup("<table><thead><tr><th>Asset</th><th>Amount</th></tr></thead>"
+            "<tbody><tr><td>Goodwill</td><td>$ 10</td></tr><tr><td></td><td></td></tr></tbody></table>", "html.parser").table)
+        self.assertEqual(grid.headers, ["Asset", "Amount"])
+        self.assertEqual(grid.values, [["Goodwill", 10.0]])
+        self.assertEqual(grid.columns, ["Asset", "Amount"])
+
+    def test_table2csv(self):
+        # the report keeps the CSV text of the tables as it has always been, the grid is only for the amounts
+        output = io.StringIO()
+        Analysis.table2csv(BeautifulSoup(ALLOCATION, "html.parser").table, output)
+        self.assertEqual(output.getvalue(), '\r\n,2006,2005\r\nGoodwill,"1,234",(56,)\r\n,7.5,,—\r\nIntangible assets,(12),,3\r\n')
+        for name in sorted(os.listdir(DOCUMENTS)):
+            for parser in ("bs4", "lxml"):
+                for i, table in enumerate(parsers.get_parser(parser).load_text(os.path.join(DOCUMENTS, name)).find_all("table")):
+                    output = io.StringIO()
+                    Analysis.table2csv(table, output)
+                    with open(os.path.join(GOLDEN_CSV, f"{os.path.splitext(name)[0]}-{i}.csv"), newline="") as golden:
+                        self.assertEqual(output.getvalue(), golden.read(), f"{name} {parser} {i}")
+
+    def test_batch(self):
+        filenames = []
+        for i in range(2):
+            os.makedirs(os.path.join(self.dir, "100"), exist_ok=True)
+            filenames.append(os.path.join(self.dir, "100", f"doc{i}.htm"))
+            with open(filenames[-1], "w") as file:
+                file.write(document(FILLER + "<table><tr><td>Other</td><td>1</td></tr></table>" + ALLOCATION))
+        analysis = Analysis("Sherman", os.path.join(self.dir, "100", "download.idx"))
+        batch = tables.TableBatch()
+        for filename in filenames:
+            self.assertEqual(len(analysis.extract_asset_tables(filename, batch=batch)), 1)
+        columns = batch.columns()
+        self.assertEqual(len(batch), 10)
+        self.assertEqual(list(columns.keys()), ["CIK", "TARGET_NAME", "FILENAME", "TABLE", "ROW", "LABEL", "COLUMN", "VALUE"])
+        self.assertEqual(set(columns["CIK"]), {"100"})
+        self.assertEqual(columns["TABLE"][:5], [0] * 5)
+        self.assertEqual(list(zip(columns["LABEL"], columns["COLUMN"], columns["VALUE"]))[:2],
+            [("Goodwill", "Sherman Oaks 2006", 1234.0), ("Goodwill", "Sherman Oaks 2005", -56.0)])
+
+    @unittest.skipIf(tables.pandas is None, "pandas is not installed")
+    def test_frame(self):
+        grid = tables.TableGrid(BeautifulSoup(ALLOCATION, "html.parser").table)
+        frame = grid.to_frame()
+        self.assertEqual(list(frame.columns), ["col0", "Sherman Oaks 2006", "Sherman Oaks 2005"])
+        self.assertEqual(frame["Sherman Oaks 2006"].tolist(), [1234.0, 7.5, -12.0])
+        self.assertEqual(grid.to_array().shape, (3, 3))
+
+if __name__ == '__main__':
+    unittest.main()
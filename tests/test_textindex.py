@@ -0,0 +1,104 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+import os,shutil,sqlite3,tempfile,unittest
+from textindex import TextIndex, pattern_words
+
+class TestPatternWords(unittest.TestCase):
+
+    def test_literal(self):
+        self.assertEqual(pattern_words("Sherman"), [("sherman", "infix")])
+        self.assertEqual(pattern_words("Sherman Oaks"), [("sherman", "suffix"), ("oaks", "prefix")])
+        self.assertEqual(pattern_words("Sherman Oaks Inc"), [("sherman", "suffix"), ("oaks", "exact"), ("inc", "prefix")])
+
+    def test_escapes(self):
+        # an escaped punctuation is a literal which ends the word
+        self.assertEqual(pattern_words(r"Sherman Inc\."), [("sherman", "suffix"), ("inc", "exact")])
+        self.assertEqual(pattern_words(r"G\&L Fishing"), [("fishing", "prefix")])
+        # a character class splits the run
+        self.assertEqual(pattern_words(r"Sherman\s+Oaks"), [("sherman", "infix"), ("oaks", "infix")])
+        self.assertEqual(pattern_words(r"\bSherman\b"), [("sherman", "infix")])
+
+    def test_quantifiers(self):
+        # the character before an optional quantifier is dropped
+        self.assertEqual(pattern_words("Sherman?"), [("sherma", "infix")])
+        self.assertEqual(pattern_words("Sherm*an"), [("sher", "infix")])
+        self.assertEqual(pattern_words("Sherm{2}an"), [("sher", "infix")])
+        self.assertEqual(pattern_words("Sher+man"), [("sher", "infix"), ("man", "infix")])
+
+    def test_groups_and_sets(self):
+        self.assertEqual(pattern_words("(Sherman) Oaks"), [("oaks", "prefix")])
+        self.assertEqual(pattern_words("Sherm[ae]n Oaks"), [("sherm", "infix"), ("oaks", "prefix")])
+        self.assertEqual(pattern_words("Sherm.n"), [("sherm", "infix")])
+
+    def test_no_required_words(self):
+        self.assertEqual(pattern_words("Sherman|Oaks"), [])
+        self.assertEqual(pattern_words("G&L"), [])
+        self.assertEqual(pattern_words(""), [])
+        self.assertEqual(pattern_words("(Sherman|Oaks)"), [])
+
+class TestTextIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.index = TextIndex(os.path.join(self.dir, "index.db"))
+        self.files = {}
+        for name, text in {"a": "<p><font>We acquired Sherman Oaks Inc.</font></p>",
+                "b": "<p><font style='Sherman'>Shermans and Oakland</font></p>",
+                "c": "<p>The Sherman-Oaks deal</p>"}.items():
+            filename = os.path.join(self.dir, name + ".htm")
+            with open(filename, "w") as file:
+                file.write(text)
+            self.index.add(filename)
+            self.files[name] = os.path.normpath(filename)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.dir)
+
+    def candidates(self, pattern):
+        paths = self.index.candidates(pattern)
+        return None if paths is None else sorted(name for name, filename in self.files.items() if filename in paths)
+
+    def test_word_modes(self):
+        self.assertEqual(self.candidates("Sherman"), ["a", "b", "c"])
+        # the candidates only have the words, the regex is confirmed on them later
+        self.assertEqual(self.candidates("Sherman Oaks"), ["a", "c"])
+        self.assertEqual(self.candidates("and Oakl"), ["b"])
+        self.assertEqual(self.candidates("herma"), ["a", "b", "c"])
+        self.assertEqual(self.candidates("rmans and"), ["b"])
+        self.assertEqual(self.candidates("Sherman|Oaks"), None)
+
+    def test_markup_skipped(self):
+        self.assertEqual(self.candidates("font"), [])
+        self.assertEqual(self.candidates(" Oakland"), ["b"])
+        self.assertEqual(self.index.offsets(self.files["b"], "sherman"), (0, []))
+
+    def test_search(self):
+        self.assertEqual(self.index.search("Sherman.Oaks"), {self.files["a"], self.files["c"]})
+        self.assertEqual(self.index.search("Sherman Oaks"), {self.files["a"]})
+
+    def test_reindex(self):
+        self.assertFalse(self.index.add(self.files["a"]))
+        with open(self.files["a"], "w") as file:
+            file.write("<p>nothing left</p>")
+        os.utime(self.files["a"], (1, 1))
+        self.assertTrue(self.index.add(self.files["a"]))
+        self.assertEqual(self.candidates("Sherman"), ["b", "c"])
+
+    def test_old_schema_rebuilt(self):
+        path = os.path.join(self.dir, "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE tokens (id INTEGER PRIMARY KEY, token TEXT UNIQUE)")
+        conn.execute("INSERT INTO tokens (token) VALUES ('sherman')")
+        conn.commit()
+        conn.close()
+        index = TextIndex(path)
+        try:
+            self.assertEqual(index.candidates("Sherman"), set())
+            index.add(self.files["a"])
+            self.assertEqual(index.candidates("Sherman"), {self.files["a"]})
+        finally:
+            index.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,311 @@
+#!/usr/bin/Python
+# -*- coding: utf-8 -*
+
+from array import array
+import os,re,sqlite3,threading
+import store
+import utils
+
+# words shorter than this are too common to narrow down the candidates
+MIN_WORD_LENGTH = 3
+# only the first offsets of a word are kept in every filing, the count is always exact
+MAX_OFFSETS = 32
+# the markup is skipped, only the words of the text content are indexed
+TOKEN_PATTERN = re.compile(rb"<[^<>]*>|[a-z0-9]+")
+# the tokens are made of [a-z0-9], which all sort before this character
+TOKEN_END = "{"
+# bumped whenever the tables or the tokenizing change, an older index is rebuilt
+SCHEMA_VERSION = 2
+META_CHARS = set(".^$*+?{}[]()|\\")
+
+def pattern_words(pattern):
+    """
+    figure out the words which must appear in any text matching the regex 'pattern', as a list of
+    (word, match_mode) tuples where match_mode tells how the word could be embedded in a token:
+    'exact', 'prefix' (the token starts with the word), 'suffix' or 'infix'.
+    Only the literal runs outside of groups are used, and a pattern with a top-level alternation
+    has no required words at all.
+    """
+    runs = []
+    run = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "\\" and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            i += 2
+            if depth == 0 and not nxt.isalnum():
+                run += nxt
+                continue
+            # character classes like \d or \s
+            runs.append(run)
+            run = ""
+            continue
+        i += 1
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth = max(0, depth - 1)
+        elif c == "|" and depth == 0:
+            return []
+        elif c == "[":
+            # skip the character set
+            close = pattern.find("]", i + 1)
+            i = len(pattern) if close < 0 else close + 1
+        elif depth > 0:
+            continue
+        elif c in "*?{":
+            if c == "{":
+                close = pattern.find("}", i)
+                i = len(pattern) if close < 0 else close + 1
+            # the previous character is optional
+            runs.append(run[:-1])
+            run = ""
+            continue
+        elif c not in META_CHARS:
+            run += c
+            continue
+        runs.append(run)
+        run = ""
+    runs.append(run)
+
+    words = []
+    for run in runs:
+        run = run.lower()
+        for match in re.finditer(r"[a-z0-9]+", run):
+            word = match.group()
+            if len(word) < MIN_WORD_LENGTH:
+                continue
+            open_left = match.start() == 0
+            open_right = match.end() == len(run)
+            if open_left and open_right:
+                words.append((word, "infix"))
+            elif open_left:
+                words.append((word, "suffix"))
+            elif open_right:
+                words.append((word, "prefix"))
+            else:
+                words.append((word, "exact"))
+    return words
+
+class TextIndex():
+    """
+    persistent inverted index over the downloaded filings, which maps every lower-cased word of
+    the text content to the filings containing it with the offsets of its first occurrences.
+    Looking up the words of a target name pattern narrows down the candidate filings, so that the
+    regex is only confirmed on them instead of all the documents.
+    The words are found by index range scans: a prefix on the tokens, a suffix on the reversed
+    tokens, and an infix by the trigrams of the tokens.
+    """
+    def __init__(self, path="filings_index.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # the index is rebuilt from the documents as they are added again
+            self._conn.executescript("""
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS tokens;
+                DROP TABLE IF EXISTS postings;
+                DROP TABLE IF EXISTS trigrams;
+                """)
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime REAL);
+            CREATE TABLE IF NOT EXISTS tokens (id INTEGER PRIMARY KEY, token TEXT UNIQUE, reversed TEXT);
+            CREATE INDEX IF NOT EXISTS tokens_reversed ON tokens (reversed);
+            CREATE TABLE IF NOT EXISTS trigrams (trigram TEXT, token_id INTEGER, PRIMARY KEY (trigram, token_id)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS postings (token_id INTEGER, file_id INTEGER, count INTEGER, offsets BLOB,
+                PRIMARY KEY (token_id, file_id)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+            PRAGMA user_version = {SCHEMA_VERSION};
+            """)
+        self._conn.commit()
+
+    @staticmethod
+    def tokenize(data, words=None, offset=0):
+        """
+        return a map with every lower-cased word of the text content in 'data' as key and (count, offsets)
+        as value, the words within the tags like the element names and attributes are left out.
+        The words of a block of a filing starting at the byte 'offset' are added into the 'words' given.
+        """
+        if words is None:
+            words = {}
+        for match in TOKEN_PATTERN.finditer(data.lower()):
+            word = match.group()
+            if word[0] == 0x3c:
+                continue
+            entry = words.get(word)
+            if entry is None:
+                entry = words[word] = [0, array('I')]
+            entry[0] += 1
+            if entry[0] <= MAX_OFFSETS:
+                entry[1].append(offset + match.start())
+        return words
+
+    def _file_id(self, filename):
+        row = self._conn.execute("SELECT id FROM files WHERE path = ?", (os.path.normpath(filename),)).fetchone()
+        return row[0] if row is not None else None
+
+    def add(self, filename):
+        """
+        index a filing unless it has been indexed with the same size and modification time,
+        return True if it is (re)indexed
+        """
+        path = os.path.normpath(filename)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute("SELECT id, size, mtime FROM files WHERE path = ?", (path,)).fetchone()
+            if row is not None and row[1] == stat.st_size and row[2] == stat.st_mtime:
+                return False
+        words = {}
+        # a block ends right after a '>', which neither a word nor a tag token holds within it
+        with store.filing_blocks(path, b">", mapped=False) as blocks:
+            for offset, block in blocks:
+                self.tokenize(block, words, offset)
+        with self._lock:
+            if row is not None:
+                self._conn.execute("DELETE FROM postings WHERE file_id = ?", (row[0],))
+                self._conn.execute("UPDATE files SET size = ?, mtime = ? WHERE id = ?", (stat.st_size, stat.st_mtime, row[0]))
+                file_id = row[0]
+            else:
+                file_id = self._conn.execute("INSERT INTO files (path, size, mtime) VALUES (?, ?, ?)",
+                    (path, stat.st_size, stat.st_mtime)).lastrowid
+            token_ids = self._token_ids(words.keys())
+            self._conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)",
+                [(token_ids[word], file_id, entry[0], entry[1].tobytes()) for word, entry in words.items()])
+            self._conn.commit()
+        return True
+
+    def _token_ids(self, words):
+        """
+        return a map with every word as key and its token id as value, the new tokens are added
+        together with their trigrams
+        """
+        token_ids = {}
+        words = list(words)
+        for i in range(0, len(words), 500):
+            chunk = [word.decode('ascii') for word in words[i:i + 500]]
+            rows = self._conn.execute(f"SELECT token, id FROM tokens WHERE token IN ({','.join('?' * len(chunk))})", chunk)
+            token_ids.update((token.encode('ascii'), id) for token, id in rows.fetchall())
+        trigrams = []
+        for word in words:
+            if word in token_ids:
+                continue
+            token = word.decode('ascii')
+            id = self._conn.execute("INSERT INTO tokens (token, reversed) VALUES (?, ?)", (token, token[::-1])).lastrowid
+            token_ids[word] = id
+            trigrams += [(trigram, id) for trigram in {token[j:j + 3] for j in range(len(token) - 2)}]
+        self._conn.executemany("INSERT OR IGNORE INTO trigrams VALUES (?, ?)", trigrams)
+        return token_ids
+
+    def update(self, index_file):
+        """
+        index the new or changed documents recorded in a download.idx, return the number of
+        documents being indexed
+        """
+        count = 0
+        for filename in utils.read_index(index_file).keys():
+            if os.path.exists(filename) and self.add(filename):
+                count += 1
+        if count > 0:
+            utils.logger.debug(f"indexed {count} new documents of {index_file}")
+        return count
+
+    def _token_ids_with(self, word, mode):
+        """
+        return the ids of the tokens embedding a word in the specified match_mode, see pattern_words()
+        """
+        if mode == "exact":
+            rows = self._conn.execute("SELECT id FROM tokens WHERE token = ?", (word,))
+        elif mode == "prefix":
+            rows = self._conn.execute("SELECT id FROM tokens WHERE token >= ? AND token < ?", (word, word + TOKEN_END))
+        elif mode == "suffix":
+            rows = self._conn.execute("SELECT id FROM tokens WHERE reversed >= ? AND reversed < ?",
+                (word[::-1], word[::-1] + TOKEN_END))
+        else:
+            # the tokens holding all the trigrams of the word, confirmed by a substring lookup
+            trigrams = sorted({word[j:j + 3] for j in range(len(word) - 2)})
+            sql = " INTERSECT ".join(["SELECT token_id FROM trigrams WHERE trigram = ?"] * len(trigrams))
+            rows = self._conn.execute(f"SELECT id, token FROM tokens WHERE id IN ({sql})", trigrams)
+            return [row[0] for row in rows.fetchall() if word in row[1]]
+        return [row[0] for row in rows.fetchall()]
+
+    def _files_with(self, word, mode):
+        token_ids = self._token_ids_with(word, mode)
+        file_ids = set()
+        for i in range(0, len(token_ids), 500):
+            chunk = token_ids[i:i + 500]
+            rows = self._conn.execute(f"SELECT DISTINCT file_id FROM postings WHERE token_id IN ({','.join('?' * len(chunk))})", chunk)
+            file_ids.update(row[0] for row in rows.fetchall())
+        return file_ids
+
+    def candidates(self, pattern, filenames=None):
+        """
+        return the set of filenames which might match the regex 'pattern', or None if the pattern
+        has no word to look up; the result is restricted to 'filenames' if given.
+        """
+        words = pattern_words(pattern)
+        if len(words) == 0:
+            return None
+        with self._lock:
+            file_ids = None
+            # the exact words have the shortest posting lists, look them up first
+            for word, mode in sorted(words, key=lambda item: item[1] != "exact"):
+                ids = self._files_with(word, mode)
+                file_ids = ids if file_ids is None else file_ids & ids
+                if len(file_ids) == 0:
+                    break
+            paths = set()
+            file_ids = list(file_ids)
+            for i in range(0, len(file_ids), 500):
+                chunk = file_ids[i:i + 500]
+                rows = self._conn.execute(f"SELECT path FROM files WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                paths.update(row[0] for row in rows)
+        if filenames is not None:
+            paths = {filename for filename in filenames if os.path.normpath(filename) in paths}
+        return paths
+
+    def indexed(self, filename):
+        with self._lock:
+            return self._file_id(filename) is not None
+
+    def offsets(self, filename, word):
+        """
+        return the total count and the first offsets of a lower-cased word in an indexed filing
+        """
+        with self._lock:
+            row = self._conn.execute("""SELECT count, offsets FROM postings WHERE file_id = ? AND
+                token_id = (SELECT id FROM tokens WHERE token = ?)""", (self._file_id(filename), word)).fetchone()
+        if row is None:
+            return 0, []
+        offsets = array('I')
+        offsets.frombytes(row[1])
+        return row[0], list(offsets)
+
+    def search(self, pattern, flags = 0, filenames=None):
+        """
+        return the filenames matching the regex 'pattern' among the indexed filings or 'filenames',
+        the regex is only confirmed on the candidates found in the index
+        """
+        candidates = self.candidates(pattern, filenames)
+        if candidates is None:
+            if filenames is None:
+                with self._lock:
+                    filenames = [row[0] for row in self._conn.execute("SELECT path FROM files").fetchall()]
+            candidates = filenames
+        regex = re.compile(bytes(pattern, encoding='utf8'), flags)
+        matched = set()
+        for filename in candidates:
+            if not os.path.exists(filename):
+                continue
+            with store.filing_blocks(filename) as blocks:
+                if any(regex.search(block) is not None for offset, block in blocks):
+                    matched.add(filename)
+        return matched
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,6 +1,12 @@
 import logging,traceback
 import pprint
+from collections import OrderedDict
+from datetime import datetime
 import xlrd
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -20,6 +26,27 @@ def print2file(content,filename):
         # improve the HTML structure in output by using pprint
         print(content, file=output)
 
+def read_index(index_file):
+    """
+    read a download.idx into a map with filename as key and
+    'FILLING_TYPE'/'FILLING_DATE'/'FILLING_URL' as dictionary keyed-values.
+    """
+    lines = []
+    with open(index_file, 'r', encoding="UTF-8") as input:
+        lines = input.readlines()
+    docs = OrderedDict()
+    for line in lines:
+        items = line.rstrip("\n").split("\t")
+        if len(items) < 4:
+            continue
+        dict = {}
+        dict["FILLING_TYPE"] = items[0]
+        dict["FILLING_DATE"] = items[1]
+        filename = items[2]
+        dict["FILLING_URL"] = items[3]
+        docs[filename] = dict
+    return docs
+
 def read_excel(filename):
     rows = {}
     wb = xlrd.open_workbook(filename, on_demand=True)
@@ -30,15 +57,60 @@ def read_excel(filename):
     del wb
     return rows
 
-def read_specs(filename, startrow=1, endrow=99999999):
-    specs = []
-    rows = read_excel(filename)
-    for key,value in rows.items():
-        # skip the header
-        if key <= 0 or key < startrow or key >= endrow:
-            continue
-        date_a = str(value[0])
-        date_e = str(value[2])
+def iter_excel_rows(filename, startrow=0, endrow=99999999):
+    """
+    yield the (row number, row values) of the first sheet from 'startrow' up to 'endrow' excluded,
+    one row at a time; with openpyxl the sheet is streamed in read-only mode, otherwise xlrd loads it
+    """
+    if openpyxl is None:
+        wb = xlrd.open_workbook(filename, on_demand=True)
+        sht = wb.sheet_by_index(0)
+        for i in range(startrow, min(sht.nrows, endrow)):
+            yield i, sht.row_values(i)
+        wb.release_resources()
+        return
+    wb = openpyxl.load_workbook(filename, read_only=True, data_only=True)
+    try:
+        for i, row in enumerate(wb.worksheets[0].iter_rows(min_row=startrow + 1, values_only=True), startrow):
+            if i >= endrow:
+                break
+            yield i, ["" if value is None else value for value in row]
+    finally:
+        wb.close()
+
+def try_parsing_date(text):
+    for fmt in ('%Y/%m/%d', '%Y-%m-%d', '%d.%m.%Y', '%Y/%m/%d %H:%M:%S', '%Y-%m-%d %H:%M:%S', '%d.%m.%y %H:%M:%S'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise ValueError('no valid date format found')
+
+def excel_date(value):
+    """
+    return a date cell as YYYY/MM/DD, whether it is read as a datetime by openpyxl or as a serial
+    number by xlrd, or "" for an empty or invalid one
+    """
+    if isinstance(value, datetime):
+        return value.strftime("%Y/%m/%d")
+    if isinstance(value, (int, float)) and value > 0:
+        return xlrd.xldate.xldate_as_datetime(value, 0).strftime("%Y/%m/%d")
+    for fmt in ("%Y/%m/%d", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).strftime("%Y/%m/%d")
+        except ValueError:
+            pass
+    return ""
+
+def iter_specs(filename, startrow=1, endrow=99999999):
+    """
+    yield the specs of the firms spreadsheet from 'startrow' up to 'endrow' excluded, one row at a time,
+    as [cik, target name, golden doc, date announced, date effective, acquiror name, target full name]
+    with the dates as YYYY/MM/DD or ""
+    """
+    for key,value in iter_excel_rows(filename, max(1, startrow), endrow):
+        date_a = excel_date(value[0])
+        date_e = excel_date(value[1])
         cik_no = str(value[2])
         acq_name = str(value[3])
         target_fullname = str(value[4])
@@ -49,5 +121,7 @@ def read_specs(filename, startrow=1, endrow=99999999):
         except ValueError:
             logger.error(f"Ingore invalid CIK {cik_no} in shreadsheet row:{key} for AcquirorName:{acq_name}")
             continue
-        specs.append([cik, target_name, "", date_a, date_e, acq_name, target_fullname])
-    return specs
+        yield [cik, target_name, "", date_a, date_e, acq_name, target_fullname]
+
+def read_specs(filename, startrow=1, endrow=99999999):
+    return list(iter_specs(filename, startrow, endrow))